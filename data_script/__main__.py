@@ -0,0 +1,7 @@
+"""Command line entry point: python -m data_script (see update_data.main)."""
+
+import sys
+
+from .update_data import main
+
+sys.exit(main())
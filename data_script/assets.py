@@ -0,0 +1,216 @@
+"""
+Content-hashed copies of the published data files, built at deploy time.
+
+The fixed-name files (companies-index.json, details/AAME.json, ...) change
+every run, so they can only be cached briefly. The deploy job copies every
+data file to assets/ under a name that embeds its content hash:
+
+    details/AAME.json  ->  assets/details/AAME.3f2a1b9c0d4e.json
+
+A hashed file never changes, so a host or CDN can serve it as immutable.
+assets.json maps the fixed names to the current hashes; the frontend
+(src/utils/assets.js) loads it first and requests the hashed files. Neither
+is committed (see .gitignore): they are derived from the committed files
+right before the site is built.
+
+With --compress, .gz/.br variants are written next to each hashed file for
+hosts that serve precompressed files (nginx gzip_static/brotli_static).
+GitHub Pages does not, so the deploy workflow leaves it off.
+
+    python -m data_script.assets [--data-dir public/companies-data] [--compress]
+"""
+
+import os
+import sys
+import gzip
+import json
+import hashlib
+import logging
+import argparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+HASH_LENGTH = 12  # hex characters of the sha256 in hashed file names
+ASSETS_SUBDIR = 'assets'
+ASSET_MANIFEST_NAME = 'assets.json'
+PUBLISH_MANIFEST_NAME = 'manifest.json'  # written by publish.Publisher, not a data file
+DETAIL_JSON = '.json'
+DETAIL_SIDECAR = '.prices.bin'
+
+
+def hashed_relpath(relpath, digest):
+    """
+    Path of the hashed copy of relpath: the hash goes before the last extension.
+
+    Example:
+        hashed_relpath('details/BRK.B.json', 'ab12...') -> 'assets/details/BRK.B.ab12....json'
+    """
+    directory, name = os.path.split(relpath)
+    stem, ext = os.path.splitext(name)
+    name = f'{stem}.{digest[:HASH_LENGTH]}{ext}'
+    return f'{ASSETS_SUBDIR}/{directory}/{name}' if directory else f'{ASSETS_SUBDIR}/{name}'
+
+
+def _write_atomic(path, content):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _variants(content):
+    """Compressed variants worth keeping (smaller than the original), as (suffix, bytes)."""
+    variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content, quality=11)))
+    return [(suffix, data) for suffix, data in variants if len(data) < len(content)]
+
+
+def collect_files(output_dir):
+    """
+    Hash every data file under output_dir (assets and manifests excluded).
+
+    Returns:
+        dict: relpath -> {'sha256', 'bytes'}, like Publisher.files
+    """
+    files = {}
+    for directory, subdirs, names in os.walk(output_dir):
+        if os.path.samefile(directory, output_dir):
+            subdirs[:] = [name for name in subdirs if name != ASSETS_SUBDIR]
+        for name in names:
+            path = os.path.join(directory, name)
+            relpath = os.path.relpath(path, output_dir).replace(os.sep, '/')
+            if relpath in (ASSET_MANIFEST_NAME, PUBLISH_MANIFEST_NAME):
+                continue
+            with open(path, 'rb') as f:
+                content = f.read()
+            files[relpath] = {'sha256': hashlib.sha256(content).hexdigest(), 'bytes': len(content)}
+    return files
+
+
+def asset_manifest(files, details_subdir):
+    """
+    Build the assets.json payload.
+
+    Args:
+        files (dict): Published relpath -> {'sha256', 'bytes'} (Publisher.files)
+        details_subdir (str): Subdirectory holding the per-ticker detail files
+
+    Returns:
+        dict: {'HashLength', 'Files': relpath -> hash, 'Details': ticker -> hash,
+               'Sidecars': ticker -> hash}, with detail files keyed by ticker
+    """
+    manifest = {'HashLength': HASH_LENGTH, 'Files': {}, 'Details': {}, 'Sidecars': {}}
+    prefix = details_subdir + '/'
+    for relpath, entry in sorted(files.items()):
+        digest = entry['sha256'][:HASH_LENGTH]
+        name = relpath[len(prefix):] if relpath.startswith(prefix) else None
+        if name and '/' not in name and name.endswith(DETAIL_SIDECAR):
+            manifest['Sidecars'][name[:-len(DETAIL_SIDECAR)]] = digest
+        elif name and '/' not in name and name.endswith(DETAIL_JSON):
+            manifest['Details'][name[:-len(DETAIL_JSON)]] = digest
+        else:
+            manifest['Files'][relpath] = digest
+    return manifest
+
+
+def _manifest_relpaths(manifest, details_subdir):
+    """Hashed relpaths (without compressed variants) referenced by an assets.json payload."""
+    relpaths = {hashed_relpath(relpath, digest) for relpath, digest in manifest.get('Files', {}).items()}
+    relpaths.update(hashed_relpath(f'{details_subdir}/{ticker}{DETAIL_JSON}', digest)
+                    for ticker, digest in manifest.get('Details', {}).items())
+    relpaths.update(hashed_relpath(f'{details_subdir}/{ticker}{DETAIL_SIDECAR}', digest)
+                    for ticker, digest in manifest.get('Sidecars', {}).items())
+    return relpaths
+
+
+def publish_assets(output_dir, files, details_subdir, compress=False):
+    """
+    Write hashed copies of the published files and assets.json.
+
+    The fixed-name files must hold the content listed in files. Hashed files
+    that already exist are left alone, so an unchanged file costs nothing.
+    assets.json is replaced only once every file it lists exists.
+
+    Args:
+        output_dir (str): Published directory
+        files (dict): Published relpath -> {'sha256', 'bytes'}, e.g. from collect_files
+        details_subdir (str): Subdirectory holding the per-ticker detail files
+        compress (bool): Also write .gz (and, with brotli installed, .br) variants
+
+    Returns:
+        dict: Counts of hashed files 'written' and 'unchanged', and of stale
+              files 'removed' (compressed variants included)
+    """
+    manifest_path = os.path.join(output_dir, ASSET_MANIFEST_NAME)
+    previous = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read asset manifest {manifest_path}: {str(e)}")
+    if compress and brotli is None:
+        logger.info("brotli is not installed; writing gzip variants only.")
+
+    written = unchanged = 0
+    for relpath, entry in files.items():
+        target = os.path.join(output_dir, hashed_relpath(relpath, entry['sha256']))
+        # Without variants yet, an asset from an uncompressed build is redone
+        if os.path.exists(target) and not (compress and not os.path.exists(target + '.gz')):
+            unchanged += 1
+            continue
+        with open(os.path.join(output_dir, relpath), 'rb') as f:
+            content = f.read()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Variants first: the plain file marks the asset as complete
+        for suffix, data in _variants(content) if compress else []:
+            _write_atomic(target + suffix, data)
+        _write_atomic(target, content)
+        written += 1
+
+    manifest = asset_manifest(files, details_subdir)
+    _write_atomic(manifest_path, json.dumps(manifest, separators=(',', ':')).encode('utf-8'))
+
+    # Keep what the current and the previous manifest reference
+    keep = _manifest_relpaths(manifest, details_subdir) | _manifest_relpaths(previous, details_subdir)
+    removed = 0
+    assets_dir = os.path.join(output_dir, ASSETS_SUBDIR)
+    for directory, _, names in os.walk(assets_dir):
+        for name in names:
+            path = os.path.join(directory, name)
+            relpath = os.path.relpath(path, output_dir).replace(os.sep, '/')
+            for suffix in ('.gz', '.br'):
+                if relpath.endswith(suffix):
+                    relpath = relpath[:-len(suffix)]
+                    break
+            # Leftover .tmp files are from an interrupted run
+            if relpath not in keep or name.endswith('.tmp'):
+                os.remove(path)
+                removed += 1
+
+    counts = {'written': written, 'unchanged': unchanged, 'removed': removed}
+    logger.info(f"Hashed assets: {written} written, {unchanged} unchanged, {removed} stale files removed.")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m data_script.assets',
+                                     description='Write content-hashed copies of the data files and assets.json.')
+    parser.add_argument('--data-dir', default='public/companies-data', help='published data directory')
+    parser.add_argument('--details-subdir', default='details', help='subdirectory of the per-ticker detail files')
+    parser.add_argument('--compress', action='store_true', help='also write .gz/.br variants')
+    args = parser.parse_args(argv)
+
+    counts = publish_assets(args.data_dir, collect_files(args.data_dir), args.details_subdir, args.compress)
+    print(f"Hashed assets: {counts['written']} written, {counts['unchanged']} unchanged, {counts['removed']} removed.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Offline benchmark of the data pipeline stages.
+
+Runs the pipeline's stage functions against a FakeMarket instead
+of Yahoo Finance and a synthetic workbook scaled to the requested number of
+tickers, timing each stage separately:
+
+    excel_parse    ingest.read_workbook with a cold cache + list_companies
+    excel_cached   ingest.read_workbook again, served from its pickle cache
+    scoring        score_universe
+    records        per-batch build_company_data and score lookups
+    clean_nan      clean_nan_to_empty_str of the per-ticker scores
+    fetch          plan_fetches/fetch_prices through the fake provider (time
+                   spent waiting on it, i.e. not hidden behind rendering)
+    price_store    PriceStore upsert + get_prices
+    transform      detail/summary records, chart series, price encoding
+    serialize      JSON encoding of detail files
+    write          staging of detail files and commit
+    summary        streamed companies.json, index and search index
+    render         wall-clock time of the render worker pool
+
+With several render workers, price_store (reads), transform, serialize and
+write are summed across worker processes, so they can exceed render.
+
+Each result also records the process's peak RSS so far, which should stay
+roughly flat as the size grows. Each run writes a JSON report; pass --compare with an earlier report to flag
+stages that got slower.
+
+--check-readjustment runs a self-check instead: a split applied to a stored
+ticker's history upstream must be detected by an incremental fetch and lead to
+a full refresh of that ticker.
+
+Usage (from the repository root):
+    python -m data_script.benchmark --sizes 400 5000 20000
+    python -m data_script.benchmark --sizes 400 --compare data_script/logs/benchmarks/<report>.json
+    python -m data_script.benchmark --check-readjustment
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .fake_market import FakeMarket, load_recorded_prices
+from .fetcher import AdaptiveRateLimiter
+from .price_store import PriceStore
+from .detail_format import JSON_BACKEND
+from .publish import Publisher
+from .ingest import list_companies, read_workbook, workbook_years
+from .scoring import score_universe
+from .metrics import RunMetrics, peak_rss_bytes
+from .update_data import (YEARS, BATCH_SIZE, MAX_WORKERS, PERIOD, build_outputs, write_summary, plan_fetches,
+                          fetch_prices)
+
+# ================================
+# Configuration
+# ================================
+EXCEL_FILE = 'data_script/input.xlsx'  # template rows for the synthetic workbooks
+DETAILS_DIR = 'public/companies-data/details'  # source of --recorded prices
+WORKBOOK_DIR = 'data_script/cache/benchmark'  # generated workbooks, reused across runs
+REPORT_DIR = 'data_script/logs/benchmarks'
+SIZES = [400, 5000, 20000]
+REGRESSION_THRESHOLD = 1.2  # flag stages at least this many times slower than the baseline
+MIN_COMPARE_SECONDS = 0.5  # shorter stages are too noisy to flag
+STAGES = ['excel_parse', 'excel_cached', 'scoring', 'records', 'clean_nan', 'fetch', 'price_store', 'analytics', 'transform', 'serialize', 'write',
+          'summary', 'render']
+
+
+class StageTimer:
+    """Accumulate wall-clock seconds per stage across chunks."""
+
+    def __init__(self):
+        self.seconds = {stage: 0.0 for stage in STAGES}
+
+    def time(self, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.seconds[stage] += time.perf_counter() - start
+        return result
+
+
+def synthetic_workbook(size, template_file=EXCEL_FILE, workbook_dir=WORKBOOK_DIR):
+    """
+    Return the path of a workbook with `size` companies per year sheet.
+
+    Rows of the template workbook are repeated with suffixed tickers
+    (AAPL, AAPL1, AAPL2, ...). The file is generated once per size.
+    """
+    path = os.path.join(workbook_dir, f'input-{size}.xlsx')
+    if os.path.exists(path):
+        return path
+    os.makedirs(workbook_dir, exist_ok=True)
+    print(f"Generating synthetic workbook with {size} companies: {path}")
+    template = pd.read_excel(template_file, sheet_name=YEARS or workbook_years(template_file))
+    tmp_path = path + '.tmp.xlsx'
+    with pd.ExcelWriter(tmp_path) as writer:
+        for year, sheet in template.items():
+            sheet = sheet[sheet['ticker'].notna()]
+            copies = -(-size // len(sheet))
+            rows = pd.concat([sheet] * copies, ignore_index=True).iloc[:size].copy()
+            copy_number = np.arange(len(rows)) // len(sheet)
+            suffix = np.where(copy_number == 0, '', copy_number.astype(str))
+            rows['ticker'] = rows['ticker'].astype(str) + suffix
+            rows.to_excel(writer, sheet_name=year, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_size(size, scratch_dir, max_workers=MAX_WORKERS, rate=None, render_workers=None):
+    """
+    Run every stage for one universe size (with a FakeMarket installed).
+
+    Args:
+        size (int): Number of tickers
+        scratch_dir (str): Directory for the price store and published files
+        max_workers (int): Concurrent fetch batches
+        rate (float): Initial rate for a limiter bounded like update_data.py's;
+            None leaves pacing to the fake market's latency
+        render_workers (int): Render processes (defaults to update_data's setting)
+
+    Returns:
+        dict: Report entry with stage timings and counters
+    """
+    started = time.perf_counter()
+    timer = StageTimer()
+    workbook = synthetic_workbook(size)
+
+    run_dir = os.path.join(scratch_dir, str(size))
+    os.makedirs(run_dir, exist_ok=True)
+    # The pipeline's read path, first with a cold cache and then served from it
+    cache_file = os.path.join(run_dir, 'workbook.pkl')
+    sheets = timer.time('excel_parse', read_workbook, workbook, YEARS or None, cache_file)
+    years = list(sheets)
+    companies = timer.time('excel_parse', list_companies, sheets, years)
+    timer.time('excel_cached', read_workbook, workbook, YEARS or None, cache_file)
+    scores = timer.time('scoring', score_universe, sheets, years)
+
+    output_dir = os.path.join(run_dir, 'companies-data')
+    os.makedirs(output_dir, exist_ok=True)
+    publisher = Publisher(output_dir, os.path.join(run_dir, 'staging'), prune_dirs=['details'])
+    price_store = PriceStore(os.path.join(run_dir, 'prices.sqlite'))
+    if rate:
+        limiter = AdaptiveRateLimiter(rate=rate)
+    else:
+        limiter = AdaptiveRateLimiter(rate=1e6, min_rate=1e6, max_rate=1e6, capacity=1e6)
+
+    tickers = list(companies)
+    # The pipeline's own fetch stage: plan, fetch and store, batch by batch
+    fetch_metrics = RunMetrics()
+    batches = fetch_prices(plan_fetches(tickers, price_store), price_store, fetch_metrics,
+                           limiter=limiter, max_workers=max_workers)
+
+    # Rendering (price reads, transform, serialize, write) runs in the
+    # pipeline's worker pool; its per-stage times are summed across workers.
+    # The summary files are streamed while batches are rendered.
+    metrics = RunMetrics()
+    render_start = time.perf_counter()
+    write_summary(build_outputs(batches, sheets, scores, price_store, publisher, metrics,
+                                workers=render_workers), publisher, metrics)
+    summary = sum(metrics.stages.get(stage, 0.0) for stage in ('summary', 'summary_index', 'search_index'))
+    timer.seconds['fetch'] = fetch_metrics.stages.get('fetch_wait', 0.0)
+    timer.seconds['price_store'] = fetch_metrics.stages.get('price_store', 0.0)
+    timer.seconds['render'] = (time.perf_counter() - render_start - timer.seconds['fetch']
+                               - timer.seconds['price_store'] - summary)
+    for stage in ('records', 'clean_nan', 'price_store', 'analytics', 'transform', 'serialize', 'write'):
+        timer.seconds[stage] += metrics.stages.get(stage, 0.0)
+    timer.seconds['summary'] = summary
+    empty = len(metrics.tickers.get('empty_prices', []))
+    timer.time('write', publisher.commit)
+    price_store.close()
+
+    output_bytes = sum(entry['bytes'] for entry in publisher.files.values())
+    total = time.perf_counter() - started
+    return {
+        'tickers': len(tickers),
+        'stages': {stage: round(seconds, 4) for stage, seconds in timer.seconds.items()},
+        'total_seconds': round(total, 4),
+        'tickers_per_second': round(len(tickers) / total, 2) if total else None,
+        'empty_tickers': empty,
+        'output_files': len(publisher.files),
+        'output_bytes': output_bytes,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+
+
+def check_readjustment(scratch_dir, tickers=('SPLT', 'KEEP'), split=2.0):
+    """
+    Check that a history re-adjusted upstream triggers a full refresh.
+
+    Both tickers are backfilled through plan_fetches/fetch_prices, then the
+    first one splits: every close the fake market serves for it is divided
+    by split. The next run's incremental fetch must flag it, and the store
+    must end up holding the adjusted history while the other ticker is left
+    alone.
+
+    Returns:
+        list: Failure messages (empty if the check passed)
+    """
+    market = FakeMarket(seed=0)
+    market.recorded = {ticker: market.closes(ticker) for ticker in tickers}
+    market.recorded_tickers = sorted(market.recorded)
+    price_store = PriceStore(os.path.join(scratch_dir, 'readjustment.sqlite'))
+    failures = []
+    with market.install():
+        list(fetch_prices(plan_fetches(list(tickers), price_store), price_store, RunMetrics()))
+        price_store.clear_checkpoint(tickers)
+        split_ticker, other = tickers
+        market.recorded[split_ticker] = market.recorded[split_ticker] / split
+
+        chunks = plan_fetches(list(tickers), price_store)
+        if any(full for _, requests in chunks for _, full, _ in requests):
+            failures.append("second run planned a full backfill instead of an incremental fetch")
+        metrics = RunMetrics()
+        list(fetch_prices(chunks, price_store, metrics))
+
+    if metrics.tickers.get('readjusted') != [split_ticker]:
+        failures.append(f"flagged as re-adjusted: {metrics.tickers.get('readjusted')}, expected [{split_ticker!r}]")
+    for ticker in tickers:
+        stored = price_store.get_prices(ticker).set_index('Date')['Close']
+        expected = market.recorded[ticker]
+        expected = expected[expected.index >= stored.index[0]]
+        if len(stored) != len(expected) or not np.allclose(stored.to_numpy(), expected.to_numpy()):
+            failures.append(f"stored history of {ticker} does not match the market's")
+    price_store.close()
+    return failures
+
+
+def compare_reports(current, baseline):
+    """
+    Compare stage timings of two reports.
+
+    Returns:
+        list: (size, stage, baseline seconds, current seconds, ratio) for every
+              stage present in both and long enough to compare, with
+              ratio = current / baseline
+    """
+    rows = []
+    for size, result in current['results'].items():
+        previous = baseline['results'].get(size)
+        if not previous:
+            continue
+        for stage in STAGES + ['total_seconds']:
+            now = result['total_seconds'] if stage == 'total_seconds' else result['stages'].get(stage)
+            before = previous['total_seconds'] if stage == 'total_seconds' else previous['stages'].get(stage)
+            if now is None or not before or max(now, before) < MIN_COMPARE_SECONDS:
+                continue
+            rows.append((size, stage, before, now, now / before))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the data pipeline stages offline.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='universe sizes (tickers)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per fake request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random seconds per fake request')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='probability a fake request fails')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='probability a fake request is rate limited')
+    parser.add_argument('--recorded', action='store_true', help=f'replay prices from {DETAILS_DIR}')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='concurrent fetch batches')
+    parser.add_argument('--render-workers', type=int, help='render processes (default: CPU count)')
+    parser.add_argument('--rate', type=float, help='initial request rate of the adaptive limiter (default: unlimited)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='report path (default: timestamped file in %s)' % REPORT_DIR)
+    parser.add_argument('--compare', help='earlier report to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='slowdown ratio reported as a regression')
+    parser.add_argument('--check-readjustment', action='store_true',
+                        help='only check that a re-adjusted history triggers a full refresh')
+    args = parser.parse_args(argv)
+
+    if args.check_readjustment:
+        scratch_dir = tempfile.mkdtemp(prefix='oakie-benchmark-')
+        try:
+            failures = check_readjustment(scratch_dir)
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        print("Re-adjustment check " + ("failed." if failures else "passed."))
+        return 1 if failures else 0
+
+    recorded = load_recorded_prices(DETAILS_DIR) if args.recorded else None
+    market = FakeMarket(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                        throttle_rate=args.throttle_rate, seed=args.seed, recorded=recorded)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'json_backend': JSON_BACKEND,
+        },
+        'config': {
+            'latency': args.latency, 'jitter': args.jitter, 'failure_rate': args.failure_rate,
+            'throttle_rate': args.throttle_rate, 'recorded': args.recorded, 'workers': args.workers, 'rate': args.rate,
+            'render_workers': args.render_workers,
+            'seed': args.seed, 'batch_size': BATCH_SIZE, 'period': PERIOD,
+        },
+        'results': {},
+    }
+
+    scratch_dir = tempfile.mkdtemp(prefix='oakie-benchmark-')
+    try:
+        with market.install():
+            for size in args.sizes:
+                print(f"\n=== {size} tickers ===")
+                result = run_size(size, scratch_dir, max_workers=args.workers, rate=args.rate,
+                                  render_workers=args.render_workers)
+                result['fake_requests'] = market.requests
+                result['fake_failures'] = market.failures
+                result['fake_throttles'] = market.throttles
+                market.requests = market.failures = market.throttles = 0
+                report['results'][str(size)] = result
+                for stage, seconds in result['stages'].items():
+                    print(f"{stage:<12} {seconds:>10.3f}s")
+                print(f"{'total':<12} {result['total_seconds']:>10.3f}s  ({result['tickers_per_second']} tickers/s)")
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(REPORT_DIR, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print(f"\nCompared with {args.compare}:")
+        for size, stage, before, now, ratio in compare_reports(report, baseline):
+            flag = '  REGRESSION' if ratio >= args.threshold else ''
+            regressions += bool(flag)
+            print(f"{size:>6} {stage:<14} {before:>9.3f}s -> {now:>9.3f}s  x{ratio:.2f}{flag}")
+        if regressions:
+            print(f"{regressions} stage(s) slower than x{args.threshold}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Ready-to-plot price chart series for each selectable time range.
+
+For every range the close series is cut to the range and downsampled with
+Largest-Triangle-Three-Buckets (LTTB) to a target point count. The DCF /
+exit-multiple values of each calendar year are written once per year as a band
+over the points that fall in it; PriceChart.jsx expands the bands back to
+per-point values. Axis tick positions and the y-axis domain are precomputed
+too, so the chart only has to render.
+
+Each range is written as:
+    {"StartDay": epoch day, "DayDeltas": [0, ...], "Price": [...],
+     "Ticks": [point indices], "Bands": [[first, last, dcf, exit], ...],
+     "Domain": [min, max]}
+with the point dates delta-encoded like the columnar HistoricalPrices: each
+point's epoch day is StartDay plus the running sum of DayDeltas.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from .detail_format import epoch_days
+
+# Ranges shown by PriceChart.jsx; periods of more than one year get yearly ticks
+RANGE_YEARS = {'5Y': 5, '4Y': 4, '3Y': 3, '2Y': 2, '1Y': 1, 'YTD': None}
+LTTB_TABLE_WIDTH = 24  # widest bucket scored for all previous picks at once (5Y at 200 points is ~7)
+
+
+def lttb(x, y, threshold):
+    """
+    Select the indices of a Largest-Triangle-Three-Buckets downsample.
+
+    The averages of all buckets come from one np.add.reduceat. The pick of a
+    bucket depends on the pick of the one before it, so for narrow buckets the
+    best candidate is computed for every possible previous pick at once and the
+    picks are then chained with list lookups; wide buckets (very long series)
+    are scored one at a time instead, which keeps memory flat.
+
+    Args:
+        x (np.ndarray): Monotonic x values
+        y (np.ndarray): y values (no NaNs)
+        threshold (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points (first and last included)
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(float)
+    y = y.astype(float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average of the next bucket (or the last point for the final bucket)
+    next_bounds = np.append(ends, n)
+    counts = np.diff(next_bounds)
+    avg_x = np.add.reduceat(x, next_bounds[:-1]) / counts
+    avg_y = np.add.reduceat(y, next_bounds[:-1]) / counts
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    width = int((ends - starts).max())
+    if width > LTTB_TABLE_WIDTH:
+        prev = 0
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            area = np.abs((x[prev] - avg_x[i]) * (y[start:end] - y[prev])
+                          - (x[prev] - x[start:end]) * (avg_y[i] - y[prev]))
+            prev = start + int(area.argmax())
+            selected[i + 1] = prev
+        return selected
+
+    # Candidates of every bucket padded to the widest one; the previous pick is
+    # one of the candidates of the bucket before (the first point for bucket 0)
+    candidates = starts[:, None] + np.arange(width)
+    valid = candidates < ends[:, None]
+    candidates = np.minimum(candidates, n - 1)
+    prevs = np.vstack([np.zeros((1, width), dtype=int), candidates[:-1]])
+    xp, yp = x[prevs][:, :, None], y[prevs][:, :, None]
+    xc, yc = x[candidates][:, None, :], y[candidates][:, None, :]
+    area = np.abs((xp - avg_x[:, None, None]) * (yc - yp) - (xp - xc) * (avg_y[:, None, None] - yp))
+    area[~np.broadcast_to(valid[:, None, :], area.shape)] = -1
+    best = area.argmax(axis=2).tolist()  # [bucket][previous pick] -> offset of the pick
+
+    pick = 0
+    for i, start in enumerate(starts.tolist()):
+        pick = best[i][pick]
+        selected[i + 1] = start + pick
+    return selected
+
+
+def range_start(label, today):
+    years = RANGE_YEARS[label]
+    if years is None:
+        return date(today.year, 1, 1)
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # Feb 29
+        return today.replace(year=today.year - years, day=28)
+
+
+def _month_ticks(days):
+    """Index of the point closest to the first of every month in the range."""
+    dates = days.astype('datetime64[D]')
+    first = dates[0].astype('datetime64[M]')
+    months = np.arange(first, dates[-1].astype('datetime64[M]') + 1)
+    targets = months.astype('datetime64[D]').astype(np.int64)
+    right = np.clip(np.searchsorted(days, targets), 0, len(days) - 1)
+    left = np.clip(right - 1, 0, len(days) - 1)
+    closer_left = np.abs(days[left] - targets) <= np.abs(days[right] - targets)
+    return np.where(closer_left, left, right)
+
+
+def _year_ticks(days):
+    """Index of the earliest point of every calendar year in the range."""
+    years = days.astype('datetime64[D]').astype('datetime64[Y]')
+    return np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+
+
+def build_chart_series(prices, years, target_points=200, precision=2, today=None):
+    """
+    Build the precomputed chart payload for every range.
+
+    Args:
+        prices (pd.DataFrame): Columns 'Date' and 'Close', sorted by date
+        years (list): Company 'Years' entries with 'Year', 'DCFValue', 'ExitMultipleValue'
+        target_points (int): Maximum points per range after downsampling
+        precision (int): Decimal places kept for prices and values
+        today (date): Reference date for the ranges (defaults to today)
+
+    Returns:
+        dict: Range label -> series payload (ranges without data are omitted)
+    """
+    today = today or date.today()
+    prices = prices.dropna(subset=['Close'])
+    if prices.empty:
+        return {}
+    all_days = epoch_days(prices['Date'])
+    all_closes = prices['Close'].to_numpy(dtype=float)
+    all_years = all_days.astype('datetime64[D]').astype('datetime64[Y]').astype(int) + 1970
+
+    # Intrinsic-value band per calendar year; years without both values have none
+    bands = {}
+    for entry in years:
+        dcf, exit_multiple = entry.get('DCFValue'), entry.get('ExitMultipleValue')
+        if isinstance(dcf, (int, float)) and isinstance(exit_multiple, (int, float)) \
+                and not (pd.isna(dcf) or pd.isna(exit_multiple)):
+            bands[int(entry['Year'])] = (round(float(dcf), precision), round(float(exit_multiple), precision))
+
+    series = {}
+    for label in RANGE_YEARS:
+        start = pd.Timestamp(range_start(label, today)).value // 86_400_000_000_000
+        mask = all_days >= start
+        if not mask.any():
+            continue
+        days, closes, point_years = all_days[mask], all_closes[mask], all_years[mask]
+        keep = lttb(days, closes, target_points)
+        days, closes, point_years = days[keep], closes[keep].round(precision), point_years[keep]
+
+        band_rects = []
+        for year, (year_dcf, year_exit) in bands.items():
+            in_year = np.flatnonzero(point_years == year)
+            if len(in_year):
+                band_rects.append([int(in_year[0]), int(in_year[-1]), year_dcf, year_exit])
+
+        values = np.concatenate([closes, [v for band in band_rects for v in band[2:]]])
+        ticks = _year_ticks(days) if RANGE_YEARS[label] not in (None, 1) else _month_ticks(days)
+        series[label] = {
+            'StartDay': int(days[0]),
+            'DayDeltas': np.diff(days, prepend=days[:1]).tolist(),
+            'Price': closes.tolist(),
+            'Ticks': sorted(set(ticks.tolist())),
+            'Bands': band_rects,
+            'Domain': [round(float(values.min()) * 0.95, precision), round(float(values.max()) * 1.05, precision)],
+        }
+    return series
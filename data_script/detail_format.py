@@ -0,0 +1,148 @@
+"""
+Encoders for the price history stored in per-ticker detail files.
+
+Two layouts are supported besides the legacy list of {"Date", "Close"} records:
+
+* columnar: {"Encoding": "columnar", "StartDay": <days since 1970-01-01>,
+  "DayDeltas": [0, 1, 3, ...], "Close": [...]} where each bar's epoch day is
+  StartDay plus the running sum of DayDeltas and missing closes are null.
+* binary: the same columns packed into a <TICKER>.prices.bin sidecar and
+  referenced from the JSON as {"Encoding": "binary", "File": ..., "Count": n}.
+  The sidecar is an 8-byte header (b'OKP1', uint32 count) followed by count
+  int32 epoch days and count float32 closes, all little-endian.
+
+Compact JSON is encoded with orjson (pinned in requirements.txt; several times
+faster than the json module). Without it the json module is used: values,
+non-ASCII text and float32 numbers come out the same, and non-finite floats
+are null in both, but json spells some floats differently (1e-05 where orjson
+writes 0.00001), so files built without orjson can differ byte for byte.
+Published data should be built with orjson installed.
+"""
+
+import json
+import math
+import struct
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SIDECAR_MAGIC = b'OKP1'
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+LEGACY_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'  # str(pd.Timestamp) of a daily bar
+
+
+def epoch_days(dates):
+    """Convert a datetime64 Series/array to integer days since 1970-01-01."""
+    return pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]').astype(np.int64)
+
+
+def encode_prices_columnar(prices, precision=4):
+    """
+    Encode a price frame as parallel arrays.
+
+    Args:
+        prices (pd.DataFrame): Columns 'Date' and 'Close', sorted by date
+        precision (int): Decimal places kept for closes
+
+    Returns:
+        dict: Columnar HistoricalPrices payload
+    """
+    days = epoch_days(prices['Date'])
+    closes = prices['Close'].to_numpy(dtype=float).round(precision)
+    return {
+        'Encoding': 'columnar',
+        'StartDay': int(days[0]) if len(days) else 0,
+        'DayDeltas': np.diff(days, prepend=days[:1]).tolist(),
+        'Close': [None if np.isnan(c) else c for c in closes.tolist()],
+    }
+
+
+def encode_prices_binary(prices):
+    """
+    Pack a price frame into the binary sidecar layout.
+
+    Args:
+        prices (pd.DataFrame): Columns 'Date' and 'Close', sorted by date
+
+    Returns:
+        bytes: Sidecar file contents
+    """
+    days = epoch_days(prices['Date']).astype('<i4')
+    closes = prices['Close'].to_numpy(dtype='<f4')
+    return SIDECAR_MAGIC + struct.pack('<I', len(days)) + days.tobytes() + closes.tobytes()
+
+
+def price_records(prices):
+    """
+    Legacy HistoricalPrices records with output-ready values.
+
+    Dates are formatted and missing closes replaced by "" in whole-column
+    operations, so the records serialize without a default= hook or a
+    clean_nan_to_empty_str pass.
+
+    Args:
+        prices (pd.DataFrame): Columns 'Date' and 'Close', sorted by date
+
+    Returns:
+        list: [{'Date': 'YYYY-MM-DD 00:00:00', 'Close': float or ""}, ...]
+    """
+    dates = pd.to_datetime(prices['Date']).dt.strftime(LEGACY_DATE_FORMAT).tolist()
+    closes = prices['Close'].astype(object).where(prices['Close'].notna(), "").tolist()
+    return [{'Date': d, 'Close': c} for d, c in zip(dates, closes)]
+
+
+def latest_close(prices):
+    """
+    Most recent non-missing close.
+
+    Returns:
+        tuple: (close, date) or (None, None) when there is no close
+    """
+    valid = prices['Close'].notna().to_numpy()
+    if not valid.any():
+        return None, None
+    i = len(valid) - 1 - int(np.argmax(valid[::-1]))
+    return float(prices['Close'].iloc[i]), prices['Date'].iloc[i]
+
+
+def _json_ready(obj):
+    """Replace what orjson writes differently from json: non-finite floats and numpy values."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _json_ready(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_ready(x) for x in obj]
+    if isinstance(obj, np.ndarray):
+        # float32 elements go through the scalar branch below
+        return [_json_ready(x) for x in obj] if obj.dtype.kind == 'f' and obj.itemsize < 8 else _json_ready(obj.tolist())
+    if isinstance(obj, np.floating) and obj.itemsize < 8:
+        # Shortest float32 repr, as orjson writes it (1.1, not 1.100000023841858)
+        return _json_ready(float(str(obj)))
+    if isinstance(obj, np.generic):
+        return _json_ready(obj.tolist())
+    return obj
+
+
+def dumps_compact(obj):
+    """Serialize a record as minified UTF-8 JSON bytes (non-finite floats become null)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_json_ready(obj), separators=(',', ':'), default=str, allow_nan=False,
+                      ensure_ascii=False).encode('utf-8')
+
+
+def clean_nan_to_empty_str(obj):
+    """Recursively replace float NaNs with "" (the placeholder used throughout the JSON output)."""
+    if isinstance(obj, float) and math.isnan(obj):
+        return ""
+    if isinstance(obj, dict):
+        return {k: clean_nan_to_empty_str(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [clean_nan_to_empty_str(x) for x in obj]
+    return obj
@@ -0,0 +1,202 @@
+"""
+Local stand-in for the parts of yfinance the pipeline uses.
+
+FakeMarket serves price histories for yf.download and yf.Ticker(...).history
+and a company profile for yf.Ticker(...).info, with configurable latency and
+failure rates, so the pipeline can be exercised and timed offline. Prices are
+either a seeded random walk per ticker (synthetic) or replayed from previously
+published detail files (recorded).
+
+    market = FakeMarket(latency=0.05, failure_rate=0.01)
+    with market.install():
+        ...  # code calling yf.download / yf.Ticker
+"""
+
+import os
+import json
+import time
+import zlib
+import random
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFRateLimitError, YFTickerMissingError
+
+from .price_store import history_start
+
+EXCHANGE_TZ = 'America/New_York'
+HISTORY_YEARS = 6  # years of bars available per ticker
+
+
+def load_recorded_prices(details_dir):
+    """
+    Load close series from published detail files.
+
+    Both the legacy record list and the columnar encoding are understood;
+    files using the binary sidecar are skipped.
+
+    Args:
+        details_dir (str): Directory of <TICKER>.json detail files
+
+    Returns:
+        dict: Ticker -> pd.Series of closes indexed by date
+    """
+    recorded = {}
+    for name in sorted(os.listdir(details_dir)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(details_dir, name)) as f:
+            prices = json.load(f).get('HistoricalPrices')
+        if isinstance(prices, list) and prices:
+            frame = pd.DataFrame(prices)
+            dates = pd.to_datetime(frame['Date'])
+            closes = pd.to_numeric(frame['Close'], errors='coerce')
+        elif isinstance(prices, dict) and prices.get('Encoding') == 'columnar':
+            days = prices['StartDay'] + np.cumsum(prices['DayDeltas'])
+            dates = pd.to_datetime(days, unit='D')
+            closes = pd.Series(prices['Close'], dtype=float)
+        else:
+            continue
+        recorded[name[:-len('.json')]] = pd.Series(closes.to_numpy(dtype=float), index=pd.DatetimeIndex(dates))
+    return recorded
+
+
+class FakeTicker:
+    """Minimal yf.Ticker replacement backed by a FakeMarket."""
+
+    def __init__(self, market, ticker):
+        self.market = market
+        self.ticker = ticker
+
+    def history(self, period=None, start=None, raise_errors=False, **kwargs):
+        try:
+            self.market.request()
+            frame = self.market.history_frame(self.ticker, period=period, start=start)
+            if frame.empty:
+                raise YFTickerMissingError(self.ticker, 'no price data found')
+            return frame
+        except Exception:
+            if raise_errors:
+                raise
+            return pd.DataFrame()
+
+    @property
+    def info(self):
+        self.market.request()
+        return self.market.info(self.ticker)
+
+
+class FakeMarket:
+    """
+    Synthetic or recorded market data with simulated network behaviour.
+
+    Args:
+        latency (float): Seconds each request takes
+        jitter (float): Extra uniformly distributed seconds per request
+        failure_rate (float): Probability that a request raises an error
+        throttle_rate (float): Probability that a request is rate limited
+        seed (int): Seed for the failure/latency draws
+        recorded (dict): Ticker -> close Series to replay (see
+            load_recorded_prices); other tickers reuse a recorded series
+            chosen by hash. None for synthetic prices.
+        today (pd.Timestamp): Last bar date (defaults to today)
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, throttle_rate=0.0, seed=0,
+                 recorded=None, today=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.recorded = recorded or {}
+        self.recorded_tickers = sorted(self.recorded)
+        self.today = (today or pd.Timestamp.today()).normalize()
+        self.dates = pd.bdate_range(self.today - pd.DateOffset(years=HISTORY_YEARS), self.today)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.throttles = 0
+
+    def request(self):
+        """Simulate one network round trip, raising on simulated failures."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            draw = self.random.random()
+        if delay:
+            time.sleep(delay)
+        if draw < self.throttle_rate:
+            with self.lock:
+                self.throttles += 1
+            raise YFRateLimitError()
+        if draw < self.throttle_rate + self.failure_rate:
+            with self.lock:
+                self.failures += 1
+            raise ConnectionError('simulated network failure')
+
+    def closes(self, ticker):
+        """Full close series for a ticker."""
+        if self.recorded_tickers:
+            if ticker in self.recorded:
+                return self.recorded[ticker]
+            return self.recorded[self.recorded_tickers[zlib.crc32(ticker.encode()) % len(self.recorded_tickers)]]
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        walk = np.cumprod(1 + rng.normal(0.0003, 0.015, len(self.dates)))
+        return pd.Series(walk * rng.uniform(5, 500), index=self.dates)
+
+    def history_frame(self, ticker, period=None, start=None):
+        """OHLCV frame like yf.Ticker.history, with an exchange-local index."""
+        closes = self.closes(ticker)
+        if start is not None:
+            closes = closes[closes.index >= pd.Timestamp(start)]
+        elif period is not None and period != 'max':
+            closes = closes[closes.index >= pd.Timestamp(history_start(period, self.today.date()))]
+        values = closes.to_numpy()
+        frame = pd.DataFrame({'Open': values, 'High': values, 'Low': values, 'Close': values,
+                              'Volume': np.full(len(values), 1_000_000)},
+                             index=closes.index.rename('Date'))
+        frame.index = frame.index.tz_localize(EXCHANGE_TZ)
+        return frame
+
+    def download(self, tickers, period=None, start=None, group_by='ticker', **kwargs):
+        """yf.download replacement: one request for the whole batch."""
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        self.request()
+        frames = {ticker: self.history_frame(ticker, period=period, start=start) for ticker in tickers}
+        frames = {ticker: frame.tz_localize(None) for ticker, frame in frames.items() if not frame.empty}
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames.values(), axis=1, sort=True, keys=frames.keys(), names=['Ticker', 'Price'])
+        return data if group_by == 'ticker' else data.swaplevel(axis=1).sort_index(axis=1)
+
+    def Ticker(self, ticker):
+        return FakeTicker(self, ticker)
+
+    def info(self, ticker):
+        """Company profile like yf.Ticker.info."""
+        return {
+            'longBusinessSummary': f'{ticker} is a synthetic company used for offline runs.',
+            'industry': 'Synthetic Industry',
+            'sector': 'Synthetic Sector',
+            'shortName': ticker,
+            'longName': f'{ticker} Inc.',
+            'website': f'https://example.com/{ticker.lower()}',
+            'fullTimeEmployees': 100 + zlib.crc32(ticker.encode()) % 100000,
+            'city': 'Springfield',
+            'country': 'United States',
+        }
+
+    @contextmanager
+    def install(self):
+        """Patch yfinance.download and yfinance.Ticker for the duration of the block."""
+        saved = yf.download, yf.Ticker
+        yf.download, yf.Ticker = self.download, self.Ticker
+        try:
+            yield self
+        finally:
+            yf.download, yf.Ticker = saved
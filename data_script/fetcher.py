@@ -0,0 +1,321 @@
+"""
+Concurrent price fetching with an adaptive token-bucket rate limiter.
+
+yf.download keeps its per-call results in module-level globals, so two
+downloads running at once overwrite each other. Batches are therefore fetched
+ticker by ticker through yf.Ticker(...).history (which is what yf.download does
+internally) and reassembled into the same (Ticker, Price) column layout.
+
+Transient failures (errors, or throttling that outlasts a ticker's own
+retries) go to a retry queue: the failed tickers are split into smaller groups
+and retried with exponential backoff, and whatever still fails is reported
+back to the caller instead of being dropped.
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFRateLimitError, YFTickerMissingError
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """A ticker could not be fetched because of a transient failure (worth retrying)."""
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token bucket whose refill rate adapts to API health.
+
+    The rate grows additively after every healthy response and is cut
+    multiplicatively on throttling or errors (AIMD), bounded by min/max rate.
+
+    Args:
+        rate (float): Initial refill rate in requests per second
+        min_rate (float): Lower bound for the refill rate
+        max_rate (float): Upper bound for the refill rate
+        capacity (float): Maximum burst size in requests
+        increase (float): Rate added after each healthy response
+        throttle_factor (float): Rate multiplier applied on throttling
+        error_factor (float): Rate multiplier applied on other errors
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=10.0, capacity=5,
+                 increase=0.1, throttle_factor=0.5, error_factor=0.8):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity
+        self.increase = increase
+        self.throttle_factor = throttle_factor
+        self.error_factor = error_factor
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request token is available."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.throttle_factor)
+            self.tokens = 0  # drain the burst so in-flight workers back off too
+
+    def on_error(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * self.error_factor)
+
+
+class FetchStats:
+    """
+    Counters describing a fetch run, shared by all worker threads.
+
+    Args:
+        metrics (RunMetrics): Optional run metrics that also receive request
+            latencies, retries and per-batch records
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.started = time.monotonic()
+        self.finished = self.started
+        self.requests = 0
+        self.tickers = 0
+        self.throttled = 0
+        self.retries = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def add(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                setattr(self, key, getattr(self, key) + value)
+            self.finished = time.monotonic()
+        if self.metrics is not None:
+            for key, value in counts.items():
+                self.metrics.count(f'api_{key}', value)
+
+    def observe(self, seconds):
+        """Record the latency of one API request."""
+        if self.metrics is not None:
+            self.metrics.observe('api_request', seconds)
+
+    def batch(self, **fields):
+        """Record one completed batch."""
+        if self.metrics is not None:
+            self.metrics.record_batch(**fields)
+
+    def report(self, limiter):
+        """Return a one-line throughput summary."""
+        elapsed = max(self.finished - self.started, 1e-9)
+        return (f"Fetched {self.tickers} tickers in {self.requests} requests over {elapsed:.2f}s "
+                f"({self.tickers / elapsed:.2f} tickers/s); throttled {self.throttled}, retried {self.retries}, "
+                f"errors {self.errors}, final rate {limiter.rate:.2f} req/s.")
+
+
+def fetch_history(ticker, limiter, stats, retries=2, **options):
+    """
+    Fetch one ticker's history, retrying when throttled.
+
+    Args:
+        ticker (str): Ticker symbol
+        limiter (AdaptiveRateLimiter): Shared rate limiter
+        stats (FetchStats): Shared run counters
+        retries (int): Extra attempts after a throttled response
+        **options: Keyword arguments for yf.Ticker.history
+
+    Returns:
+        pd.DataFrame: Price history with a timezone-naive index (empty if the
+                      ticker has no data)
+
+    Raises:
+        FetchError: On errors, or when still throttled after all retries
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        stats.add(requests=1)
+        request_start = time.perf_counter()
+        try:
+            data = yf.Ticker(ticker).history(raise_errors=True, **options)
+        except YFRateLimitError:
+            stats.observe(time.perf_counter() - request_start)
+            stats.add(throttled=1)
+            if attempt < retries:
+                stats.add(retries=1)
+            limiter.on_throttle()
+            logger.warning(f"Rate limited fetching {ticker} (attempt {attempt + 1}/{retries + 1}).")
+            continue
+        except YFTickerMissingError as e:
+            stats.observe(time.perf_counter() - request_start)
+            # A healthy response that simply has no data (delisted, no bars in range)
+            limiter.on_success()
+            logger.error(f"No prices for {ticker}: {str(e)}")
+            return pd.DataFrame()
+        except Exception as e:
+            stats.observe(time.perf_counter() - request_start)
+            stats.add(errors=1)
+            limiter.on_error()
+            logger.warning(f"Error fetching {ticker}: {str(e)}")
+            raise FetchError(str(e)) from e
+        stats.observe(time.perf_counter() - request_start)
+        limiter.on_success()
+        if not data.empty:
+            data.index = data.index.tz_localize(None)
+        return data
+    stats.add(errors=1)
+    raise FetchError(f"still rate limited after {retries + 1} attempts")
+
+
+def fetch_batch(batch, limiter, stats, **options):
+    """
+    Fetch a batch of tickers.
+
+    Returns:
+        tuple: (frames, failed) where frames maps ticker -> non-empty history
+               and failed maps ticker -> error message for transient failures
+    """
+    api_start = time.time()
+    frames = {}
+    failed = {}
+    for ticker in batch:
+        try:
+            data = fetch_history(ticker, limiter, stats, **options)
+        except FetchError as e:
+            failed[ticker] = str(e)
+            continue
+        if not data.empty:
+            frames[ticker] = data
+    stats.add(tickers=len(batch))
+    elapsed = time.time() - api_start
+    stats.batch(tickers=len(batch), empty=len(batch) - len(frames) - len(failed), failed=len(failed),
+                seconds=round(elapsed, 4), first_ticker=batch[0])
+    logger.info(f"API request for batch {batch} completed in {elapsed:.2f} seconds.")
+    return frames, failed
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Exponential backoff with full jitter for the given retry attempt (1 = first retry)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def fetch_with_retries(batch, limiter, stats, retries=3, base_delay=2.0, max_delay=60.0, **options):
+    """
+    Fetch a batch, retrying transient failures in smaller groups.
+
+    Failed tickers are split in halves and requeued with exponential backoff,
+    so one bad ticker or a flaky moment costs a few extra requests for a few
+    tickers rather than the whole batch.
+
+    Args:
+        batch (list): Ticker symbols
+        limiter (AdaptiveRateLimiter): Shared rate limiter
+        stats (FetchStats): Shared run counters
+        retries (int): Retry rounds per ticker after the first attempt
+        base_delay (float): Backoff before the first retry, in seconds
+        max_delay (float): Upper bound of the backoff, in seconds
+        **options: Keyword arguments for yf.Ticker.history
+
+    Returns:
+        tuple: (data, failed) where data is a frame with (Ticker, Price)
+               MultiIndex columns, like yf.download(group_by='ticker'), and
+               failed maps ticker -> last error for tickers that failed every
+               attempt
+    """
+    frames = {}
+    failed = {}
+    queue = deque([(list(batch), 0, 0.0)])  # (tickers, attempt, not before)
+    while queue:
+        group, attempt, ready = queue.popleft()
+        wait = ready - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            group_frames, group_failed = fetch_batch(group, limiter, stats, **options)
+        except Exception as e:
+            group_frames, group_failed = {}, {ticker: str(e) for ticker in group}
+        frames.update(group_frames)
+        if not group_failed:
+            continue
+        retry = list(group_failed)
+        if attempt >= retries:
+            failed.update(group_failed)
+            logger.error(f"Giving up on {retry} after {attempt + 1} attempts.")
+            continue
+        stats.add(retries=len(retry))
+        ready = time.monotonic() + backoff_delay(attempt + 1, base_delay, max_delay)
+        logger.warning(f"Retrying {retry} (attempt {attempt + 2}/{retries + 1}).")
+        half = (len(retry) + 1) // 2
+        queue.extend((part, attempt + 1, ready) for part in (retry[:half], retry[half:]) if part)
+
+    # Keep the batch's ticker order
+    frames = {ticker: frames[ticker] for ticker in batch if ticker in frames}
+    if not frames:
+        return pd.DataFrame(), failed
+    return pd.concat(frames.values(), axis=1, sort=True, keys=frames.keys(), names=['Ticker', 'Price']), failed
+
+
+def fetch_batches(requests, limiter, max_workers=4, metrics=None, retries=3, base_delay=2.0, max_delay=60.0):
+    """
+    Fetch many batches concurrently.
+
+    Args:
+        requests (list): (batch, options) tuples, where options are keyword
+            arguments for yf.Ticker.history
+        limiter (AdaptiveRateLimiter): Shared rate limiter
+        max_workers (int): Number of batches fetched at once
+        metrics (RunMetrics): Optional run metrics to record latencies and batches in
+        retries, base_delay, max_delay: Retry policy, see fetch_with_retries
+
+    Requests are submitted lazily and at most 2 * max_workers results are
+    held at a time, so a slow consumer keeps memory flat instead of letting
+    fetched frames pile up.
+
+    Yields:
+        tuple: (data, failed) per request, in request order, as returned by
+               fetch_with_retries
+    """
+    stats = FetchStats(metrics)
+
+    def run(request):
+        batch, options = request
+        return fetch_with_retries(batch, limiter, stats, retries=retries, base_delay=base_delay,
+                                  max_delay=max_delay, **options)
+
+    window = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for request in requests:
+            pending.append(executor.submit(run, request))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    report = stats.report(limiter)
+    print(report)
+    logger.info(report)
@@ -0,0 +1,151 @@
+"""
+Persistent store of the workbook's fundamentals rows, keyed by ticker and year.
+
+Fundamentals change a few times a year while the pipeline runs several times
+a day. Every run diffs the workbook against the stored rows, so only the
+tickers whose rows changed are marked dirty. The store also keeps the last
+universe scores, and a set of tickers whose published files are stale
+(fundamentals or scores changed, or prices were refreshed without rebuilding
+the JSON) so a --fundamentals-only run can rebuild just those.
+"""
+
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+import logging
+
+from .ingest import SOURCE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+def _row_hashes(df):
+    """
+    Serialize and hash the source columns of a sheet, grouped by ticker.
+
+    Returns:
+        dict: Ticker -> (sha256, JSON of the ticker's rows in sheet order)
+    """
+    df = df[df['ticker'].notna()]
+    columns = [column for column in SOURCE_COLUMNS if column in df.columns]
+    values = df[columns].astype(object)
+    values = values.where(values.notna(), None)
+    rows = {}
+    for row in values.to_dict('records'):
+        rows.setdefault(row['ticker'], []).append(row)
+    hashed = {}
+    for ticker, ticker_rows in rows.items():
+        data = json.dumps(ticker_rows, sort_keys=True, default=str)
+        hashed[ticker] = (hashlib.sha256(data.encode('utf-8')).hexdigest(), data)
+    return hashed
+
+
+class FundamentalsStore:
+    """
+    SQLite-backed store of fundamentals rows and derived state.
+
+    Args:
+        path (str): Path to the SQLite database file (created if missing)
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fundamentals (
+                ticker TEXT NOT NULL,
+                year TEXT NOT NULL,
+                row_hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (ticker, year)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stale_outputs (
+                ticker TEXT PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value BLOB
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def sync(self, sheets, years, dry_run=False):
+        """
+        Diff the workbook against the stored rows and store the new version.
+
+        A ticker is dirty when any of its rows was added, changed or removed
+        in any year sheet (a year sheet that disappeared removes its rows).
+        Dirty tickers are also marked stale.
+
+        Args:
+            sheets (dict): Sheet name -> DataFrame, as returned by read_workbook
+            years (list): Year sheets to compare
+            dry_run (bool): Compute the dirty set without writing anything
+
+        Returns:
+            set: Dirty tickers
+        """
+        stored = {}
+        for ticker, year, row_hash in self.conn.execute("SELECT ticker, year, row_hash FROM fundamentals"):
+            stored[(ticker, year)] = row_hash
+
+        dirty = set()
+        upserts = []
+        for year in years:
+            for ticker, (row_hash, data) in _row_hashes(sheets[year]).items():
+                previous = stored.pop((ticker, year), None)
+                if previous != row_hash:
+                    dirty.add(ticker)
+                    upserts.append((ticker, year, row_hash, data))
+        # Whatever is left is no longer in the workbook
+        removed = list(stored)
+        dirty.update(ticker for ticker, _ in removed)
+
+        logger.info(f"Fundamentals store: {len(upserts)} rows added or changed, {len(removed)} removed, "
+                    f"{len(dirty)} dirty tickers.")
+        if dry_run:
+            return dirty
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (ticker, year, row_hash, data) VALUES (?, ?, ?, ?)", upserts)
+            self.conn.executemany("DELETE FROM fundamentals WHERE ticker = ? AND year = ?", removed)
+            self.conn.executemany("INSERT OR IGNORE INTO stale_outputs (ticker) VALUES (?)",
+                                  [(ticker,) for ticker in dirty])
+        return dirty
+
+    def load_scores(self, years):
+        """Scores saved by save_scores for the same years, or None."""
+        row = self.conn.execute("SELECT value FROM state WHERE key = 'scores'").fetchone()
+        if row is None:
+            return None
+        try:
+            saved_years, scores = pickle.loads(row[0])
+        except Exception as e:
+            logger.error(f"Could not load stored scores: {str(e)}")
+            return None
+        return scores if saved_years == list(years) else None
+
+    def save_scores(self, years, scores):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('scores', ?)",
+                              (pickle.dumps((list(years), scores), protocol=pickle.HIGHEST_PROTOCOL),))
+
+    def stale(self):
+        """Tickers whose published files are out of date."""
+        return {ticker for ticker, in self.conn.execute("SELECT ticker FROM stale_outputs")}
+
+    def mark_stale(self, tickers):
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO stale_outputs (ticker) VALUES (?)",
+                                  [(ticker,) for ticker in tickers])
+
+    def clear_stale(self, tickers):
+        """Mark tickers as published (call after their files were committed)."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM stale_outputs WHERE ticker = ?", [(ticker,) for ticker in tickers])
@@ -1,12 +1,27 @@
 """
 Script to fetch company descriptions from Yahoo Finance and update CSV file.
+
+Run from the repository root: python -m data_script.get_description
+(python data_script/get_description.py works too).
 """
 
+import os
+import sys
+import json
 import pandas as pd
 import yfinance as yf
 import time
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from yfinance.exceptions import YFRateLimitError
+
+if __package__:
+    from .fetcher import AdaptiveRateLimiter
+else:
+    # Started as python data_script/get_description.py: go through the package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from data_script.fetcher import AdaptiveRateLimiter
 
 # Setup logging
 logging.basicConfig(
@@ -19,108 +34,229 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_company_descriptions_batch(tickers):
+INFO_FIELDS = [
+    'longBusinessSummary', 'industry', 'sector', 'shortName',
+    'longName', 'website', 'fullTimeEmployees', 'city',
+    'state', 'country'
+]
+COLUMNS = INFO_FIELDS + ['shortDescription']
+
+
+def _error_result(error_msg):
+    return {field: error_msg for field in COLUMNS}
+
+
+def _is_error_result(result):
+    text = str(result.get('longBusinessSummary', ''))
+    return text.startswith('Error:') or text.startswith('No ')
+
+
+def build_company_info(ticker, info):
     """
-    Fetch company descriptions and key info for a batch of tickers from Yahoo Finance.
-    
+    Extract the CSV fields from a yfinance info dict.
+
     Args:
-        tickers (list): List of stock ticker symbols
-        
+        ticker (str): Stock ticker symbol
+        info (dict): yf.Ticker(ticker).info
+
     Returns:
-        dict: Dictionary with ticker as key and dict of company info as value
-              Format: {ticker: {'longBusinessSummary': str, 'industry': str, 'sector': str, ...}}
+        dict: Company info keyed by the CSV column names
     """
-    results = {}
-    
-    for ticker in tickers:
+    # Extract all relevant company information
+    ticker_result = {field: info.get(field, 'Not available') for field in INFO_FIELDS}
+
+    # Create a short description from available fields
+    short_description_parts = []
+    if ticker_result['industry'] != 'Not available':
+        short_description_parts.append(f"Industry: {ticker_result['industry']}")
+    if ticker_result['sector'] != 'Not available':
+        short_description_parts.append(f"Sector: {ticker_result['sector']}")
+    if ticker_result['fullTimeEmployees'] != 'Not available':
+        short_description_parts.append(f"Employees: {ticker_result['fullTimeEmployees']:,}")
+
+    location_parts = []
+    if ticker_result['city'] != 'Not available':
+        location_parts.append(ticker_result['city'])
+    if ticker_result['state'] != 'Not available':
+        location_parts.append(ticker_result['state'])
+    if ticker_result['country'] != 'Not available':
+        location_parts.append(ticker_result['country'])
+
+    if location_parts:
+        short_description_parts.append(f"Location: {', '.join(location_parts)}")
+
+    # Combine into a short description
+    ticker_result['shortDescription'] = '; '.join(short_description_parts) if short_description_parts else 'Limited information available'
+
+    # Check if we got any meaningful data
+    meaningful_data = any(value != 'Not available' for key, value in ticker_result.items() if key != 'shortDescription')
+
+    if not meaningful_data:
+        error_msg = f"No company information available for {ticker}"
+        print(f"Warning: {error_msg}")
+        return _error_result(error_msg)
+
+    available_fields = [key for key, value in ticker_result.items() if value != 'Not available']
+    print(f"✓ Successfully fetched {len(available_fields)} fields for {ticker}: {', '.join(available_fields[:3])}...")
+    return ticker_result
+
+
+def fetch_company_info(ticker, limiter=None, retries=2):
+    """
+    Fetch company info for one ticker, retrying when throttled.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        limiter (AdaptiveRateLimiter): Shared rate limiter (optional)
+        retries (int): Extra attempts after a throttled response
+
+    Returns:
+        dict: Company info keyed by the CSV column names; every field holds
+              the error message if the fetch failed
+    """
+    error_msg = "Error: rate limited"
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
         try:
             print(f"Fetching company info for {ticker}...")
-            
-            # Create yfinance ticker object
-            stock = yf.Ticker(ticker)
-            
-            # Get company info
-            info = stock.info
-            
-            # Extract all relevant company information
-            ticker_result = {
-                'longBusinessSummary': info.get('longBusinessSummary', 'Not available'),
-                'industry': info.get('industry', 'Not available'),
-                'sector': info.get('sector', 'Not available'),
-                'shortName': info.get('shortName', 'Not available'),
-                'longName': info.get('longName', 'Not available'),
-                'website': info.get('website', 'Not available'),
-                'fullTimeEmployees': info.get('fullTimeEmployees', 'Not available'),
-                'city': info.get('city', 'Not available'),
-                'state': info.get('state', 'Not available'),
-                'country': info.get('country', 'Not available')
-            }
-            
-            # Create a short description from available fields
-            short_description_parts = []
-            if ticker_result['industry'] != 'Not available':
-                short_description_parts.append(f"Industry: {ticker_result['industry']}")
-            if ticker_result['sector'] != 'Not available':
-                short_description_parts.append(f"Sector: {ticker_result['sector']}")
-            if ticker_result['fullTimeEmployees'] != 'Not available':
-                short_description_parts.append(f"Employees: {ticker_result['fullTimeEmployees']:,}")
-            
-            location_parts = []
-            if ticker_result['city'] != 'Not available':
-                location_parts.append(ticker_result['city'])
-            if ticker_result['state'] != 'Not available':
-                location_parts.append(ticker_result['state'])
-            if ticker_result['country'] != 'Not available':
-                location_parts.append(ticker_result['country'])
-            
-            if location_parts:
-                short_description_parts.append(f"Location: {', '.join(location_parts)}")
-            
-            # Combine into a short description
-            ticker_result['shortDescription'] = '; '.join(short_description_parts) if short_description_parts else 'Limited information available'
-            
-            # Check if we got any meaningful data
-            meaningful_data = any(value != 'Not available' for key, value in ticker_result.items() if key != 'shortDescription')
-            
-            if not meaningful_data:
-                error_msg = f"No company information available for {ticker}"
-                print(f"Warning: {error_msg}")
-                ticker_result = {field: error_msg for field in ticker_result.keys()}
-            else:
-                available_fields = [key for key, value in ticker_result.items() if value != 'Not available']
-                print(f"✓ Successfully fetched {len(available_fields)} fields for {ticker}: {', '.join(available_fields[:3])}...")
-            
-            results[ticker] = ticker_result
-                
+            info = yf.Ticker(ticker).info
+        except YFRateLimitError:
+            if limiter is not None:
+                limiter.on_throttle()
+            logger.warning(f"Rate limited fetching company info for {ticker} (attempt {attempt + 1}/{retries + 1}).")
+            continue
         except Exception as e:
-            error_msg = f"Error: {str(e)}"
+            if limiter is not None:
+                limiter.on_error()
             print(f"Error fetching company info for {ticker}: {str(e)}")
             logger.error(f"Error fetching company info for {ticker}: {str(e)}")
-            results[ticker] = {
-                'longBusinessSummary': error_msg,
-                'industry': error_msg,
-                'sector': error_msg,
-                'shortName': error_msg,
-                'longName': error_msg,
-                'website': error_msg,
-                'fullTimeEmployees': error_msg,
-                'city': error_msg,
-                'state': error_msg,
-                'country': error_msg,
-                'shortDescription': error_msg
-            }
-    
-    return results
+            return _error_result(f"Error: {str(e)}")
+        if limiter is not None:
+            limiter.on_success()
+        return build_company_info(ticker, info or {})
+    logger.error(f"Error fetching company info for {ticker}: {error_msg}")
+    return _error_result(error_msg)
+
+
+def get_company_descriptions_batch(tickers, limiter=None, max_workers=1):
+    """
+    Fetch company descriptions and key info for a batch of tickers from Yahoo Finance.
+
+    Args:
+        tickers (list): List of stock ticker symbols
+        limiter (AdaptiveRateLimiter): Shared rate limiter (optional)
+        max_workers (int): Number of tickers fetched at once
 
-def process_tickers_csv(input_file_path, output_file_path=None, batch_size=30, delay=3):
+    Returns:
+        dict: Dictionary with ticker as key and dict of company info as value
+              Format: {ticker: {'longBusinessSummary': str, 'industry': str, 'sector': str, ...}}
+    """
+    if max_workers <= 1:
+        return {ticker: fetch_company_info(ticker, limiter) for ticker in tickers}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(tickers, executor.map(lambda t: fetch_company_info(t, limiter), tickers)))
+
+
+class DescriptionCache:
+    """
+    Persistent cache of fetched company info with an append-only journal.
+
+    The cache file is a JSON object {ticker: {'fetched_at': epoch seconds,
+    'result': {...}}}. Every fetch is appended to the journal as one JSON line
+    and flushed immediately, so an interrupted run loses nothing; the journal
+    is replayed on start and folded into the cache file by save(). Use it as
+    a context manager so the journal is closed however the run ends.
+
+    Args:
+        cache_file (str): Path of the cache JSON file
+        journal_file (str): Path of the JSON-lines journal
+        ttl_days (float): Age after which a successful entry is refetched
+    """
+
+    def __init__(self, cache_file, journal_file, ttl_days=30):
+        self.cache_file = Path(cache_file)
+        self.journal_file = Path(journal_file)
+        self.ttl = ttl_days * 86400
+        self.entries = {}
+        if self.cache_file.exists():
+            try:
+                self.entries = json.loads(self.cache_file.read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read description cache {self.cache_file}: {str(e)}")
+        replayed = 0
+        if self.journal_file.exists():
+            with open(self.journal_file, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from an interrupted write
+                    self.entries[record['ticker']] = {'fetched_at': record['fetched_at'], 'result': record['result']}
+                    replayed += 1
+        if replayed:
+            print(f"Replayed {replayed} journaled results from an interrupted run")
+            logger.info(f"Replayed {replayed} journaled results from {self.journal_file}")
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        self.journal = open(self.journal_file, 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the journal; unsaved entries stay in it for the next run."""
+        if not self.journal.closed:
+            self.journal.close()
+
+    def get(self, ticker, now=None):
+        """Return the cached result if it is fresh and not an error, else None."""
+        entry = self.entries.get(ticker)
+        if entry is None or _is_error_result(entry['result']):
+            return None
+        if (now or time.time()) - entry['fetched_at'] > self.ttl:
+            return None
+        return entry['result']
+
+    def put(self, ticker, result):
+        """Record a fetch result and checkpoint it to the journal."""
+        entry = {'fetched_at': time.time(), 'result': result}
+        self.entries[ticker] = entry
+        self.journal.write(json.dumps({'ticker': ticker, **entry}) + '\n')
+        self.journal.flush()
+
+    def save(self):
+        """Write the cache file atomically and truncate the journal."""
+        self.close()
+        tmp_path = self.cache_file.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.entries), encoding='utf-8')
+        os.replace(tmp_path, self.cache_file)
+        self.journal_file.unlink(missing_ok=True)
+
+
+def process_tickers_csv(input_file_path, output_file_path=None, batch_size=30, delay=3,
+                        max_workers=1, rate=None, cache_file=None, journal_file=None, cache_ttl_days=30):
     """
     Process CSV file with tickers and add descriptions using batching.
+
+    Rows with missing data are fetched, and so are complete rows whose cached
+    response is older than cache_ttl_days (or that were never fetched into the
+    cache). With max_workers > 1 each batch is fetched concurrently. Results
+    are checkpointed to the journal as they arrive and the CSV is written once
+    at the end, so an interrupted run resumes from the journal on the next start.
     
     Args:
         input_file_path (str): Path to input CSV file with tickers
         output_file_path (str): Path to output CSV file (optional)
         batch_size (int): Number of tickers to process per batch
-        delay (float): Delay between batches in seconds
+        delay (float): Delay between batches in seconds (only without a rate limit)
+        max_workers (int): Number of tickers fetched at once
+        rate (float): Initial requests per second for the adaptive rate limiter (optional)
+        cache_file (str): Response cache path (defaults to cache/descriptions.json next to the input)
+        journal_file (str): Checkpoint journal path (defaults to the cache path with .journal.jsonl)
+        cache_ttl_days (float): Age after which cached responses are refetched
     """
     try:
         # Read the CSV file
@@ -131,99 +267,115 @@ def process_tickers_csv(input_file_path, output_file_path=None, batch_size=30, d
             raise ValueError("CSV file must contain a 'ticker' column")
         
         # Add all company info columns if they don't exist
-        columns_to_add = [
-            'longBusinessSummary', 'industry', 'sector', 'shortName', 
-            'longName', 'website', 'fullTimeEmployees', 'city', 
-            'state', 'country', 'shortDescription'
-        ]
-        
-        for column in columns_to_add:
+        for column in COLUMNS:
             if column not in df.columns:
                 df[column] = ''
         
         print(f"Processing {len(df)} tickers in batches of {batch_size}...")
         logger.info(f"Processing {len(df)} tickers in batches of {batch_size}...")
         
-        # Get tickers that need processing (empty or missing descriptions)
-        tickers_to_process = []
-        ticker_indices = {}
-        
-        for index, row in df.iterrows():
-            ticker = row['ticker']
-            
-            # Check if the row already has sufficient data
-            columns_to_check = ['longBusinessSummary', 'industry', 'sector', 'shortDescription']
-            missing_data = False
-            
-            for col in columns_to_check:
-                existing_value = row.get(col, '')
-                if (pd.isna(existing_value) or 
-                    not str(existing_value).strip() or 
-                    str(existing_value).startswith('Error:') or
-                    str(existing_value).startswith('No ') or
-                    str(existing_value) == 'Not available'):
-                    missing_data = True
-                    break
-            
-            if not missing_data:
-                print(f"Skipping {ticker} - company information already exists")
-                continue
-            
-            tickers_to_process.append(ticker)
-            ticker_indices[ticker] = index
-        
-        if not tickers_to_process:
-            print("All tickers already have complete company information!")
-            logger.info("All tickers already have complete company information!")
-            return
-        
-        print(f"Found {len(tickers_to_process)} tickers that need descriptions")
-        
-        # Process tickers in batches
-        total_batches = (len(tickers_to_process) + batch_size - 1) // batch_size
-        
-        for batch_num in range(total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = min(start_idx + batch_size, len(tickers_to_process))
-            batch_tickers = tickers_to_process[start_idx:end_idx]
-            
-            print(f"\n--- Processing Batch {batch_num + 1}/{total_batches} ---")
-            print(f"Tickers in this batch: {', '.join(batch_tickers)}")
-            
-            # Get descriptions for the batch
-            batch_results = get_company_descriptions_batch(batch_tickers)
-            
-            # Update dataframe with results
-            for ticker, company_info in batch_results.items():
-                if ticker in ticker_indices:
-                    row_idx = ticker_indices[ticker]
-                    for field, value in company_info.items():
-                        df.at[row_idx, field] = value
-            
-            # Save progress after each batch
-            if output_file_path is None:
-                output_file_path = input_file_path
-            
-            df.to_csv(output_file_path, index=False)
-            print(f"✓ Batch {batch_num + 1} completed and saved")
-            
-            # Add delay between batches (except for the last batch)
-            if batch_num < total_batches - 1:
-                print(f"Waiting {delay} seconds before next batch...")
-                time.sleep(delay)
+        if output_file_path is None:
+            output_file_path = input_file_path
+        if cache_file is None:
+            cache_file = Path(input_file_path).parent / 'cache' / 'descriptions.json'
+        if journal_file is None:
+            journal_file = Path(cache_file).with_suffix('.journal.jsonl')
+        with DescriptionCache(cache_file, journal_file, ttl_days=cache_ttl_days) as cache:
+            # Rows with missing data are processed, and so are complete rows
+            # whose cached response is older than the TTL (or was never cached)
+            tickers_to_process = []
+            ticker_indices = {}
+            results = {}
+            to_fetch = []
+            for index, row in df.iterrows():
+                ticker = row['ticker']
+
+                # Check if the row already has sufficient data
+                columns_to_check = ['longBusinessSummary', 'industry', 'sector', 'shortDescription']
+                missing_data = False
+
+                for col in columns_to_check:
+                    existing_value = row.get(col, '')
+                    if (pd.isna(existing_value) or
+                        not str(existing_value).strip() or
+                        str(existing_value).startswith('Error:') or
+                        str(existing_value).startswith('No ') or
+                        str(existing_value) == 'Not available'):
+                        missing_data = True
+                        break
+
+                cached = cache.get(ticker)
+                if not missing_data and cached is not None:
+                    print(f"Skipping {ticker} - company information is up to date")
+                    continue
+
+                tickers_to_process.append(ticker)
+                ticker_indices[ticker] = index
+                # Fresh cached responses are reused; stale and errored ones are refetched
+                if cached is not None:
+                    results[ticker] = cached
+                else:
+                    to_fetch.append(ticker)
+
+            if not tickers_to_process:
+                print("All tickers already have complete, up-to-date company information!")
+                logger.info("All tickers already have complete, up-to-date company information!")
+                return
+
+            print(f"Found {len(tickers_to_process)} tickers that need descriptions")
+            print(f"Using {len(results)} cached results, fetching {len(to_fetch)} tickers")
+            logger.info(f"Using {len(results)} cached results, fetching {len(to_fetch)} tickers")
+            limiter = AdaptiveRateLimiter(rate=rate) if rate else None
+
+            # Process tickers in batches
+            total_batches = (len(to_fetch) + batch_size - 1) // batch_size
+
+            for batch_num in range(total_batches):
+                start_idx = batch_num * batch_size
+                end_idx = min(start_idx + batch_size, len(to_fetch))
+                batch_tickers = to_fetch[start_idx:end_idx]
+
+                print(f"\n--- Processing Batch {batch_num + 1}/{total_batches} ---")
+                print(f"Tickers in this batch: {', '.join(batch_tickers)}")
+
+                # Get descriptions for the batch
+                batch_results = get_company_descriptions_batch(batch_tickers, limiter, max_workers)
+
+                # Checkpoint the batch to the journal
+                for ticker, company_info in batch_results.items():
+                    cache.put(ticker, company_info)
+                results.update(batch_results)
+                print(f"✓ Batch {batch_num + 1} completed and checkpointed")
+
+                # Add delay between batches (except for the last batch)
+                if limiter is None and batch_num < total_batches - 1:
+                    print(f"Waiting {delay} seconds before next batch...")
+                    time.sleep(delay)
+
+            # Merge all results into the dataframe and write the CSV once
+            for ticker, company_info in results.items():
+                row_idx = ticker_indices[ticker]
+                for field, value in company_info.items():
+                    df.at[row_idx, field] = value
+            tmp_path = f"{output_file_path}.tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, output_file_path)
+            cache.save()
         
         print(f"\n✓ Successfully saved all results to {output_file_path}")
         logger.info(f"Successfully saved results to {output_file_path}")
         
         # Print summary
-        successful_long_descriptions = df[
-            ~df['longBusinessSummary'].str.contains('Error:|No |Not available', case=False, na=False)
+        # Counted over the processed rows, like total_processed
+        processed = df.loc[list(ticker_indices.values())]
+        successful_long_descriptions = processed[
+            ~processed['longBusinessSummary'].astype(str).str.contains('Error:|No |Not available', case=False, na=False)
         ].shape[0]
-        successful_short_descriptions = df[
-            ~df['shortDescription'].str.contains('Error:|No |Not available|Limited information', case=False, na=False)
+        successful_short_descriptions = processed[
+            ~processed['shortDescription'].astype(str).str.contains('Error:|No |Not available|Limited information', case=False, na=False)
         ].shape[0]
-        successful_industry = df[
-            ~df['industry'].str.contains('Error:|No |Not available', case=False, na=False)
+        successful_industry = processed[
+            ~processed['industry'].astype(str).str.contains('Error:|No |Not available', case=False, na=False)
         ].shape[0]
         total_processed = len(tickers_to_process)
         
@@ -261,8 +413,10 @@ def main():
     # Process the CSV file with batching
     process_tickers_csv(
         input_file_path=str(input_file),
-        batch_size=30,  # 30 tickers per batch
-        delay=3  # 3 second delay between batches
+        batch_size=30,  # 30 tickers per journal checkpoint
+        max_workers=4,  # concurrent requests
+        rate=2.0,  # initial requests per second, adapted to throttling
+        cache_ttl_days=30  # refetch cached responses older than this
     )
     
     print("Description fetch completed!")
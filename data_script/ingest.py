@@ -0,0 +1,190 @@
+"""
+Read the fundamentals workbook into per-company records.
+
+Parsing input.xlsx with openpyxl is the slowest part of ingestion, so the
+parsed sheets are cached in a pickle keyed by the workbook's mtime and SHA-256.
+Records are then built from whole columns instead of iterating DataFrame rows,
+either for the whole universe or one batch of tickers at a time.
+"""
+
+import os
+import re
+import pickle
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAMES = [
+    'FCF yield', 'NOPAT', 'ROIC', 'ReinvRate', 'D/E', 'ICR', 'OMS', 'EV/OCF', 'EVA/InvCap'
+]
+# Every sheet column the pipeline reads; other columns do not affect the outputs
+SOURCE_COLUMNS = (['ticker', 'Company', 'Primary Sector', 'Description', 'DCF value', 'Exit multiple value', 'MarketCap']
+                  + METRIC_NAMES + [metric + ' Evaluation' for metric in METRIC_NAMES])
+YEAR_SHEET = re.compile(r'\d{4}')
+
+
+def workbook_years(excel_file):
+    """
+    Find the year sheets of the workbook.
+
+    Returns:
+        list: Sheet names that are four-digit years, in chronological order
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_file, read_only=True)
+    try:
+        return sorted(name for name in workbook.sheetnames if YEAR_SHEET.fullmatch(name))
+    finally:
+        workbook.close()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_workbook(excel_file, sheets, cache_file):
+    """
+    Read sheets from the workbook, reusing the parsed cache when it is unchanged.
+
+    The mtime is checked first; if it differs (e.g. after a fresh checkout) the
+    file hash decides whether the cached sheets are still valid. The cache also
+    records the workbook's year sheets, so with sheets=None an unchanged
+    workbook is not opened at all.
+
+    Args:
+        excel_file (str): Path to the workbook
+        sheets (list): Sheet names to read, or None for every year sheet (see workbook_years)
+        cache_file (str): Path to the pickle cache
+
+    Returns:
+        dict: Sheet name -> DataFrame, in the order of sheets (chronological for None)
+    """
+    mtime = os.path.getmtime(excel_file)
+    cache = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Could not read workbook cache {cache_file}: {str(e)}")
+
+    wanted = sheets if sheets is not None else cache and cache.get('years')
+    if cache and wanted is not None and all(sheet in cache['sheets'] for sheet in wanted):
+        if cache['mtime'] == mtime:
+            logger.info(f"Workbook unchanged (mtime); using cached sheets from {cache_file}.")
+            return {sheet: cache['sheets'][sheet] for sheet in wanted}
+        digest = _sha256(excel_file)
+        if cache['sha256'] == digest:
+            logger.info(f"Workbook unchanged (hash); using cached sheets from {cache_file}.")
+            cache['mtime'] = mtime
+            _write_cache(cache_file, cache)
+            return {sheet: cache['sheets'][sheet] for sheet in wanted}
+    else:
+        digest = _sha256(excel_file)
+
+    years = workbook_years(excel_file)
+    wanted = years if sheets is None else sheets
+    logger.info(f"Parsing workbook {excel_file} sheets {list(wanted)}.")
+    parsed = pd.read_excel(excel_file, sheet_name=list(wanted))
+    _write_cache(cache_file, {'mtime': mtime, 'sha256': digest, 'years': years, 'sheets': parsed})
+    return {sheet: parsed[sheet] for sheet in wanted}
+
+
+def _write_cache(cache_file, cache):
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+    tmp_path = cache_file + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_file)
+
+
+def _column(df, name):
+    """Return a column as a list with NaN/missing values replaced by ""."""
+    if name not in df.columns:
+        return [""] * len(df)
+    values = df[name].to_numpy(dtype=object)
+    return np.where(pd.isna(values), "", values).tolist()
+
+
+def list_companies(sheets, years):
+    """
+    List the workbook's companies without building their records.
+
+    Args:
+        sheets (dict): Sheet name -> DataFrame, as returned by read_workbook
+        years (list): Sheet names in chronological order
+
+    Returns:
+        dict: Ticker -> sector, in the same order as build_company_data
+    """
+    companies = {}
+    for year in years:
+        df = sheets[year]
+        df = df[df['ticker'].notna()]
+        for ticker, sector in zip(df['ticker'].tolist(), _column(df, 'Primary Sector')):
+            companies.setdefault(ticker, sector)
+    return companies
+
+
+def build_company_data(sheets, years, tickers=None):
+    """
+    Build per-company records from the year sheets.
+
+    Args:
+        sheets (dict): Sheet name -> DataFrame, as returned by read_workbook
+        years (list): Sheet names in chronological order
+        tickers (list): Only build these tickers (e.g. one batch); None for all
+
+    Returns:
+        dict: Ticker -> {'Company', 'Ticker', 'Sector', 'Description', 'Years': [...]}
+              with one 'Years' entry per sheet row, in sheet order
+    """
+    company_data = {}
+    for year in years:
+        df = sheets[year]
+        # One mask, so a batch never copies the whole sheet
+        df = df[df['ticker'].notna() if tickers is None else df['ticker'].isin(tickers)]
+
+        values = [_column(df, metric) for metric in METRIC_NAMES]
+        evaluations = [_column(df, metric + ' Evaluation') for metric in METRIC_NAMES]
+        performance = [
+            {metric: {'Value': v, 'Evaluation': e} for metric, v, e in zip(METRIC_NAMES, row_values, row_evals)}
+            for row_values, row_evals in zip(zip(*values), zip(*evaluations))
+        ]
+
+        columns = zip(
+            df['ticker'].tolist(),
+            _column(df, 'Company'),
+            _column(df, 'Primary Sector'),
+            _column(df, 'Description'),
+            _column(df, 'DCF value'),
+            _column(df, 'Exit multiple value'),
+            _column(df, 'MarketCap'),
+            performance,
+        )
+        for ticker, company, sector, description, dcf, exit_multiple, market_cap, metrics in columns:
+            if ticker not in company_data:
+                company_data[ticker] = {
+                    'Company': company,
+                    'Ticker': ticker,
+                    'Sector': sector,
+                    'Description': description,
+                    'Years': []
+                }
+            company_data[ticker]['Years'].append({
+                'Year': year,
+                'DCFValue': dcf,
+                'ExitMultipleValue': exit_multiple,
+                'MarketCap': market_cap,
+                'PerformanceMetrics': metrics
+            })
+    return company_data
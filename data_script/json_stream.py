@@ -0,0 +1,114 @@
+"""
+Incremental reading and writing of large JSON arrays.
+
+companies.json holds one record per company, so for very large universes it
+is written one record at a time and read back the same way instead of going
+through a full list in memory. JsonArrayWriter produces exactly the bytes of
+json.dumps(records, indent=4, default=str), so the published file (and its
+hash) does not depend on whether it was streamed.
+
+    with open(path, 'w') as f:
+        writer = JsonArrayWriter(f)
+        for record in records:
+            writer.write(record)
+        writer.close()
+
+    with open(path) as f:
+        for record in iter_json_array(f):
+            ...
+"""
+
+import json
+
+WHITESPACE = ' \t\r\n'
+
+
+class JsonArrayWriter:
+    """
+    Write a JSON array to a text stream one element at a time.
+
+    Args:
+        stream: Object with a write(str) method
+        indent (int): Indentation, as for json.dumps
+    """
+
+    def __init__(self, stream, indent=4):
+        self.stream = stream
+        self.indent = indent
+        self.prefix = ' ' * indent
+        self.count = 0
+
+    def write(self, value):
+        text = json.dumps(value, indent=self.indent, default=str)
+        self.stream.write(('[\n' if not self.count else ',\n') + self.prefix + text.replace('\n', '\n' + self.prefix))
+        self.count += 1
+
+    def close(self):
+        """Terminate the array (does not close the stream)."""
+        self.stream.write('\n]' if self.count else '[]')
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    Yield the elements of the JSON array in a text file without loading all of it.
+
+    Args:
+        f: Text file positioned at the start of the array
+        chunk_size (int): Characters read at a time
+
+    Yields:
+        Each decoded element, in order
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+
+    def read_more():
+        nonlocal buffer, pos
+        chunk = f.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return bool(chunk)
+
+    def peek():
+        """Next non-whitespace character, reading as needed."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                raise ValueError('unexpected end of JSON array')
+
+    if peek() != '[':
+        raise ValueError('expected a JSON array')
+    pos += 1
+    if peek() == ']':
+        return
+    while True:
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element cut off at the end of the buffer
+                if not read_more():
+                    raise
+                continue
+            # A number is only complete once a delimiter follows it
+            if isinstance(value, (int, float)) and (end == len(buffer) or buffer[end] not in ',]' + WHITESPACE) \
+                    and read_more():
+                continue
+            break
+        pos = end
+        yield value
+        separator = peek()
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f'expected "," or "]" in JSON array, got {separator!r}')
@@ -0,0 +1,180 @@
+"""
+Structured run metrics for the data pipeline.
+
+RunMetrics collects wall-clock time per stage, counters, latency samples,
+per-batch records, per-file output sizes and tickers with missing prices,
+then writes them as one JSON report (and optionally appends a compact line to
+a JSON-lines history file so scheduled runs can be compared over time).
+
+    metrics = RunMetrics()
+    with metrics.stage('read_excel'):
+        ...
+    metrics.count('tickers', len(tickers))
+    metrics.write('data_script/logs/run_metrics.json', 'data_script/logs/run_metrics_history.jsonl')
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def summarize_samples(samples):
+    """Count, mean, max and percentiles of a list of seconds."""
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples, dtype=float)
+    summary = {'count': len(values), 'mean': round(float(values.mean()), 4), 'max': round(float(values.max()), 4)}
+    for pct, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{pct}'] = round(float(value), 4)
+    return summary
+
+
+class RunMetrics:
+    """
+    Thread-safe collector of timers and counters for one pipeline run.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.samples = {}
+        self.batches = []
+        self.files = {}
+        self.tickers = {}
+        self.context = {}
+        self.lock = threading.Lock()
+
+    def set_context(self, **fields):
+        """Record run options (mode, selection) alongside the measurements."""
+        self.context.update(fields)
+
+    @contextmanager
+    def stage(self, name):
+        """Add the time spent in the block to the named stage (stages may repeat)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        """Add seconds measured elsewhere (e.g. in a worker process) to a stage."""
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one latency sample."""
+        with self.lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def record_batch(self, **fields):
+        with self.lock:
+            self.batches.append(fields)
+
+    def record_file(self, relpath, size):
+        """Record the serialized size in bytes of an output file."""
+        with self.lock:
+            self.files[relpath] = size
+
+    def flag_ticker(self, kind, ticker):
+        """Record a ticker with a data problem, e.g. kind='empty_prices'."""
+        with self.lock:
+            self.tickers.setdefault(kind, []).append(ticker)
+
+    def report(self):
+        """
+        Build the metrics report.
+
+        Returns:
+            dict: JSON-serializable report
+        """
+        with self.lock:
+            file_sizes = sorted(self.files.values())
+            by_dir = {}
+            for relpath, size in self.files.items():
+                directory = relpath.rsplit('/', 1)[0] if '/' in relpath else '.'
+                entry = by_dir.setdefault(directory, {'files': 0, 'bytes': 0})
+                entry['files'] += 1
+                entry['bytes'] += size
+            return {
+                'started': self.started_at.isoformat(timespec='seconds'),
+                'context': dict(self.context),
+                'duration_seconds': round(time.perf_counter() - self.started, 3),
+                'peak_rss_bytes': peak_rss_bytes(),
+                'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+                'latency': {name: summarize_samples(samples) for name, samples in self.samples.items()},
+                'tickers': {kind: sorted(tickers) for kind, tickers in self.tickers.items()},
+                'output': {
+                    'files': len(file_sizes),
+                    'bytes': sum(file_sizes),
+                    'max_file_bytes': file_sizes[-1] if file_sizes else 0,
+                    'median_file_bytes': file_sizes[len(file_sizes) // 2] if file_sizes else 0,
+                    'by_directory': by_dir,
+                },
+                'batches': list(self.batches),
+                'files': dict(sorted(self.files.items())),
+            }
+
+    def write(self, path, history_path=None, history_lines=None):
+        """
+        Write the report to path and optionally append a summary line to history_path.
+
+        The history line leaves out the per-batch and per-file detail. With
+        history_lines set, only that many of the most recent lines are kept.
+
+        Returns:
+            dict: The report that was written
+        """
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+        if history_path:
+            summary = {key: value for key, value in report.items() if key not in ('batches', 'files')}
+            summary['tickers'] = {kind: len(tickers) for kind, tickers in report['tickers'].items()}
+            with open(history_path, 'a') as f:
+                f.write(json.dumps(summary, separators=(',', ':')) + '\n')
+            if history_lines:
+                with open(history_path) as f:
+                    lines = f.readlines()
+                if len(lines) > history_lines:
+                    tmp_path = history_path + '.tmp'
+                    with open(tmp_path, 'w') as f:
+                        f.writelines(lines[-history_lines:])
+                    os.replace(tmp_path, history_path)
+        logger.info(f"Run metrics written to {path}")
+        return report
@@ -0,0 +1,158 @@
+"""
+Price-derived analytics computed for many tickers at once.
+
+The close series of a set of tickers (a render batch, or the whole universe)
+are aligned into one dates x tickers matrix with NaN where a ticker has no
+bar, and every statistic is computed with whole-matrix operations:
+
+* trailing returns (1M, 3M, YTD, 1Y, 5Y) from the last close on or before
+  the horizon start, measured from each ticker's own latest bar
+* annualized volatility of daily log returns over the trailing year
+* maximum drawdown over the stored history
+* 50/200-bar simple moving averages of the latest bars
+* premium (positive) or discount (negative) of the price to the DCF and
+  exit-multiple values
+
+Missing bars are never filled with zero returns: a return spans from the
+previous available close to the next one.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252  # annualization factor for volatility
+HORIZONS = {'1M': pd.DateOffset(months=1), '3M': pd.DateOffset(months=3),
+            '1Y': pd.DateOffset(years=1), '5Y': pd.DateOffset(years=5)}
+START_TOLERANCE_DAYS = 7  # a history starting this soon after a horizon start still covers it
+MIN_VOLATILITY_RETURNS = 20
+RETURN_LABELS = ['1M', '3M', 'YTD', '1Y', '5Y']
+MOVING_AVERAGES = [50, 200]
+RATIO_PRECISION = 6
+PRICE_PRECISION = 4
+
+
+def _align(frames):
+    """Return (dates, matrix) with one column per frame, NaN where a ticker has no bar."""
+    days = [frame['Date'].to_numpy(dtype='datetime64[D]') for frame in frames]
+    dates = np.unique(np.concatenate(days)) if days else np.array([], dtype='datetime64[D]')
+    matrix = np.full((len(dates), len(frames)), np.nan)
+    for column, (frame, ticker_days) in enumerate(zip(frames, days)):
+        matrix[np.searchsorted(dates, ticker_days), column] = frame['Close'].to_numpy(dtype=float)
+    return dates, matrix
+
+
+def _start_prices(dates, matrix, filled, first_row, targets):
+    """
+    Close at the start of a horizon for every column.
+
+    The last close on or before the target date is used; a history that only
+    starts up to START_TOLERANCE_DAYS after the target (holidays, or the
+    first stored bar of a full-period fetch) uses its first close.
+    """
+    columns = np.arange(matrix.shape[1])
+    rows = np.searchsorted(dates, targets, side='right') - 1
+    start = np.where(rows >= first_row, filled[np.clip(rows, 0, None), columns], np.nan)
+    first_date = dates[np.clip(first_row, 0, len(dates) - 1)]
+    late_start = (rows < first_row) & ((first_date - targets) <= np.timedelta64(START_TOLERANCE_DAYS, 'D'))
+    return np.where(late_start, matrix[first_row, columns], start)
+
+
+def _premium(price, values):
+    values = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values > 0, price / values - 1, np.nan)
+
+
+def _output(value, digits):
+    """Rounded float, or "" for missing values (like clean_nan_to_empty_str)."""
+    return round(float(value), digits) if np.isfinite(value) else ""
+
+
+def price_analytics(prices, dcf_values=None, exit_multiple_values=None):
+    """
+    Compute the price analytics of several tickers in one pass.
+
+    Args:
+        prices (dict): Ticker -> DataFrame with 'Date' and 'Close' (as from
+            PriceStore.get_prices), sorted by date; may be empty
+        dcf_values (dict): Ticker -> DCF value per share (optional)
+        exit_multiple_values (dict): Ticker -> exit-multiple value per share (optional)
+
+    Returns:
+        dict: Ticker -> {'AsOf', 'Returns': {'1M', '3M', 'YTD', '1Y', '5Y'},
+              'Volatility1Y', 'MaxDrawdown', 'MovingAverage50',
+              'MovingAverage200', 'PremiumToDCF', 'PremiumToExitMultiple'};
+              unavailable values are ""
+    """
+    tickers = list(prices)
+    dates, matrix = _align([prices[ticker] for ticker in tickers])
+    count = len(tickers)
+    columns = np.arange(count)
+    valid = ~np.isnan(matrix)
+    has_data = valid.any(axis=0) if len(dates) else np.zeros(count, dtype=bool)
+
+    missing = np.full(count, np.nan)
+    if not has_data.any():
+        latest = volatility = drawdown = missing
+        anchors = None
+        returns = {label: missing for label in RETURN_LABELS}
+        averages = {window: missing for window in MOVING_AVERAGES}
+    else:
+        rows = np.arange(len(dates))[:, None]
+        first_row = np.argmax(valid, axis=0)
+        last_row = len(dates) - 1 - np.argmax(valid[::-1], axis=0)
+        # Carry each close forward over the ticker's missing bars
+        filled = matrix[np.maximum.accumulate(np.where(valid, rows, 0), axis=0), columns]
+        latest = np.where(has_data, filled[-1], np.nan)
+        anchors = dates[last_row]
+
+        returns = {}
+        anchor_index = pd.DatetimeIndex(anchors)
+        for label, offset in HORIZONS.items():
+            targets = (anchor_index - offset).to_numpy(dtype='datetime64[D]')
+            returns[label] = latest / _start_prices(dates, matrix, filled, first_row, targets) - 1
+        previous_year_end = anchors.astype('datetime64[Y]').astype('datetime64[D]') - 1
+        returns['YTD'] = latest / _start_prices(dates, matrix, filled, first_row, previous_year_end) - 1
+        returns = {label: returns[label] for label in RETURN_LABELS}
+
+        # Log returns between consecutive available closes of the trailing year
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.log(filled[1:] / filled[:-1])
+        year_start = (anchor_index - HORIZONS['1Y']).to_numpy(dtype='datetime64[D]')
+        in_window = valid[1:] & ~np.isnan(filled[:-1]) & (dates[1:, None] > year_start[None, :])
+        observations = in_window.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(in_window, log_returns, 0).sum(axis=0) / observations
+            variance = np.where(in_window, (log_returns - mean) ** 2, 0).sum(axis=0) / (observations - 1)
+        volatility = np.where(observations >= MIN_VOLATILITY_RETURNS, np.sqrt(variance * TRADING_DAYS), np.nan)
+
+        running_max = np.fmax.accumulate(filled, axis=0)
+        with np.errstate(invalid='ignore'):
+            drawdowns = np.where(np.isnan(filled), 0, filled / running_max - 1)
+        drawdown = np.where(has_data, drawdowns.min(axis=0), np.nan)
+
+        # Number of available bars from each row to the end, per ticker
+        bars_to_end = np.cumsum(valid[::-1], axis=0)[::-1]
+        averages = {}
+        for window in MOVING_AVERAGES:
+            in_average = valid & (bars_to_end <= window)
+            averages[window] = np.where(valid.sum(axis=0) >= window,
+                                        np.where(in_average, matrix, 0).sum(axis=0) / window, np.nan)
+
+    dcf_premium = _premium(latest, [(dcf_values or {}).get(ticker) for ticker in tickers])
+    exit_premium = _premium(latest, [(exit_multiple_values or {}).get(ticker) for ticker in tickers])
+
+    results = {}
+    for i, ticker in enumerate(tickers):
+        result = {
+            'AsOf': str(anchors[i]) if has_data[i] else "",
+            'Returns': {label: _output(values[i], RATIO_PRECISION) for label, values in returns.items()},
+            'Volatility1Y': _output(volatility[i], RATIO_PRECISION),
+            'MaxDrawdown': _output(drawdown[i], RATIO_PRECISION),
+        }
+        for window in MOVING_AVERAGES:
+            result[f'MovingAverage{window}'] = _output(averages[window][i], PRICE_PRECISION)
+        result['PremiumToDCF'] = _output(dcf_premium[i], RATIO_PRECISION)
+        result['PremiumToExitMultiple'] = _output(exit_premium[i], RATIO_PRECISION)
+        results[ticker] = result
+    return results
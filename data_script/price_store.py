@@ -0,0 +1,281 @@
+"""
+Persistent on-disk store of daily closing prices, keyed by ticker and date.
+
+The store lets the update script ask Yahoo Finance only for the bars it does
+not have yet, instead of re-downloading the full 5-year history every run.
+
+It also keeps the fetch state that has to survive a crash: a checkpoint of
+the tickers an unfinished run already fetched (so a rerun resumes instead of
+starting over), and a retry queue of tickers that kept failing, each with an
+exponentially growing wait before the next attempt.
+"""
+
+import os
+import zlib
+import sqlite3
+import logging
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Relative difference between a stored close and a re-fetched close for the
+# same date above which the stored history is considered re-adjusted (split).
+ADJUSTMENT_TOLERANCE = 1e-3
+
+
+class PriceStore:
+    """
+    SQLite-backed store of daily closes.
+
+    Args:
+        path (str): Path to the SQLite database file (created if missing)
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        # WAL lets the render workers read while the fetch loop writes
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS prices (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                close REAL NOT NULL,
+                PRIMARY KEY (ticker, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS tickers (
+                ticker TEXT PRIMARY KEY,
+                last_full_refresh TEXT
+            );
+            CREATE TABLE IF NOT EXISTS fetch_checkpoint (
+                ticker TEXT PRIMARY KEY,
+                fetched_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fetch_retries (
+                ticker TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL,
+                next_attempt TEXT NOT NULL,
+                error TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def reconcile_slot(ticker, reconcile_days):
+        """Day of the reconcile cycle on which the ticker is fully refreshed."""
+        # crc32 rather than hash(), which is salted per process
+        return zlib.crc32(ticker.encode()) % max(reconcile_days, 1)
+
+    def plan(self, tickers, reconcile_days, overlap_days=0, today=None):
+        """
+        Decide how each ticker should be fetched.
+
+        Full refreshes are staggered: every ticker has a fixed slot day in the
+        reconcile cycle (from a stable hash of the symbol) and is backfilled
+        on that day, so about 1/reconcile_days of the universe is refetched
+        per daily run instead of all of it on the same day. A ticker that
+        missed its slot is caught up once its refresh is reconcile_days old.
+        Splits in between are caught by the overlap check in upsert.
+
+        Args:
+            tickers (list): Ticker symbols to refresh
+            reconcile_days (int): Maximum age in days of the last full-history
+                download before the ticker is backfilled again (also the
+                length of the staggered cycle)
+            overlap_days (int): Incremental fetches start this many days before
+                the last stored date, so that upsert has stored bars to compare
+            today (date): Reference date (defaults to today)
+
+        Returns:
+            tuple: (full, incremental) where full is a list of tickers that need
+                   a full backfill and incremental maps ticker -> first date to
+                   fetch ('YYYY-MM-DD')
+        """
+        today = today or date.today()
+        rows = self.conn.execute("""
+            SELECT t.ticker, t.last_full_refresh, MAX(p.date)
+            FROM tickers t LEFT JOIN prices p ON p.ticker = t.ticker
+            GROUP BY t.ticker
+        """).fetchall()
+        state = {ticker: (last_full, last_date) for ticker, last_full, last_date in rows}
+
+        slot = today.toordinal() % max(reconcile_days, 1)
+        full = []
+        incremental = {}
+        for ticker in tickers:
+            last_full, last_date = state.get(ticker, (None, None))
+            if not last_full or not last_date:
+                full.append(ticker)
+                continue
+            age = (today - datetime.strptime(last_full, '%Y-%m-%d').date()).days
+            if age >= reconcile_days or (age >= 1 and self.reconcile_slot(ticker, reconcile_days) == slot):
+                full.append(ticker)
+            else:
+                start = datetime.strptime(last_date, '%Y-%m-%d').date() - timedelta(days=overlap_days)
+                incremental[ticker] = start.strftime('%Y-%m-%d')
+        return full, incremental
+
+    def upsert(self, ticker, closes, full=False, today=None):
+        """
+        Write closing prices for a ticker.
+
+        Args:
+            ticker (str): Ticker symbol
+            closes (pd.Series): Closing prices indexed by date (NaNs are dropped)
+            full (bool): True if closes is the ticker's complete history; the
+                stored history is replaced and the refresh date recorded
+            today (date): Reference date (defaults to today)
+
+        Returns:
+            bool: True if an overlapping stored close disagreed with the fetched
+                  one, meaning the stored history was re-adjusted upstream and
+                  the ticker has been scheduled for a full refresh
+        """
+        today = today or date.today()
+        closes = closes.dropna()
+        days = pd.DatetimeIndex(closes.index).strftime('%Y-%m-%d')
+        rows = [(ticker, d, c) for d, c in zip(days, closes.to_numpy(float).tolist())]
+
+        adjusted = False
+        with self.conn:
+            if full:
+                self.conn.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO tickers (ticker, last_full_refresh) VALUES (?, ?)",
+                    (ticker, today.strftime('%Y-%m-%d')))
+            elif rows:
+                # The most recent stored bar may be a partial intraday close,
+                # so only older overlapping bars are compared.
+                stored = dict(self.conn.execute(
+                    """SELECT date, close FROM prices WHERE ticker = ? AND date >= ?
+                       AND date < (SELECT MAX(date) FROM prices WHERE ticker = ?)""",
+                    (ticker, rows[0][1], ticker)).fetchall())
+                for _, d, c in rows:
+                    old = stored.get(d)
+                    if old and abs(c - old) / abs(old) > ADJUSTMENT_TOLERANCE:
+                        adjusted = True
+                        break
+                if adjusted:
+                    # Force a full backfill on the next run
+                    self.conn.execute(
+                        "UPDATE tickers SET last_full_refresh = NULL WHERE ticker = ?", (ticker,))
+                    logger.info(f"Stored history for {ticker} looks re-adjusted; scheduling full refresh.")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO prices (ticker, date, close) VALUES (?, ?, ?)", rows)
+        return adjusted
+
+    def checkpoint(self, tickers, now=None):
+        """Record that tickers were fetched and stored, and drop them from the retry queue."""
+        now = (now or datetime.now()).isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO fetch_checkpoint (ticker, fetched_at) VALUES (?, ?)",
+                                  [(ticker, now) for ticker in tickers])
+            self.conn.executemany("DELETE FROM fetch_retries WHERE ticker = ?", [(ticker,) for ticker in tickers])
+
+    def resumable(self, max_age, now=None):
+        """
+        Tickers checkpointed by an unfinished run, fetched less than max_age ago.
+
+        Args:
+            max_age (timedelta): Older checkpoints are ignored (and removed)
+
+        Returns:
+            set: Ticker symbols
+        """
+        cutoff = ((now or datetime.now()) - max_age).isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.execute("DELETE FROM fetch_checkpoint WHERE fetched_at < ?", (cutoff,))
+        return {ticker for ticker, in self.conn.execute("SELECT ticker FROM fetch_checkpoint")}
+
+    def clear_checkpoint(self, tickers):
+        """Forget the checkpoint of tickers once their run has finished."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM fetch_checkpoint WHERE ticker = ?", [(ticker,) for ticker in tickers])
+
+    def defer(self, failed, base_delay, max_delay, now=None):
+        """
+        Queue tickers that failed every attempt of this run.
+
+        The wait before a ticker is fetched again doubles with each failed
+        run, from base_delay up to max_delay.
+
+        Args:
+            failed (dict): Ticker -> error message
+            base_delay (timedelta): Wait after the first failed run
+            max_delay (timedelta): Upper bound of the wait
+        """
+        now = now or datetime.now()
+        attempts = dict(self.conn.execute("SELECT ticker, attempts FROM fetch_retries"))
+        rows = []
+        for ticker, error in failed.items():
+            count = attempts.get(ticker, 0) + 1
+            delay = min(max_delay, base_delay * 2 ** (count - 1))
+            rows.append((ticker, count, (now + delay).isoformat(timespec='seconds'), error))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fetch_retries (ticker, attempts, next_attempt, error) VALUES (?, ?, ?, ?)",
+                rows)
+
+    def deferred(self, now=None):
+        """
+        Queued tickers that are still waiting for their next attempt.
+
+        Returns:
+            dict: Ticker -> next attempt time ('YYYY-MM-DDTHH:MM:SS')
+        """
+        now = (now or datetime.now()).isoformat(timespec='seconds')
+        return dict(self.conn.execute(
+            "SELECT ticker, next_attempt FROM fetch_retries WHERE next_attempt > ?", (now,)))
+
+    def latest_closes(self, ticker, count=2):
+        """
+        The most recent stored closes of a ticker.
+
+        Returns:
+            list: (date 'YYYY-MM-DD', close) tuples, newest first
+        """
+        return self.conn.execute(
+            "SELECT date, close FROM prices WHERE ticker = ? ORDER BY date DESC LIMIT ?", (ticker, count)).fetchall()
+
+    def get_prices(self, ticker, since=None):
+        """
+        Read the stored closes for a ticker.
+
+        Args:
+            ticker (str): Ticker symbol
+            since (date): Only return bars on or after this date (optional)
+
+        Returns:
+            pd.DataFrame: Columns 'Date' (datetime64) and 'Close', sorted by date
+        """
+        since = since.strftime('%Y-%m-%d') if since else ''
+        rows = self.conn.execute(
+            "SELECT date, close FROM prices WHERE ticker = ? AND date >= ? ORDER BY date",
+            (ticker, since)).fetchall()
+        df = pd.DataFrame(rows, columns=['Date', 'Close'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df
+
+
+def history_start(period, today=None):
+    """
+    Return the first date covered by a yfinance-style period string ('5y', '6mo', '30d').
+    """
+    today = today or date.today()
+    unit_days = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}
+    for unit, days in unit_days.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            if unit == 'y':
+                years = int(period[:-1])
+                try:
+                    return today.replace(year=today.year - years)
+                except ValueError:  # Feb 29
+                    return today.replace(year=today.year - years, day=28)
+            return today - timedelta(days=int(period[:-len(unit)]) * days)
+    raise ValueError(f"Unsupported period: {period}")
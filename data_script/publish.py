@@ -0,0 +1,266 @@
+"""
+Staged, content-addressed publishing of the generated data files.
+
+Files are first written to a staging directory, and only files whose content
+hash differs from the previous run are staged at all. commit() then moves the
+staged files over the published ones with atomic renames, removes files that
+are no longer produced and records the hashes in a manifest. Until commit()
+runs, the published dataset is left exactly as the previous run wrote it.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_bytes(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_content(output_dir, staging_dir, relpath, content, previous_sha256=None):
+    """
+    Write content to staging unless it matches the published file.
+
+    Only touches the filesystem, so it can run in worker threads or processes;
+    the result is handed back to Publisher.record.
+
+    Args:
+        output_dir (str): Published directory
+        staging_dir (str): Staging directory
+        relpath (str): Path relative to output_dir, using '/' separators
+        content (str or bytes): File contents
+        previous_sha256 (str): Hash recorded in the previous manifest, if any
+
+    Returns:
+        tuple: (sha256, size in bytes, changed)
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    digest = sha256_bytes(content)
+    target = os.path.join(output_dir, relpath)
+    if os.path.exists(target):
+        # Published before manifests existed: hash it once
+        previous = previous_sha256 or sha256_file(target)
+        if digest == previous:
+            return digest, len(content), False
+    staged = os.path.join(staging_dir, relpath)
+    os.makedirs(os.path.dirname(staged), exist_ok=True)
+    with open(staged, 'wb') as f:
+        f.write(content)
+    return digest, len(content), True
+
+
+class StagedStream:
+    """
+    File-like staging of one output that is too large to build in memory.
+
+    Content is written straight to staging while its hash is computed; on
+    close the file is recorded with the publisher, and dropped from staging
+    again if it turned out identical to the published one. Leaving the with
+    block with an exception discards the staged file.
+
+    Args:
+        publisher (Publisher): Publisher to record the file with
+        relpath (str): Path relative to the output directory, using '/' separators
+    """
+
+    def __init__(self, publisher, relpath):
+        self.publisher = publisher
+        self.relpath = relpath
+        self.path = os.path.join(publisher.staging_dir, relpath)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'wb')
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, content):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self.digest.update(content)
+        self.file.write(content)
+        self.size += len(content)
+
+    def close(self):
+        """
+        Finish the file and record it.
+
+        Returns:
+            bool: True if the content changed and stays staged
+        """
+        self.file.close()
+        digest = self.digest.hexdigest()
+        target = os.path.join(self.publisher.output_dir, self.relpath)
+        changed = True
+        if os.path.exists(target):
+            previous = self.publisher.previous_sha256(self.relpath) or sha256_file(target)
+            if digest == previous:
+                os.remove(self.path)
+                changed = False
+        self.publisher.record(self.relpath, digest, self.size, changed)
+        return changed
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class Publisher:
+    """
+    Stage output files and publish only the ones that changed.
+
+    Args:
+        output_dir (str): Published directory (e.g. public/companies-data)
+        staging_dir (str): Scratch directory on the same filesystem
+        manifest_name (str): Manifest file name, relative to output_dir
+        prune_dirs (list): Subdirectories of output_dir whose files are deleted
+            when they are not produced by the current run
+    """
+
+    def __init__(self, output_dir, staging_dir, manifest_name='manifest.json', prune_dirs=()):
+        self.output_dir = output_dir
+        self.staging_dir = staging_dir
+        self.manifest_path = os.path.join(output_dir, manifest_name)
+        self.prune_dirs = list(prune_dirs)
+        self.previous = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    self.previous = json.load(f).get('files', {})
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read manifest {self.manifest_path}: {str(e)}")
+        self.files = {}
+        self.changed = []
+        self.unchanged = set()  # relpaths, so a file kept and also staged counts once
+        self.lock = threading.Lock()
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir, exist_ok=True)
+
+    def previous_sha256(self, relpath):
+        """Hash of relpath in the previous manifest (None if it was not listed)."""
+        entry = self.previous.get(relpath)
+        return entry['sha256'] if entry else None
+
+    def stage(self, relpath, content):
+        """
+        Stage a file for publishing. Safe to call from several threads.
+
+        Args:
+            relpath (str): Path relative to output_dir, using '/' separators
+            content (str or bytes): File contents
+
+        Returns:
+            bool: True if the content changed and was written to staging
+        """
+        digest, size, changed = stage_content(self.output_dir, self.staging_dir, relpath, content,
+                                              self.previous_sha256(relpath))
+        self.record(relpath, digest, size, changed)
+        return changed
+
+    def open(self, relpath):
+        """
+        Stage a file incrementally, for content too large to hold in memory.
+
+        Returns:
+            StagedStream: Write to it, then close it (or use it as a context manager)
+        """
+        return StagedStream(self, relpath)
+
+    def record(self, relpath, digest, size, changed):
+        """Register a file staged by stage_content (e.g. in a worker process)."""
+        with self.lock:
+            self.files[relpath] = {'sha256': digest, 'bytes': size}
+            if changed:
+                self.changed.append(relpath)
+                self.unchanged.discard(relpath)
+            else:
+                self.unchanged.add(relpath)
+
+    def keep(self, relpath):
+        """
+        Carry a previously published file over unchanged (e.g. after a processing error).
+
+        A file this run already staged keeps its new entry.
+        """
+        if relpath in self.previous and os.path.exists(os.path.join(self.output_dir, relpath)):
+            with self.lock:
+                if relpath not in self.files:
+                    self.files[relpath] = self.previous[relpath]
+                    self.unchanged.add(relpath)
+
+    def keep_all(self, exclude=()):
+        """Carry every previously published file over unchanged, except the relpaths in exclude."""
+        for relpath in list(self.previous):
+            if relpath not in exclude:
+                self.keep(relpath)
+
+    def keep_dir(self, subdir):
+        """Carry every previously published file under subdir over unchanged."""
+        for relpath in list(self.previous):
+            if relpath.startswith(subdir + '/'):
+                self.keep(relpath)
+
+    def discard(self):
+        """Drop everything staged, leaving the published files untouched."""
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        self.changed = []
+
+    def commit(self):
+        """
+        Swap staged files into place, prune stale files and write the manifest.
+
+        Returns:
+            dict: Counts of 'changed', 'unchanged' and 'removed' files
+        """
+        # Summary-level files last, so they never reference a detail file
+        # that has not been swapped in yet
+        ordered = sorted(self.changed, key=lambda p: ('/' not in p, p))
+        for relpath in ordered:
+            target = os.path.join(self.output_dir, relpath)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(os.path.join(self.staging_dir, relpath), target)
+
+        removed = 0
+        for subdir in self.prune_dirs:
+            directory = os.path.join(self.output_dir, subdir)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                relpath = f'{subdir}/{name}'
+                if relpath not in self.files:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+                    logger.info(f"Removed stale file: {relpath}")
+
+        manifest = {'files': dict(sorted(self.files.items()))}
+        tmp_path = os.path.join(self.staging_dir, 'manifest.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+        counts = {'changed': len(self.changed), 'unchanged': len(self.unchanged), 'removed': removed}
+        logger.info(f"Published {counts['changed']} changed files, skipped {counts['unchanged']} unchanged, removed {removed} stale.")
+        return counts
@@ -0,0 +1,60 @@
+"""
+Latest quotes of every ticker in one small file (quotes.json).
+
+Between fundamentals updates only the latest close moves, so frequent
+--quotes-only runs refresh the price store and publish just this file; the
+detail files and summary stay as the last full run wrote them, and the
+frontend overlays the quotes on them. The layout follows companies-index.json:
+parallel arrays, with the few distinct dates dictionary-encoded. The file only
+depends on the stored prices, so a run in which no price moved republishes
+identical bytes and the Publisher skips it.
+
+    {
+        "Updated": "2025-08-25",       # latest quote date
+        "Dates": ["2025-08-22", "2025-08-25"],
+        "Ticker": ["AAME", ...],
+        "Price": [3.45, ...],          # latest stored close
+        "Date": [1, ...],              # index into Dates
+        "Change": [0.05, ...],         # versus the previous close (null if none)
+        "ChangePercent": [1.47, ...]
+    }
+"""
+
+PRICE_PRECISION = 4
+PERCENT_PRECISION = 2
+
+
+def build_quotes(tickers, price_store):
+    """
+    Build the quotes.json payload from the stored prices.
+
+    Args:
+        tickers (list): Tickers in output order; tickers without stored
+            prices are left out
+        price_store (PriceStore): Source of the latest closes
+
+    Returns:
+        dict: The quotes.json payload
+    """
+    quotes = {'Ticker': [], 'Price': [], 'Date': [], 'Change': [], 'ChangePercent': []}
+    dates = {}
+    for ticker in tickers:
+        closes = price_store.latest_closes(ticker, 2)
+        if not closes:
+            continue
+        date, price = closes[0]
+        change = change_percent = None
+        if len(closes) > 1 and closes[1][1]:
+            previous = closes[1][1]
+            change = round(price - previous, PRICE_PRECISION)
+            change_percent = round((price / previous - 1) * 100, PERCENT_PRECISION)
+        quotes['Ticker'].append(ticker)
+        quotes['Price'].append(round(price, PRICE_PRECISION))
+        quotes['Date'].append(dates.setdefault(date, len(dates)))
+        quotes['Change'].append(change)
+        quotes['ChangePercent'].append(change_percent)
+    return {
+        'Updated': max(dates) if dates else None,
+        'Dates': list(dates),
+        **quotes,
+    }
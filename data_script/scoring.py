@@ -0,0 +1,187 @@
+"""
+Universe-wide scoring of the fundamentals metrics.
+
+All tickers x years x metrics are loaded into one frame straight from the
+workbook sheets, and every score is computed with whole-frame operations:
+
+* Points / Comparatives from the latest year's Strong/Weak evaluations
+* per-sector percentile rank, z-score and median of each metric (latest year)
+* year-over-year deltas of each metric between consecutive year sheets
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from .ingest import METRIC_NAMES
+
+EVALUATION_COLUMNS = [metric + ' Evaluation' for metric in METRIC_NAMES]
+
+
+class UniverseScores(Mapping):
+    """
+    Read-only mapping of ticker -> score dict, built on access.
+
+    The universe-wide results are kept as float arrays (a few numbers per
+    company) and each ticker's nested dict is only materialized when it is
+    looked up, so memory stays small for large universes.
+    """
+
+    def __init__(self, tickers, points, comparatives, percentiles, zscores, medians, deltas):
+        self._tickers = list(tickers)
+        self._position = {ticker: i for i, ticker in enumerate(self._tickers)}
+        self._points = points
+        self._comparatives = comparatives
+        self._percentiles = percentiles
+        self._zscores = zscores
+        self._medians = medians
+        # year -> (ticker -> row, array) for tickers with at least one delta
+        self._deltas = deltas
+
+    def __len__(self):
+        return len(self._tickers)
+
+    def __iter__(self):
+        return iter(self._tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._position
+
+    def _deltas_for(self, year, tickers):
+        """Year-over-year deltas of tickers as rows (NaN where there is none)."""
+        aligned = np.full((len(tickers), len(METRIC_NAMES)), np.nan)
+        if year in self._deltas:
+            rows, values = self._deltas[year]
+            found = [(i, rows[ticker]) for i, ticker in enumerate(tickers) if ticker in rows]
+            if found:
+                target, source = zip(*found)
+                aligned[list(target)] = values[list(source)]
+        return aligned
+
+    def changed(self, previous):
+        """
+        Tickers whose entry differs from the one in previous.
+
+        Args:
+            previous (UniverseScores): Scores of an earlier run, or None
+
+        Returns:
+            set: New tickers and tickers with any changed number
+        """
+        if previous is None:
+            return set(self._tickers)
+        common = [ticker for ticker in self._tickers if ticker in previous._position]
+        new_rows = [self._position[ticker] for ticker in common]
+        old_rows = [previous._position[ticker] for ticker in common]
+        pairs = [(np.asarray(getattr(self, name), dtype=float)[new_rows],
+                  np.asarray(getattr(previous, name), dtype=float)[old_rows])
+                 for name in ('_points', '_comparatives', '_percentiles', '_zscores', '_medians')]
+        pairs += [(self._deltas_for(year, common), previous._deltas_for(year, common))
+                  for year in set(self._deltas) | set(previous._deltas)]
+
+        differs = np.zeros(len(common), dtype=bool)
+        for current, before in pairs:
+            current, before = current.reshape(len(common), -1), before.reshape(len(common), -1)
+            same = (current == before) | (np.isnan(current) & np.isnan(before))
+            differs |= ~same.all(axis=1)
+        return (set(self._tickers) - set(common)) | {ticker for ticker, flag in zip(common, differs) if flag}
+
+    def __getitem__(self, ticker):
+        i = self._position[ticker]
+        percentiles = dict(zip(METRIC_NAMES, self._percentiles[i].tolist()))
+        zscores = self._zscores[i].tolist()
+        medians = self._medians[i].tolist()
+        year_over_year = {}
+        for year, (rows, values) in self._deltas.items():
+            if ticker in rows:
+                year_over_year[year] = dict(zip(METRIC_NAMES, values[rows[ticker]].tolist()))
+        return {
+            'Points': int(self._points[i]),
+            'Comparatives': float(self._comparatives[i]),
+            'PeerStats': {
+                metric: {
+                    'Percentile': percentiles[metric],
+                    'ZScore': zscores[j],
+                    'SectorMedian': medians[j],
+                }
+                for j, metric in enumerate(METRIC_NAMES)
+            },
+            'SectorPercentiles': percentiles,
+            'YearOverYear': year_over_year,
+        }
+
+
+def _array(frame, index, digits=None):
+    """Ticker-aligned float array of the metric columns."""
+    frame = frame.reindex(index=index, columns=METRIC_NAMES).astype(float)
+    if digits is not None:
+        frame = frame.round(digits)
+    return frame.to_numpy()
+
+
+def score_universe(sheets, years):
+    """
+    Score every company in the workbook.
+
+    Args:
+        sheets (dict): Sheet name -> DataFrame, as returned by ingest.read_workbook
+        years (list): Sheet names in chronological order
+
+    Returns:
+        UniverseScores: Ticker -> {'Points', 'Comparatives', 'PeerStats',
+              'SectorPercentiles', 'YearOverYear'}. PeerStats maps metric ->
+              {'Percentile', 'ZScore', 'SectorMedian'}; SectorPercentiles maps
+              metric -> percentile; YearOverYear maps year -> {metric: change
+              from the previous year}. Missing values are NaN.
+    """
+    frames = [sheets[year][sheets[year]['ticker'].notna()].assign(Year=year) for year in years]
+    data = pd.concat(frames, ignore_index=True)
+
+    # Sector comes from the first row a ticker appears in, as in the company records
+    sectors = data.drop_duplicates('ticker').set_index('ticker')['Primary Sector'].fillna("")
+
+    # The first row per (ticker, year) is the one used for that year's scores
+    data = data.drop_duplicates(['ticker', 'Year'], keep='first')
+    data['YearRank'] = data['Year'].map({year: i for i, year in enumerate(years)})
+    values = data.reindex(columns=METRIC_NAMES).apply(pd.to_numeric, errors='coerce')
+    values = values.replace([np.inf, -np.inf], np.nan)
+    values.index = pd.MultiIndex.from_arrays([data['ticker'], data['Year']])
+
+    # Latest year per ticker
+    latest_rows = data.sort_values('YearRank', kind='stable').drop_duplicates('ticker', keep='last')
+    latest_rows = latest_rows.set_index('ticker')
+    evaluations = latest_rows.reindex(columns=EVALUATION_COLUMNS)
+    strong = (evaluations == 'Strong').sum(axis=1)
+    weak = (evaluations == 'Weak').sum(axis=1)
+    points = strong - weak
+    comparatives = pd.Series(
+        np.where(weak > 0, strong / weak.where(weak > 0, 1), np.where(strong > 0, np.inf, 0.0)),
+        index=latest_rows.index)
+
+    # Peer statistics within each sector on the latest values
+    latest = values.loc[list(zip(latest_rows.index, latest_rows['Year']))].droplevel('Year')
+    by_sector = latest.groupby(sectors.reindex(latest.index))
+    percentiles = by_sector.rank(pct=True)
+    zscores = (latest - by_sector.transform('mean')) / by_sector.transform('std')
+    medians = by_sector.transform('median')
+
+    # Year-over-year deltas between consecutive sheets
+    wide = values.unstack('Year')
+    deltas = {}
+    for previous, current in zip(years, years[1:]):
+        if current in wide.columns.get_level_values('Year') and previous in wide.columns.get_level_values('Year'):
+            delta = wide.xs(current, axis=1, level='Year') - wide.xs(previous, axis=1, level='Year')
+            delta = delta[METRIC_NAMES].dropna(how='all')
+            deltas[current] = ({ticker: i for i, ticker in enumerate(delta.index)}, _array(delta, delta.index))
+
+    tickers = latest_rows.index
+    return UniverseScores(
+        tickers,
+        points.to_numpy(),
+        comparatives.to_numpy(),
+        _array(percentiles, tickers, 4),
+        _array(zscores, tickers, 4),
+        _array(medians, tickers),
+        deltas,
+    )
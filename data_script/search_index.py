@@ -0,0 +1,100 @@
+"""
+Compact search index of the companies table (companies-search.json).
+
+The table searches by ticker, company name and description keywords without
+downloading the descriptions, so the pipeline ships:
+
+* Tokens: sorted unique tokens from tickers, names, sectors and descriptions
+* Postings: for each token, the rows containing it (ascending, delta-encoded)
+* TickerOrder / NameOrder: rows sorted by normalized ticker / name, for
+  prefix search over whole tickers and names (e.g. "brk.b", "bank of am")
+
+Rows are positions in companies.json / companies-index.json. Tokens are
+lowercase ASCII letters and digits after accent folding; the frontend
+(src/utils/companySearch.js) normalizes queries the same way.
+"""
+
+import re
+import unicodedata
+
+TOKEN = re.compile(r'[a-z0-9]+')
+MIN_KEYWORD_LENGTH = 3  # shorter description words are not indexed
+MAX_KEYWORD_SHARE = 0.25  # description words in more companies than this are too common to help
+STOP_WORDS = frozenset("""
+    about addition after also among and are based both but can company companies comprising
+    corporation customers due each engaged engages for formerly founded from further has have
+    headquartered its inc including incorporated into limited ltd not offers operates other our
+    over products provides segment segments serves such that the their them these they this
+    through together under was well were which while with within
+""".split())
+
+
+def normalize(text):
+    """Lowercase text with accents folded to ASCII (missing values become '')."""
+    if not isinstance(text, str):
+        return ''
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return folded.lower()
+
+
+def tokenize(text):
+    return TOKEN.findall(normalize(text))
+
+
+def _keywords(text):
+    return {token for token in tokenize(text)
+            if len(token) >= MIN_KEYWORD_LENGTH and not token.isdigit() and token not in STOP_WORDS}
+
+
+def _delta_encode(rows):
+    return [row - previous for row, previous in zip(rows, [0] + rows[:-1])]
+
+
+class SearchIndexBuilder:
+    """
+    Build the search index one summary record at a time.
+
+    Args:
+        max_keyword_share (float): Fraction of companies above which a
+            description-only word is dropped
+    """
+
+    def __init__(self, max_keyword_share=MAX_KEYWORD_SHARE):
+        self.max_keyword_share = max_keyword_share
+        self.tickers = []
+        self.names = []
+        self.postings = {}  # token -> rows, from tickers, names and sectors
+        self.keyword_postings = {}  # token -> rows, from descriptions
+
+    def add(self, record):
+        row = len(self.tickers)
+        self.tickers.append(normalize(record['Ticker']))
+        self.names.append(normalize(record['Company']))
+        tokens = set(tokenize(record['Ticker'])) | set(tokenize(record['Company'])) | set(tokenize(record['Sector']))
+        for token in tokens:
+            self.postings.setdefault(token, []).append(row)
+        for token in _keywords(record.get('Description')) - tokens:
+            self.keyword_postings.setdefault(token, []).append(row)
+
+    def finish(self):
+        """
+        Returns:
+            dict: The companies-search.json payload
+        """
+        rows = len(self.tickers)
+        postings = dict(self.postings)
+        max_rows = max(1, int(rows * self.max_keyword_share))
+        for token, keyword_rows in self.keyword_postings.items():
+            if len(keyword_rows) > max_rows:
+                continue
+            if token in postings:
+                postings[token] = sorted(set(postings[token]) | set(keyword_rows))
+            else:
+                postings[token] = keyword_rows
+        tokens = sorted(postings)
+        return {
+            'Tokens': tokens,
+            'Postings': [_delta_encode(postings[token]) for token in tokens],
+            'TickerOrder': sorted(range(rows), key=lambda i: (self.tickers[i], i)),
+            'NameOrder': sorted(range(rows), key=lambda i: (self.names[i], i)),
+        }
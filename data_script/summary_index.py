@@ -0,0 +1,135 @@
+"""
+Slim, columnar index of the companies table.
+
+The companies table only needs a handful of numeric columns to sort, filter
+and render, so those are written to companies-index.json as parallel arrays
+with sectors and market-cap buckets dictionary-encoded and the row order for
+every sortable column precomputed. Long descriptions and full metric blocks
+are left out; the company page reads them from the ticker's detail file.
+SummaryIndexBuilder builds the index from a stream of records.
+"""
+
+import math
+
+INDEX_COLUMNS = ['Company', 'Ticker', 'MarketCap', 'CurrentPrice', 'DCFValue',
+                 'ExitMultipleValue', 'Points', 'Comparatives']
+# Decimal places kept per numeric index column (display uses at most 2)
+INDEX_PRECISION = {'MarketCap': 0, 'CurrentPrice': 4, 'DCFValue': 4, 'ExitMultipleValue': 4,
+                   'Points': 0, 'Comparatives': 4}
+
+# Market cap buckets used by the table filter, in billions: (name, lower, upper)
+MARKET_CAP_BUCKETS = [('Micro', None, 2), ('Small', 2, 10), ('Mid', 10, 200), ('Large', 200, None)]
+
+
+def _number(value):
+    """Return value as a finite float, or None (JSON null)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value) if math.isfinite(value) else None
+
+
+def market_cap_bucket(market_cap):
+    """Index into MARKET_CAP_BUCKETS, matching the table's filter (missing counts as 0)."""
+    cap = (_number(market_cap) or 0) / 1e9
+    if cap < 2:
+        return 0
+    if cap < 10:
+        return 1
+    if cap <= 200:
+        return 2
+    return 3
+
+
+def _intrinsic_average(row):
+    dcf, exit_multiple = _number(row['DCFValue']), _number(row['ExitMultipleValue'])
+    if dcf is None or exit_multiple is None:
+        return None
+    return (dcf + exit_multiple) / 2
+
+
+def _difference(row):
+    average, price = _intrinsic_average(row), _number(row['CurrentPrice'])
+    if average is None or not price:
+        return None
+    return average / price - 1
+
+
+def _sort_order(rows, key):
+    """Row positions in ascending key order; missing keys sort first, ties keep file order."""
+    keys = [key(row) for row in rows]
+    return sorted(range(len(rows)), key=lambda i: (keys[i] is not None, keys[i] if keys[i] is not None else 0))
+
+
+class SummaryIndexBuilder:
+    """
+    Build the companies index one summary record at a time.
+
+    Only the index columns of each record are kept, so the whole summary never
+    has to be in memory.
+
+        builder = SummaryIndexBuilder()
+        for record in records:
+            builder.add(record)
+        index = builder.finish()
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, record):
+        """Add the next summary record."""
+        self.rows.append({column: record[column] for column in INDEX_COLUMNS + ['Sector']})
+
+    def finish(self):
+        """
+        Build the index from the records added so far.
+
+        Returns:
+            dict: The companies-index.json payload
+        """
+        rows = self.rows
+        sectors = sorted({row['Sector'] for row in rows if row['Sector']})
+        sector_ids = {sector: i for i, sector in enumerate(sectors)}
+
+        index = {column: [] for column in INDEX_COLUMNS}
+        index['Sector'] = []
+        index['MarketCapBucket'] = []
+        for row in rows:
+            for column in ('Company', 'Ticker'):
+                index[column].append(row[column])
+            for column in INDEX_COLUMNS[2:]:
+                value = _number(row[column])
+                index[column].append(round(value, INDEX_PRECISION[column]) if value is not None else None)
+            index['Sector'].append(sector_ids.get(row['Sector']))
+            index['MarketCapBucket'].append(market_cap_bucket(row['MarketCap']))
+
+        index['Sectors'] = sectors
+        index['MarketCapBuckets'] = [name for name, _, _ in MARKET_CAP_BUCKETS]
+        index['SortOrders'] = {
+            'Company': _sort_order(rows, lambda r: str(r['Company']).lower()),
+            'Ticker': _sort_order(rows, lambda r: str(r['Ticker'])),
+            'Sector': _sort_order(rows, lambda r: str(r['Sector']).lower()),
+            'MarketCap': _sort_order(rows, lambda r: _number(r['MarketCap']) or 0),
+            'CurrentPrice': _sort_order(rows, lambda r: _number(r['CurrentPrice']) or 0),
+            'IntrinsicValue': _sort_order(rows, _intrinsic_average),
+            'Difference': _sort_order(rows, _difference),
+            'Comparatives': _sort_order(rows, lambda r: _number(r['Comparatives'])),
+            'Points': _sort_order(rows, lambda r: _number(r['Points'])),
+        }
+        return index
+
+
+def build_summary_index(summary_list):
+    """
+    Build the slim index of a list of summary records.
+
+    Args:
+        summary_list (list): Summary records as written to companies.json
+
+    Returns:
+        dict: The companies-index.json payload
+    """
+    builder = SummaryIndexBuilder()
+    for row in summary_list:
+        builder.add(row)
+    return builder.finish()
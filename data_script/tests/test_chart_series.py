@@ -0,0 +1,71 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_script.chart_series import RANGE_YEARS, build_chart_series, lttb
+from data_script.detail_format import epoch_days
+
+
+def lttb_reference(x, y, threshold):
+    """Straightforward one-bucket-at-a-time LTTB, for comparison."""
+    n = len(x)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = [0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        prev = selected[-1]
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        selected.append(start + int(area.argmax()))
+    return np.array(selected + [n - 1])
+
+
+@pytest.mark.parametrize('n, threshold', [(1300, 200), (250, 200), (20000, 200), (5000, 37)])
+def test_lttb_keeps_endpoints(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(size=n))
+    keep = lttb(x, y, threshold)
+    assert len(keep) == threshold
+    assert keep[0] == 0
+    assert keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+    np.testing.assert_array_equal(keep, lttb_reference(x, y, threshold))
+
+
+@pytest.mark.parametrize('n, threshold', [(50, 200), (200, 200), (10, 2)])
+def test_lttb_keeps_everything_below_threshold(n, threshold):
+    x = np.arange(n, dtype=float)
+    np.testing.assert_array_equal(lttb(x, np.sin(x), threshold), np.arange(n))
+
+
+def test_build_chart_series():
+    today = date(2026, 3, 2)
+    dates = pd.bdate_range('2020-01-01', '2026-02-27')
+    prices = pd.DataFrame({'Date': dates, 'Close': np.linspace(50, 150, len(dates))})
+    years = [{'Year': 2025, 'DCFValue': 120.0, 'ExitMultipleValue': 140.0},
+             {'Year': 2024, 'DCFValue': '', 'ExitMultipleValue': 90.0}]
+    series = build_chart_series(prices, years, target_points=200, today=today)
+
+    assert list(series) == list(RANGE_YEARS)
+    one_year = series['1Y']
+    days = one_year['StartDay'] + np.cumsum(one_year['DayDeltas'])
+    assert len(days) == len(one_year['Price']) == 200
+    all_days = epoch_days(dates)
+    assert days[-1] == all_days[-1]
+    assert days[0] == all_days[all_days >= pd.Timestamp('2025-03-02').value // 86_400_000_000_000][0]
+    assert one_year['Price'][-1] == 150.0
+    # Only 2025 has both values; its band spans the points dated in 2025
+    [[first, last, dcf, exit_value]] = one_year['Bands']
+    assert (dcf, exit_value) == (120.0, 140.0)
+    in_2025 = np.flatnonzero(days.astype('datetime64[D]').astype('datetime64[Y]').astype(int) + 1970 == 2025)
+    assert (first, last) == (in_2025[0], in_2025[-1])
+    assert one_year['Domain'][1] >= 150.0
+
+
+def test_build_chart_series_without_prices():
+    prices = pd.DataFrame({'Date': pd.to_datetime(['2026-01-02']), 'Close': [np.nan]})
+    assert build_chart_series(prices, [], today=date(2026, 3, 2)) == {}
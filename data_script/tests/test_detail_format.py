@@ -0,0 +1,89 @@
+import json
+import math
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_script import detail_format
+from data_script.detail_format import (SIDECAR_MAGIC, clean_nan_to_empty_str, dumps_compact, encode_prices_binary,
+                                       encode_prices_columnar, epoch_days, latest_close)
+
+
+@pytest.fixture
+def prices():
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-05', '2024-01-08', '2024-02-01']),
+        'Close': [101.123456, np.nan, 99.5, 100.25, 102.0],
+    })
+
+
+def test_columnar_round_trip(prices):
+    payload = encode_prices_columnar(prices)
+    days = payload['StartDay'] + np.cumsum(payload['DayDeltas'])
+    assert payload['Encoding'] == 'columnar'
+    assert days.tolist() == epoch_days(prices['Date']).tolist()
+    assert payload['Close'] == [101.1235, None, 99.5, 100.25, 102.0]
+
+    decoded = json.loads(dumps_compact(payload))
+    assert decoded == payload
+
+
+def test_columnar_empty_frame():
+    payload = encode_prices_columnar(pd.DataFrame({'Date': pd.to_datetime([]), 'Close': []}))
+    assert payload == {'Encoding': 'columnar', 'StartDay': 0, 'DayDeltas': [], 'Close': []}
+
+
+def test_binary_sidecar_round_trip(prices):
+    content = encode_prices_binary(prices)
+    assert content[:4] == SIDECAR_MAGIC
+    count, = struct.unpack('<I', content[4:8])
+    days = np.frombuffer(content, dtype='<i4', count=count, offset=8)
+    closes = np.frombuffer(content, dtype='<f4', count=count, offset=8 + 4 * count)
+
+    assert count == len(prices)
+    assert days.tolist() == epoch_days(prices['Date']).tolist()
+    np.testing.assert_allclose(closes, prices['Close'].to_numpy(), rtol=1e-6, equal_nan=True)
+
+
+def test_latest_close_skips_trailing_nan(prices):
+    prices.loc[len(prices)] = [pd.Timestamp('2024-02-02'), np.nan]
+    close, day = latest_close(prices)
+    assert close == 102.0
+    assert day == pd.Timestamp('2024-02-01')
+
+
+def test_dumps_compact_round_trip():
+    record = {
+        'Ticker': 'ABC',
+        'Name': 'Société Générale',
+        'Values': [1.5, float('nan'), float('inf'), None, 0.00001],
+        'Count': np.int64(3),
+        'Ratio': np.float32(1.1),
+        'Array': np.array([1.25, 2.5]),
+        'Nested': {'Year': 2024, 'Empty': ''},
+    }
+    content = dumps_compact(record)
+    assert b', ' not in content and b'": ' not in content
+    decoded = json.loads(content)
+    assert decoded['Name'] == 'Société Générale'
+    assert decoded['Values'][:4] == [1.5, None, None, None]
+    assert math.isclose(decoded['Values'][4], 0.00001)
+    assert decoded['Count'] == 3
+    assert decoded['Ratio'] == 1.1
+    assert decoded['Array'] == [1.25, 2.5]
+    assert decoded['Nested'] == {'Year': 2024, 'Empty': ''}
+
+
+def test_json_fallback_matches_orjson_values(monkeypatch):
+    pytest.importorskip('orjson')
+    record = {'A': [1.5, float('nan'), np.float32(0.1)], 'B': 'é', 'C': np.arange(3)}
+    expected = json.loads(dumps_compact(record))
+    monkeypatch.setattr(detail_format, 'orjson', None)
+    assert json.loads(dumps_compact(record)) == expected
+
+
+def test_clean_nan_to_empty_str():
+    cleaned = clean_nan_to_empty_str({'a': float('nan'), 'b': [1.0, float('nan')], 'c': {'d': 'x'}})
+    assert cleaned == {'a': '', 'b': [1.0, ''], 'c': {'d': 'x'}}
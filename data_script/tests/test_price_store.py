@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from data_script.price_store import PriceStore
+
+TODAY = date(2026, 3, 2)
+
+
+def closes(start, values):
+    return pd.Series(values, index=pd.bdate_range(start, periods=len(values)), dtype=float)
+
+
+@pytest.fixture
+def store(tmp_path):
+    price_store = PriceStore(str(tmp_path / 'prices.sqlite'))
+    yield price_store
+    price_store.close()
+
+
+def last_full_refresh(store, ticker):
+    return store.conn.execute("SELECT last_full_refresh FROM tickers WHERE ticker = ?", (ticker,)).fetchone()[0]
+
+
+def test_plan_new_ticker_is_fetched_in_full(store):
+    full, incremental = store.plan(['NEW'], reconcile_days=7, overlap_days=7, today=TODAY)
+    assert full == ['NEW']
+    assert incremental == {}
+
+
+def test_plan_incremental_start_includes_overlap(store):
+    store.upsert('AAA', closes('2026-02-23', [10, 11, 12, 13, 14]), full=True, today=TODAY)
+    reconcile_days = 7
+    # A day on which AAA is not in its reconcile slot
+    today = next(TODAY + timedelta(days=k) for k in range(1, reconcile_days + 1)
+                 if (TODAY + timedelta(days=k)).toordinal() % reconcile_days
+                 != PriceStore.reconcile_slot('AAA', reconcile_days))
+    full, incremental = store.plan(['AAA'], reconcile_days, overlap_days=7, today=today)
+    assert full == []
+    assert incremental == {'AAA': '2026-02-20'}  # last stored bar 2026-02-27 minus 7 days
+
+
+def test_plan_refreshes_in_full_once_reconcile_days_old(store):
+    store.upsert('AAA', closes('2026-02-23', [10, 11]), full=True, today=TODAY)
+    full, incremental = store.plan(['AAA'], reconcile_days=7, today=TODAY + timedelta(days=7))
+    assert full == ['AAA']
+    assert incremental == {}
+
+
+def test_plan_staggers_reconciliation(store):
+    tickers = [f'T{i}' for i in range(700)]
+    for ticker in tickers:
+        store.upsert(ticker, closes('2026-02-23', [10, 11]), full=True, today=TODAY)
+    # Not refreshed again the day they were downloaded
+    assert store.plan(tickers, reconcile_days=7, today=TODAY)[0] == []
+
+    due = []
+    for k in range(1, 8):
+        today = TODAY + timedelta(days=k)
+        full, _ = store.plan(tickers, reconcile_days=7, today=today)
+        for ticker in full:
+            store.upsert(ticker, closes('2026-02-23', [10, 11]), full=True, today=today)
+        due.append(len(full))
+    assert sum(due) == len(tickers)
+    assert max(due) < 2 * len(tickers) / 7
+
+
+def test_upsert_detects_readjusted_history(store):
+    store.upsert('SPLT', closes('2026-02-23', [10, 11, 12, 13, 14]), full=True, today=TODAY)
+    # Same dates after a 2:1 split, plus a new bar
+    adjusted = store.upsert('SPLT', closes('2026-02-23', [5, 5.5, 6, 6.5, 7, 7.5]), today=TODAY)
+    assert adjusted
+    assert last_full_refresh(store, 'SPLT') is None
+    full, _ = store.plan(['SPLT'], reconcile_days=7, today=TODAY)
+    assert full == ['SPLT']
+
+
+def test_upsert_ignores_a_changed_last_bar(store):
+    store.upsert('AAA', closes('2026-02-23', [10, 11, 12, 13, 14]), full=True, today=TODAY)
+    # The last stored bar was a partial intraday close; older bars match
+    adjusted = store.upsert('AAA', closes('2026-02-25', [12, 13, 15, 16]), today=TODAY)
+    assert not adjusted
+    assert last_full_refresh(store, 'AAA') == TODAY.strftime('%Y-%m-%d')
+    stored = store.get_prices('AAA')
+    assert stored['Close'].tolist() == [10, 11, 12, 13, 15, 16]
+
+
+def test_upsert_tolerates_rounding_differences(store):
+    store.upsert('AAA', closes('2026-02-23', [10, 11, 12]), full=True, today=TODAY)
+    assert not store.upsert('AAA', closes('2026-02-23', [10.0001, 11, 12, 12.5]), today=TODAY)
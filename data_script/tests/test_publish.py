@@ -0,0 +1,86 @@
+import json
+
+from data_script.publish import Publisher, sha256_bytes
+
+
+def publisher(tmp_path):
+    return Publisher(str(tmp_path / 'out'), str(tmp_path / 'staging'), prune_dirs=['details'])
+
+
+def read(tmp_path, relpath):
+    with open(tmp_path / 'out' / relpath, 'rb') as f:
+        return f.read()
+
+
+def manifest(tmp_path):
+    with open(tmp_path / 'out' / 'manifest.json') as f:
+        return json.load(f)['files']
+
+
+def publish_first_run(tmp_path):
+    first = publisher(tmp_path)
+    first.stage('details/AAA.json', b'{"a":1}')
+    first.stage('details/BBB.json', b'{"b":1}')
+    first.stage('companies-index.json', b'[]')
+    return first.commit()
+
+
+def test_first_commit_publishes_everything(tmp_path):
+    counts = publish_first_run(tmp_path)
+    assert counts['changed'] == 3
+    assert counts['unchanged'] == 0
+    assert counts['removed'] == 0
+    assert read(tmp_path, 'details/AAA.json') == b'{"a":1}'
+    assert manifest(tmp_path)['details/AAA.json'] == {'sha256': sha256_bytes(b'{"a":1}'), 'bytes': 7}
+    assert not (tmp_path / 'staging').exists()
+
+
+def test_commit_counts_changed_unchanged_and_removed(tmp_path):
+    publish_first_run(tmp_path)
+
+    second = publisher(tmp_path)
+    assert not second.stage('details/AAA.json', b'{"a":1}')
+    assert second.stage('companies-index.json', b'["AAA"]')
+    counts = second.commit()
+
+    assert counts == {'changed': 1, 'unchanged': 1, 'removed': 1}
+    assert not (tmp_path / 'out' / 'details' / 'BBB.json').exists()
+    assert read(tmp_path, 'companies-index.json') == b'["AAA"]'
+    assert sorted(manifest(tmp_path)) == ['companies-index.json', 'details/AAA.json']
+
+
+def test_kept_and_restaged_file_counts_once(tmp_path):
+    publish_first_run(tmp_path)
+
+    second = publisher(tmp_path)
+    second.keep_dir('details')
+    second.stage('details/AAA.json', b'{"a":1}')
+    second.stage('companies-index.json', b'["AAA", "BBB"]')
+    counts = second.commit()
+
+    assert counts == {'changed': 1, 'unchanged': 2, 'removed': 0}
+    assert read(tmp_path, 'details/BBB.json') == b'{"b":1}'
+
+
+def test_streamed_file_matches_staged_file(tmp_path):
+    publish_first_run(tmp_path)
+
+    second = publisher(tmp_path)
+    with second.open('companies-index.json') as stream:
+        stream.write('[')
+        stream.write(']')
+    second.keep_all()
+    counts = second.commit()
+
+    assert counts == {'changed': 0, 'unchanged': 3, 'removed': 0}
+
+
+def test_discard_leaves_published_files(tmp_path):
+    publish_first_run(tmp_path)
+
+    second = publisher(tmp_path)
+    second.stage('details/AAA.json', b'{"a":2}')
+    second.discard()
+
+    assert read(tmp_path, 'details/AAA.json') == b'{"a":1}'
+    assert manifest(tmp_path)['details/AAA.json']['sha256'] == sha256_bytes(b'{"a":1}')
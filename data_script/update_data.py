@@ -1,238 +1,924 @@
-import pandas as pd
-import yfinance as yf
+"""
+Build the published company data from the fundamentals workbook and Yahoo Finance prices.
+
+The pipeline is a set of stage functions driven by run(); nothing runs at
+import time, and pandas/yfinance are only imported by the stages that need
+them. Command line (from the repository root):
+
+    python -m data_script                           # full run
+    python -m data_script --tickers AAPL MSFT       # refresh a few tickers
+    python -m data_script --sector Technology       # refresh one sector
+    python -m data_script --fundamentals-only       # rebuild stale JSON from stored prices, no fetching
+    python -m data_script --fundamentals-only --force   # rebuild all JSON from stored prices
+    python -m data_script --prices-only             # refresh the price store, no JSON
+    python -m data_script --quotes-only             # refresh prices and publish only quotes.json
+    python -m data_script --dry-run                 # show what would be fetched and rewritten
+
+Selective runs (--tickers/--sector) rewrite only the selected detail files and
+merge the selected records into the existing companies.json.
+
+The workbook is diffed against a fundamentals store on every run. Tickers
+whose rows or scores changed, or whose prices were refreshed by a
+--prices-only run, are marked stale until their files are published again;
+--fundamentals-only rebuilds just those.
+
+Tickers that keep failing to fetch are retried in smaller groups with
+backoff, then keep their stored history and wait in a retry queue for a later
+run. Fetched tickers are checkpointed, so rerunning an interrupted run soon
+after resumes where it stopped instead of fetching everything again.
+
+Every run also writes quotes.json with the latest close and change of every
+ticker. --quotes-only runs fetch prices and publish only that file, leaving
+the detail files and summary as the last full run wrote them (and marking
+them stale), so prices can be refreshed often while the heavy files are
+rebuilt on a slower schedule; the frontend overlays the quotes.
+
+Every stage streams: company records and scores are built per batch, at most
+a few batches are in flight between fetching and rendering, and
+companies.json and the index are written record by record, so
+memory stays flat however many tickers the workbook holds.
+"""
+
 import os
+import sys
 import json
+import math
 import time
 import logging
-from datetime import datetime
-import glob
-import math
+import argparse
+from datetime import datetime, timedelta
 
 # ================================
 # Configuration
 # ================================
 EXCEL_FILE = 'data_script/input.xlsx'  # Set your file path here
+DATA_DIR = 'public/companies-data'
 DETAILS_DIR = 'public/companies-data/details'
 LOGS_DIR = 'data_script/logs'
-SUMMARY_FILE = 'public/companies-data/companies.json'
-YEARS = ['2023', '2024']
+SUMMARY_FILE = 'public/companies-data/companies.json'  # full records, merged by partial runs; not deployed
+SUMMARY_INDEX_FILE = 'public/companies-data/companies-index.json'  # slim table index
+SEARCH_INDEX_FILE = 'public/companies-data/companies-search.json'  # ticker/name/keyword search index
+QUOTES_FILE = 'public/companies-data/quotes.json'  # latest close per ticker, refreshed by --quotes-only runs
+STAGING_DIR = 'data_script/cache/staging'  # must be on the same filesystem as DATA_DIR
+WORKBOOK_CACHE_FILE = 'data_script/cache/workbook.pkl'  # parsed sheets and the year sheet list, reused while the workbook is unchanged
+YEARS = None  # year sheets, oldest first; None = every sheet named like a year (e.g. '2024')
 BATCH_SIZE = 20
-API_DELAY = 5  # seconds
+MAX_WORKERS = 4  # batches fetched concurrently
+RATE_LIMIT = 2.0  # initial requests per second; adapts to throttling between MIN/MAX
+MIN_RATE_LIMIT = 0.2
+MAX_RATE_LIMIT = 10.0
 PERIOD = '5y'
 INTERVAL = '1d'
 GROUP_BY = 'ticker'
 AUTO_ADJUST = False
+PRICE_STORE_FILE = 'data_script/cache/prices.sqlite'
+FUNDAMENTALS_STORE_FILE = 'data_script/cache/fundamentals.sqlite'  # workbook rows, scores and stale tickers
+RECONCILE_DAYS = 7  # full-history refetch interval to pick up split/dividend adjustments, staggered per ticker
+INCREMENTAL_OVERLAP_DAYS = 7  # incremental fetches re-request this many days of stored bars to spot re-adjusted history
+FETCH_RETRIES = 3  # retry rounds for failed tickers within a run, in ever smaller groups
+RETRY_BASE_DELAY = 2.0  # seconds of backoff before the first retry; doubles every round
+RETRY_MAX_DELAY = 60.0
+RETRY_QUEUE_BASE_HOURS = 1  # wait before a ticker that failed a whole run is fetched again; doubles per failed run
+RETRY_QUEUE_MAX_HOURS = 24
+CHECKPOINT_MAX_AGE_HOURS = 1  # a rerun within this window skips tickers an interrupted run already fetched
+OUTPUT_FORMAT = 'compact'  # 'compact' (minified, columnar prices) or 'legacy' (indented records)
+PRICE_PRECISION = 4  # decimal places kept for closes in compact output
+PRICE_SIDECAR = False  # compact only: write closes to a binary <TICKER>.prices.bin sidecar
+CHART_POINTS = 200  # points per precomputed chart range (LTTB downsampled)
+RENDER_WORKERS = None  # processes building/encoding/writing detail files; None = CPU count, 1 = in-process
+METRICS_FILE = 'data_script/logs/run_metrics.json'  # structured report of the latest run
+METRICS_HISTORY_FILE = 'data_script/logs/run_metrics_history.jsonl'  # one line per run; None to disable
+METRICS_HISTORY_LINES = 500  # most recent runs kept in the history file; None = unbounded
 
-# ================================
-# Setup
-# ================================
-os.makedirs(DETAILS_DIR, exist_ok=True)
-os.makedirs(LOGS_DIR, exist_ok=True)
-log_file_path = os.path.join(LOGS_DIR, 'run.log')
 
-logging.basicConfig(filename=log_file_path,
-                    level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+def _relpath(path):
+    """Path relative to DATA_DIR with '/' separators, as used by the Publisher."""
+    return os.path.relpath(path, DATA_DIR).replace(os.sep, '/')
+
+
+DETAILS_SUBDIR = _relpath(DETAILS_DIR)
+SUMMARY_RELPATH = _relpath(SUMMARY_FILE)
+INDEX_RELPATH = _relpath(SUMMARY_INDEX_FILE)
+SEARCH_RELPATH = _relpath(SEARCH_INDEX_FILE)
+QUOTES_RELPATH = _relpath(QUOTES_FILE)
 
-start_time = datetime.now()
-logging.info("Script started.")
 
 # ================================
-# Clean output directories and files
+# Stages
 # ================================
-# Remove all JSON files in DETAILS_DIR
-for file in glob.glob(os.path.join(DETAILS_DIR, '*.json')):
-    try:
-        os.remove(file)
-        logging.info(f"Deleted old details file: {file}")
-    except Exception as e:
-        logging.error(f"Could not delete file {file}: {str(e)}")
-# Remove companies.json if it exists
-if os.path.exists(SUMMARY_FILE):
+def setup_logging():
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    logging.basicConfig(filename=os.path.join(LOGS_DIR, 'run.log'),
+                        level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def load_fundamentals(fundamentals, metrics, dry_run=False):
+    """
+    Read the workbook, diff it against the fundamentals store and score the universe.
+
+    Company records are not built here but per batch in build_outputs.
+
+    Args:
+        fundamentals (FundamentalsStore): Stored rows, scores and stale tickers
+        metrics (RunMetrics): Run metrics
+        dry_run (bool): Leave the store untouched
+
+    Returns:
+        tuple: (sheets, companies, scores, stale) where sheets maps year ->
+               DataFrame (oldest first), companies maps ticker -> sector in
+               workbook order, scores is a lazy UniverseScores and stale is
+               the set of tickers whose published files are out of date
+    """
+    from .ingest import read_workbook, list_companies
+    from .scoring import score_universe
+
     try:
-        os.remove(SUMMARY_FILE)
-        logging.info(f"Deleted old summary file: {SUMMARY_FILE}")
+        with metrics.stage('read_excel'):
+            sheets = read_workbook(EXCEL_FILE, YEARS or None, WORKBOOK_CACHE_FILE)
+            years = list(sheets)
+            companies = list_companies(sheets, years)
+        logging.info(f"Parsed Excel: {len(companies)} companies loaded from sheets {years}.")
     except Exception as e:
-        logging.error(f"Could not delete summary file {SUMMARY_FILE}: {str(e)}")
+        logging.error(f"Error reading Excel: {str(e)}")
+        raise
 
-# ================================
-# Read Excel Data
-# ================================
-company_data = {}
-try:
-    for year in YEARS:
-        df = pd.read_excel(EXCEL_FILE, sheet_name=year)
-        for _, row in df.iterrows():
-            ticker = row['ticker']
-            if pd.isna(ticker):
+    with metrics.stage('fundamentals_diff'):
+        dirty = fundamentals.sync(sheets, years, dry_run=dry_run)
+        previous_scores = fundamentals.load_scores(years)
+    metrics.count('tickers_fundamentals_changed', len(dirty))
+    print(f"Fundamentals changed for {len(dirty)} tickers.")
+
+    if not dirty and previous_scores is not None:
+        scores, rescored = previous_scores, set()
+        logging.info("Fundamentals unchanged; reusing stored scores.")
+    else:
+        # Sector statistics are universe-wide, so one changed row can move
+        # every score in its sector: rescore all and compare
+        with metrics.stage('scoring'):
+            scores = score_universe(sheets, years)
+            rescored = scores.changed(previous_scores)
+        if not dry_run:
+            fundamentals.save_scores(years, scores)
+            fundamentals.mark_stale(rescored)
+        logging.info(f"Scored {len(scores)} companies across {len(years)} years; {len(rescored)} scores changed.")
+    metrics.count('tickers_scores_changed', len(rescored))
+    return sheets, companies, scores, fundamentals.stale() | dirty | rescored
+
+
+def select_tickers(companies, tickers=None, sector=None):
+    """
+    Pick the tickers to refresh, in workbook order.
+
+    Args:
+        companies (dict): Ticker -> sector
+        tickers (list): Ticker symbols to keep (case-insensitive); None for all
+        sector (str): Sector name to keep (case-insensitive); None for all
+
+    Returns:
+        list: Selected tickers
+    """
+    selected = list(companies)
+    if tickers:
+        wanted = {ticker.upper() for ticker in tickers}
+        unknown = wanted - {ticker.upper() for ticker in selected}
+        if unknown:
+            print(f"Warning: tickers not in the workbook: {', '.join(sorted(unknown))}")
+            logging.warning(f"Tickers not in the workbook: {sorted(unknown)}")
+        selected = [ticker for ticker in selected if ticker.upper() in wanted]
+    if sector:
+        selected = [ticker for ticker in selected
+                    if str(companies[ticker]).lower() == sector.lower()]
+    return selected
+
+
+def extract_closes(data, ticker):
+    """Return the Close series for ticker from a fetched batch frame (empty if absent)."""
+    import pandas as pd
+
+    if data is None or data.empty:
+        return pd.Series(dtype=float)
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker not in data.columns.get_level_values(0):
+            return pd.Series(dtype=float)
+        return data[ticker]['Close']
+    return data['Close']
+
+
+def plan_fetches(tickers, price_store, retry_all=False):
+    """
+    Group tickers into fetch requests.
+
+    New and reconciling tickers get a full backfill, the rest only the missing
+    bars. Incremental requests start INCREMENTAL_OVERLAP_DAYS before the last
+    stored date, so that a partial (intraday) close from the previous run is
+    overwritten and the re-fetched older bars reveal a history that was
+    re-adjusted upstream (see fetch_prices). Tickers already
+    fetched by an interrupted run, and queued tickers still backing off, are
+    not fetched (their batches are still built from the stored prices).
+
+    Args:
+        tickers (list): Selected tickers
+        price_store (PriceStore): Stored prices and fetch state
+        retry_all (bool): Fetch queued tickers even if they are backing off
+
+    Returns:
+        list: (batch, requests) per BATCH_SIZE tickers, where requests is a
+              list of (request_batch, full, options) tuples
+    """
+    resumed = price_store.resumable(timedelta(hours=CHECKPOINT_MAX_AGE_HOURS)).intersection(tickers)
+    if resumed:
+        logging.info(f"Resuming: {len(resumed)} tickers were already fetched by an unfinished run.")
+    deferred = {} if retry_all else price_store.deferred()
+    waiting = [t for t in tickers if t in deferred and t not in resumed]
+    if waiting:
+        logging.warning(f"Retry queue: {len(waiting)} tickers are backing off after failed runs "
+                        f"(next attempt from {min(deferred[t] for t in waiting)}).")
+    to_fetch = [t for t in tickers if t not in resumed and t not in deferred]
+    full_refresh, incremental = price_store.plan(to_fetch, RECONCILE_DAYS, INCREMENTAL_OVERLAP_DAYS)
+    logging.info(f"Price store: {len(full_refresh)} tickers need a full {PERIOD} backfill, {len(incremental)} incremental.")
+    full_refresh = set(full_refresh)
+
+    chunks = []
+    for i in range(0, len(tickers), BATCH_SIZE):
+        batch = tickers[i:i + BATCH_SIZE]
+        full_batch = [t for t in batch if t in full_refresh]
+        incremental_batch = [t for t in batch if t in incremental]
+        requests = []
+        if full_batch:
+            requests.append((full_batch, True, {'period': PERIOD}))
+        if incremental_batch:
+            start = min(incremental[t] for t in incremental_batch)
+            requests.append((incremental_batch, False, {'start': start}))
+        chunks.append((batch, requests))
+    return chunks
+
+
+def fetch_prices(chunks, price_store, metrics, limiter=None, max_workers=MAX_WORKERS):
+    """
+    Fetch planned requests concurrently and store the results.
+
+    Yields each batch of tickers as soon as its prices are stored, so outputs
+    can be built while later batches are still being fetched. Stored tickers
+    are checkpointed; tickers that failed every retry keep their stored
+    history and join the retry queue. A ticker whose re-fetched bars disagree
+    with the stored ones (a split or dividend re-adjusted its history) is
+    backfilled in full before its batch is yielded.
+
+    Args:
+        chunks (list): Batches and their requests, from plan_fetches
+        price_store (PriceStore): Store the fetched prices are written to
+        metrics (RunMetrics): Run metrics
+        limiter (AdaptiveRateLimiter): Request pacing (defaults to one bounded
+            by RATE_LIMIT, MIN_RATE_LIMIT and MAX_RATE_LIMIT)
+        max_workers (int): Requests fetched at once
+
+    Yields:
+        list: Tickers whose prices are up to date in the store
+    """
+    from .fetcher import AdaptiveRateLimiter, fetch_batches
+
+    limiter = limiter or AdaptiveRateLimiter(rate=RATE_LIMIT, min_rate=MIN_RATE_LIMIT, max_rate=MAX_RATE_LIMIT)
+    results = fetch_batches(
+        [(request_batch, dict(options, interval=INTERVAL, auto_adjust=AUTO_ADJUST, actions=False))
+         for _, requests in chunks for request_batch, _, options in requests],
+        limiter, max_workers=max_workers, metrics=metrics,
+        retries=FETCH_RETRIES, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY)
+
+    for batch, requests in chunks:
+        for request_batch, full, options in requests:
+            metrics.count('api_batches')
+            logging.info(f"API request: history(batch={request_batch}, {', '.join(f'{k}={v!r}' for k, v in options.items())})")
+            # Time spent waiting here is fetch time not hidden behind processing
+            with metrics.stage('fetch_wait'):
+                data, failed = next(results)
+            with metrics.stage('price_store'):
+                if failed:
+                    logging.error(f"Could not fetch {list(failed)} after {FETCH_RETRIES} retries; "
+                                  f"keeping stored history and queueing them for a later run.")
+                    metrics.count('failed_tickers', len(failed))
+                    for ticker in failed:
+                        metrics.flag_ticker('fetch_failed', ticker)
+                    price_store.defer(failed, timedelta(hours=RETRY_QUEUE_BASE_HOURS),
+                                      timedelta(hours=RETRY_QUEUE_MAX_HOURS))
+                fetched = [ticker for ticker in request_batch if ticker not in failed]
+                readjusted = []
+                for ticker in fetched:
+                    closes = extract_closes(data, ticker)
+                    if full and closes.dropna().empty:
+                        # Keep whatever history we already have rather than wiping it
+                        logging.error(f"No prices returned for {ticker}; keeping stored history.")
+                        metrics.flag_ticker('no_prices_returned', ticker)
+                        continue
+                    if price_store.upsert(ticker, closes, full=full):
+                        readjusted.append(ticker)
+            if readjusted:
+                refresh_readjusted(readjusted, price_store, limiter, metrics)
+            with metrics.stage('price_store'):
+                price_store.checkpoint(fetched)
+        yield batch
+
+    # Exhaust the generator so the fetch throughput report is logged
+    with metrics.stage('fetch_wait'):
+        for _ in results:
+            pass
+
+
+def refresh_readjusted(tickers, price_store, limiter, metrics):
+    """
+    Backfill the full history of tickers whose stored history was re-adjusted.
+
+    upsert has already scheduled them for a full refresh, so a ticker whose
+    backfill fails here gets it on the next run instead.
+    """
+    from .fetcher import FetchStats, fetch_with_retries
+
+    logging.warning(f"Stored history of {tickers} was re-adjusted upstream; fetching their full {PERIOD} history.")
+    metrics.count('tickers_readjusted', len(tickers))
+    for ticker in tickers:
+        metrics.flag_ticker('readjusted', ticker)
+    with metrics.stage('fetch_wait'):
+        data, failed = fetch_with_retries(tickers, limiter, FetchStats(metrics), retries=FETCH_RETRIES,
+                                          base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, period=PERIOD,
+                                          interval=INTERVAL, auto_adjust=AUTO_ADJUST, actions=False)
+    with metrics.stage('price_store'):
+        for ticker in tickers:
+            closes = extract_closes(data, ticker)
+            if ticker in failed or closes.dropna().empty:
+                logging.error(f"Could not backfill re-adjusted {ticker}; it gets a full refresh next run.")
                 continue
-            if ticker not in company_data:
-                company_data[ticker] = {
-                    'Company': row['Company'] if not pd.isna(row['Company']) else "",
-                    'Ticker': ticker,
-                    'Sector': row['Primary Sector'] if not pd.isna(row['Primary Sector']) else "",
-                    'Description': row['Description'] if not pd.isna(row['Description']) else "",
-                    'Years': []
-                }
-            metric_names = [
-                'FCF yield', 'NOPAT', 'ROIC', 'ReinvRate', 'D/E', 'ICR', 'OMS', 'EV/OCF', 'EVA/InvCap'
-            ]
-            combined = {}
-            for metric in metric_names:
-                value = row.get(metric)
-                if pd.isna(value):
-                    value = ""
-                eval_col = metric + ' Evaluation'
-                eval_value = row.get(eval_col) if eval_col in row else None
-                if pd.isna(eval_value):
-                    eval_value = ""
-                combined[metric] = {
-                    'Value': value,
-                    'Evaluation': eval_value
-                }
-            company_data[ticker]['Years'].append({
-                'Year': year,
-                'DCFValue': row['DCF value'] if not pd.isna(row['DCF value']) else "",
-                'ExitMultipleValue': row['Exit multiple value'] if not pd.isna(row['Exit multiple value']) else "",
-                'MarketCap': row['MarketCap'] if not pd.isna(row['MarketCap']) else "",
-                'PerformanceMetrics': combined
-            })
-    logging.info(f"Parsed Excel: {len(company_data)} companies loaded from sheets {YEARS}.")
-except Exception as e:
-    logging.error(f"Error reading Excel: {str(e)}")
-    raise
+            price_store.upsert(ticker, closes, full=True)
 
-# ================================
-# Fetch Stock Prices
-# ================================
-tickers = list(company_data.keys())
-summary_list = []
-total_files_created = 0
-api_batches = 0
-
-for i in range(0, len(tickers), BATCH_SIZE):
-    batch = tickers[i:i + BATCH_SIZE]
-    api_batches += 1
-    print(f'Processing tickers {i + 1} to {i + len(batch)} of {len(tickers)}...')
+
+def _latest_year_entry(company):
+    """Entry of the latest year in company['Years'] (sheet order, oldest first), or None."""
+    if not company['Years']:
+        return None
+    latest_year = company['Years'][-1]['Year']
+    return next(entry for entry in company['Years'] if entry['Year'] == latest_year)
+
+
+def build_records(company, score, price_frame, analytics):
+    """
+    Build the detail file and summary record of one company.
+
+    Args:
+        company (dict): Company record from build_company_data
+        score (dict): Entry of score_universe, with NaNs already replaced
+        price_frame (pd.DataFrame): Stored prices ('Date', 'Close')
+        analytics (dict): Entry of price_analytics for the ticker
+
+    Returns:
+        tuple: (detailed_json, summary_record, sidecar) where sidecar is the
+               binary price file contents or None. Every value is output-ready
+               (no NaN or Timestamp left).
+    """
+    from .chart_series import build_chart_series
+    from .detail_format import encode_prices_columnar, encode_prices_binary, price_records, latest_close
+
+    ticker = company['Ticker']
+
+    latest_year_entry = _latest_year_entry(company)
+    perf_metrics = latest_year_entry['PerformanceMetrics'] if latest_year_entry else {}
+
+    # Points, Comparatives and peer statistics from the universe-wide scoring
+    points = score['Points']
+    comparatives = score['Comparatives']
+
+    sidecar = None
+    if OUTPUT_FORMAT != 'compact':
+        historical_prices = price_records(price_frame)
+    elif PRICE_SIDECAR:
+        sidecar = encode_prices_binary(price_frame)
+        historical_prices = {'Encoding': 'binary', 'File': f'{ticker}.prices.bin', 'Count': len(price_frame)}
+    else:
+        historical_prices = encode_prices_columnar(price_frame, PRICE_PRECISION)
+
+    detailed_json = {
+        'Company': company['Company'],
+        'Ticker': company['Ticker'],
+        'Sector': company['Sector'],
+        'Description': company['Description'],
+        'Years': company['Years'],
+        'HistoricalPrices': historical_prices,
+        'Points': points,
+        'Comparatives': comparatives,
+        'PeerStats': score['PeerStats'],
+        'YearOverYear': score['YearOverYear'],
+        'PriceAnalytics': analytics,
+        'ChartSeries': build_chart_series(price_frame, company['Years'], CHART_POINTS)
+    }
+
+    # Summary entry
+    current_price, current_price_date = latest_close(price_frame)
+    if not price_frame.empty and math.isnan(price_frame['Close'].iloc[-1]):
+        logging.error(f"Latest price for {ticker} is NaN or None. Using most recent non-NaN price: {current_price} (date: {current_price_date})")
+
+    summary_record = {
+        'Company': company['Company'],
+        'Ticker': company['Ticker'],
+        'Sector': company['Sector'],
+        'Description': company['Description'],
+        'CurrentPrice': current_price,
+        'MarketCap': latest_year_entry['MarketCap'] if latest_year_entry else "",
+        'DCFValue': latest_year_entry['DCFValue'] if latest_year_entry else "",
+        'ExitMultipleValue': latest_year_entry['ExitMultipleValue'] if latest_year_entry else "",
+        'Points': points,
+        'Comparatives': comparatives,
+        'SectorPercentiles': score['SectorPercentiles'],
+        'PriceAnalytics': analytics,
+        'LatestPerformanceMetrics': perf_metrics
+    }
+    return detailed_json, summary_record, sidecar
+
+
+# Per-process state of the render workers
+_render_state = {}
+
+
+def _init_render_worker(price_store_file):
+    from .price_store import PriceStore
+
+    setup_logging()
+    _render_state['price_store'] = PriceStore(price_store_file)
+
+
+def render_batch(tasks, output_dir, staging_dir):
+    """
+    Build, encode and stage the detail files of a batch of tickers.
+
+    Runs in a render worker process (or in-process with RENDER_WORKERS = 1),
+    so it only reads the price store and writes to the staging directory;
+    everything the parent needs to record is returned. The price analytics of
+    the whole batch are computed in one vectorized pass.
+
+    Args:
+        tasks (list): (ticker, company, score, previous) tuples, where
+            previous maps relpath -> sha256 from the last manifest
+        output_dir (str): Published directory
+        staging_dir (str): Staging directory
+
+    Returns:
+        tuple: (results, timings) where results has one dict per ticker with
+               'ticker', 'summary' (None on error), 'files' as
+               (relpath, sha256, size, changed) tuples, 'flags' and 'error',
+               and timings maps stage -> seconds spent in this batch
+    """
+    from .detail_format import dumps_compact
+    from .price_analytics import price_analytics
+    from .price_store import history_start
+    from .publish import stage_content
+
+    price_store = _render_state['price_store']
+    history_since = history_start(PERIOD)
+    timings = {'price_store': 0.0, 'analytics': 0.0, 'transform': 0.0, 'serialize': 0.0, 'write': 0.0}
+    results = []
+    price_frames = {}
+    for ticker, company, score, previous in tasks:
+        result = {'ticker': ticker, 'summary': None, 'files': [], 'flags': [], 'error': None}
+        results.append(result)
+        try:
+            # Prices come from the store, trimmed to the configured period
+            clock = time.perf_counter()
+            price_frame = price_store.get_prices(ticker, since=history_since)
+            if price_frame.empty:
+                result['flags'].append('empty_prices')
+            elif price_frame['Close'].isna().any():
+                result['flags'].append('nan_prices')
+            price_frames[ticker] = price_frame
+            timings['price_store'] += time.perf_counter() - clock
+        except Exception as e:
+            result['error'] = str(e)
+
+    clock = time.perf_counter()
     try:
-        api_start = time.time()
-        logging.info(f"API request: yf.download(batch={batch}, period='{PERIOD}', interval='{INTERVAL}', group_by='{GROUP_BY}', progress=False, auto_adjust={AUTO_ADJUST})")
-        data = yf.download(batch, period=PERIOD, interval=INTERVAL, group_by=GROUP_BY, progress=False, auto_adjust=AUTO_ADJUST)
-        api_end = time.time()
-        logging.info(f"API request for batch {batch} completed in {api_end - api_start:.2f} seconds.")
+        latest_entries = {ticker: _latest_year_entry(company) or {} for ticker, company, _, _ in tasks}
+        analytics = price_analytics(
+            price_frames,
+            {ticker: entry.get('DCFValue') for ticker, entry in latest_entries.items()},
+            {ticker: entry.get('ExitMultipleValue') for ticker, entry in latest_entries.items()})
     except Exception as e:
-        logging.error(f"Error fetching batch {batch}: {str(e)}")
-        continue
+        for result in results:
+            if result['error'] is None:
+                result['error'] = f'price analytics: {str(e)}'
+    timings['analytics'] += time.perf_counter() - clock
 
-    for ticker in batch:
+    for (ticker, company, score, previous), result in zip(tasks, results):
+        if result['error'] is not None:
+            continue
         try:
-            company = company_data[ticker]
-
-            # Extract prices
-            try:
-                if ticker in data.columns.get_level_values(0):
-                    prices = data[ticker].reset_index()[['Date', 'Close']].to_dict(orient='records')
-                else:
-                    prices = data.reset_index()[['Date', 'Close']].to_dict(orient='records')
-            except:
-                prices = []
-
-            # Find the latest year entry (by YEARS order)
-            latest_year_entry = None
-            for y in reversed(YEARS):
-                for entry in company['Years']:
-                    if entry['Year'] == y:
-                        latest_year_entry = entry
-                        break
-                if latest_year_entry:
-                    break
-            perf_metrics = latest_year_entry['PerformanceMetrics'] if latest_year_entry else {}
-
-            # Calculate Points
-            points = sum(1 for v in perf_metrics.values() if v['Evaluation'] == 'Strong') - sum(1 for v in perf_metrics.values() if v['Evaluation'] == 'Weak')
-
-            # Calculate Comparatives
-            strong = sum(1 for v in perf_metrics.values() if v['Evaluation'] == 'Strong')
-            weak = sum(1 for v in perf_metrics.values() if v['Evaluation'] == 'Weak')
-            comparatives = (strong / weak ) if weak > 0 else float('inf') if strong > 0 else 0.0
-
-            # Build detailed JSON
-            detailed_json = {
-                'Company': company['Company'],
-                'Ticker': company['Ticker'],
-                'Sector': company['Sector'],
-                'Description': company['Description'],
-                'Years': company['Years'],
-                'HistoricalPrices': prices,
-                'Points': points,
-                'Comparatives': comparatives
-            }
-
-            def clean_nan_to_empty_str(obj):
-                if isinstance(obj, float) and math.isnan(obj):
-                    return ""
-                if isinstance(obj, dict):
-                    return {k: clean_nan_to_empty_str(v) for k, v in obj.items()}
-                if isinstance(obj, list):
-                    return [clean_nan_to_empty_str(x) for x in obj]
-                return obj
-
-            with open(os.path.join(DETAILS_DIR, f'{ticker}.json'), 'w') as f:
-                json.dump(clean_nan_to_empty_str(detailed_json), f, indent=4, default=str)
-                total_files_created += 1
-
-            # Summary entry
-            current_price = None
-            current_price_date = None
-            if prices:
-                for price_entry in reversed(prices):
-                    price_val = price_entry.get('Close')
-                    if price_val is not None and not (isinstance(price_val, float) and math.isnan(price_val)):
-                        current_price = price_val
-                        current_price_date = price_entry.get('Date')
-                        break
-                latest_price_val = prices[-1].get('Close')
-                if latest_price_val is None or (isinstance(latest_price_val, float) and math.isnan(latest_price_val)):
-                    logging.error(f"Latest price for {ticker} is NaN or None. Using most recent non-NaN price: {current_price} (date: {current_price_date})")
+            clock = time.perf_counter()
+            detailed_json, summary_record, sidecar = build_records(company, score, price_frames[ticker],
+                                                                   analytics[ticker])
+            timings['transform'] += time.perf_counter() - clock
+
+            clock = time.perf_counter()
+            if OUTPUT_FORMAT == 'compact':
+                detail_content = dumps_compact(detailed_json)
             else:
-                current_price = None
-                current_price_date = None
-
-            summary_list.append({
-                'Company': company['Company'],
-                'Ticker': company['Ticker'],
-                'Sector': company['Sector'],
-                'Description': company['Description'],
-                'CurrentPrice': current_price,
-                'MarketCap': latest_year_entry['MarketCap'] if latest_year_entry else "",
-                'DCFValue': latest_year_entry['DCFValue'] if latest_year_entry else "",
-                'ExitMultipleValue': latest_year_entry['ExitMultipleValue'] if latest_year_entry else "",
-                'Points': points,
-                'Comparatives': comparatives,
-                'LatestPerformanceMetrics': perf_metrics
-            })
+                detail_content = json.dumps(detailed_json, indent=4, default=str)
+            timings['serialize'] += time.perf_counter() - clock
 
+            clock = time.perf_counter()
+            outputs = [(f'{DETAILS_SUBDIR}/{ticker}.json', detail_content)]
+            if sidecar is not None:
+                outputs.insert(0, (f'{DETAILS_SUBDIR}/{ticker}.prices.bin', sidecar))
+            for relpath, content in outputs:
+                digest, size, changed = stage_content(output_dir, staging_dir, relpath, content, previous.get(relpath))
+                result['files'].append((relpath, digest, size, changed))
+            timings['write'] += time.perf_counter() - clock
+            result['summary'] = summary_record
         except Exception as e:
-            logging.error(f"Error processing {ticker}: {str(e)}")
+            result['error'] = str(e)
+    return results, timings
+
+
+def build_outputs(batches, sheets, scores, price_store, publisher, metrics, workers=None, rendered=None):
+    """
+    Stage the detail file of every ticker in batches, yielding summary records.
+
+    Batches are rendered by a pool of RENDER_WORKERS processes as they arrive,
+    so building, encoding and writing run on every core while later batches
+    are still being fetched. At most 2 * workers batches are in flight, so
+    a slow consumer pauses fetching instead of buffering results.
+
+    Args:
+        batches (iterable): Lists of tickers whose stored prices are current
+        sheets (dict): Year sheets, oldest first; company records are built per batch
+        scores (Mapping): Ticker -> score_universe entry
+        price_store (PriceStore): Source of the price history
+        publisher (Publisher): Output staging
+        metrics (RunMetrics): Run metrics
+        workers (int): Render processes (defaults to RENDER_WORKERS)
+        rendered (list): If given, tickers whose files were staged are appended to it
+
+    Yields:
+        dict: Summary record of every ticker that was processed, in batch order
+    """
+    from .ingest import build_company_data
+    from .detail_format import clean_nan_to_empty_str
+
+    def tasks(batch):
+        with metrics.stage('records'):
+            company_data = build_company_data(sheets, list(sheets), batch)
+            ticker_scores = [scores[ticker] for ticker in batch]
+        with metrics.stage('clean_nan'):
+            ticker_scores = [clean_nan_to_empty_str(score) for score in ticker_scores]
+        return [(ticker, company_data[ticker], score,
+                 {relpath: publisher.previous_sha256(relpath)
+                  for relpath in (f'{DETAILS_SUBDIR}/{ticker}.json', f'{DETAILS_SUBDIR}/{ticker}.prices.bin')})
+                for ticker, score in zip(batch, ticker_scores)]
+
+    workers = workers or RENDER_WORKERS or os.cpu_count() or 1
+    if workers <= 1:
+        _render_state['price_store'] = price_store
+        outcomes = ((batch, render_batch(tasks(batch), publisher.output_dir, publisher.staging_dir)) for batch in batches)
+        executor = None
+    else:
+        import multiprocessing
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Not fork: the fetcher's threads are running when the pool starts
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                                       initializer=_init_render_worker, initargs=(price_store.path,))
+
+        def submitted():
+            # Submitting drives the fetch generator; rendering overlaps with it
+            pending = deque()
+            for batch in batches:
+                pending.append((batch, executor.submit(render_batch, tasks(batch), publisher.output_dir, publisher.staging_dir)))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+        outcomes = submitted()
+
+    processed = 0
+    try:
+        for batch, outcome in outcomes:
+            processed += len(batch)
+            print(f'Processing tickers {processed - len(batch) + 1} to {processed}...')
+            if executor is not None:
+                try:
+                    with metrics.stage('render_wait'):
+                        outcome = outcome.result()
+                except Exception as e:
+                    outcome = ([{'ticker': ticker, 'summary': None, 'files': [], 'flags': [], 'error': str(e)}
+                                for ticker in batch], {})
+            results, timings = outcome
+            for stage, seconds in timings.items():
+                metrics.add_time(stage, seconds)
+            for result in results:
+                ticker = result['ticker']
+                for kind in result['flags']:
+                    metrics.flag_ticker(kind, ticker)
+                if result['error'] is not None:
+                    logging.error(f"Error processing {ticker}: {result['error']}")
+                    metrics.flag_ticker('processing_errors', ticker)
+                    # Keep serving the previous run's files for this ticker
+                    publisher.keep(f'{DETAILS_SUBDIR}/{ticker}.json')
+                    publisher.keep(f'{DETAILS_SUBDIR}/{ticker}.prices.bin')
+                    continue
+                for relpath, digest, size, changed in result['files']:
+                    publisher.record(relpath, digest, size, changed)
+                metrics.count('detail_files')
+                if rendered is not None:
+                    rendered.append(ticker)
+                yield result['summary']
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def merge_summary(summaries, companies):
+    """
+    Merge freshly built summary records into the published companies.json.
+
+    Companies that were not refreshed keep their previous record; the result
+    is in workbook order and drops companies no longer in the workbook. The
+    previous file is streamed, holding only records that appear out of
+    workbook order.
+
+    Args:
+        summaries (dict): Ticker -> fresh summary record
+        companies (dict): Workbook tickers, in order
+
+    Yields:
+        dict: Summary records, in workbook order
+    """
+    from .json_stream import iter_json_array
+
+    def previous_records():
+        if not os.path.exists(SUMMARY_FILE):
+            return
+        try:
+            with open(SUMMARY_FILE) as f:
+                for record in iter_json_array(f):
+                    if record['Ticker'] in companies and record['Ticker'] not in summaries:
+                        yield record
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read {SUMMARY_FILE} for merging: {str(e)}")
+
+    previous = previous_records()
+    held = {}
+    for ticker in companies:
+        if ticker in summaries:
+            yield summaries[ticker]
             continue
+        while ticker not in held:
+            record = next(previous, None)
+            if record is None:
+                break
+            held[record['Ticker']] = record
+        if ticker in held:
+            yield held.pop(ticker)
 
-    time.sleep(API_DELAY)
 
-# ================================
-# Save Summary JSON
-# ================================
-try:
-    with open(SUMMARY_FILE, 'w') as f:
-        json.dump(summary_list, f, indent=4, default=str)
-    logging.info(f"Summary JSON created: {SUMMARY_FILE}")
-except Exception as e:
-    logging.error(f"Error writing summary JSON: {str(e)}")
+def write_summary(records, publisher, metrics):
+    """
+    Stage companies.json, the slim companies index and the search index.
 
-# ================================
-# Final Log
-# ================================
-end_time = datetime.now()
-duration = (end_time - start_time).total_seconds()
-logging.info(f"Script completed in {duration:.2f} seconds.")
-logging.info(f"API batches processed: {api_batches}")
-logging.info(f"Company JSON files created: {total_files_created}")
+    Records are consumed one at a time: each is appended to the staged
+    companies.json and added to the index builders.
+    An error while producing the records discards the partial companies.json
+    and propagates, so nothing is published.
+
+    Args:
+        records (iterable): Summary records, in output order
+        publisher (Publisher): Output staging
+        metrics (RunMetrics): Run metrics
+    """
+    from .detail_format import dumps_compact
+    from .json_stream import JsonArrayWriter
+    from .summary_index import SummaryIndexBuilder
+    from .search_index import SearchIndexBuilder
+
+    # Slim index for the companies table; descriptions and metrics stay in the detail files
+    builder = SummaryIndexBuilder()
+    search = SearchIndexBuilder()
+    with publisher.open(SUMMARY_RELPATH) as stream:
+        writer = JsonArrayWriter(stream)
+        for record in records:
+            with metrics.stage('summary'):
+                writer.write(record)
+                builder.add(record)
+                search.add(record)
+        writer.close()
+    logging.info(f"Summary JSON created: {SUMMARY_FILE} ({writer.count} companies)")
+
+    try:
+        with metrics.stage('summary_index'):
+            publisher.stage(INDEX_RELPATH, dumps_compact(builder.finish()))
+        logging.info(f"Summary index created: {SUMMARY_INDEX_FILE}")
+    except Exception as e:
+        logging.error(f"Error writing summary index: {str(e)}")
+        publisher.keep(INDEX_RELPATH)
+
+    try:
+        with metrics.stage('search_index'):
+            publisher.stage(SEARCH_RELPATH, dumps_compact(search.finish()))
+        logging.info(f"Search index created: {SEARCH_INDEX_FILE}")
+    except Exception as e:
+        logging.error(f"Error writing search index: {str(e)}")
+        publisher.keep(SEARCH_RELPATH)
+
+
+def write_quotes(tickers, price_store, publisher, metrics):
+    """
+    Stage quotes.json with the latest stored close of every ticker.
+
+    On error the previously published file is kept.
+    """
+    from .detail_format import dumps_compact
+    from .quotes import build_quotes
+
+    try:
+        with metrics.stage('quotes'):
+            quotes = build_quotes(tickers, price_store)
+            publisher.stage(QUOTES_RELPATH, dumps_compact(quotes))
+        logging.info(f"Quotes file created: {QUOTES_FILE} ({len(quotes['Ticker'])} tickers)")
+    except Exception as e:
+        logging.error(f"Error writing quotes: {str(e)}")
+        publisher.keep(QUOTES_RELPATH)
+
+
+def run(tickers=None, sector=None, prices_only=False, fundamentals_only=False, quotes_only=False, dry_run=False,
+        force=False):
+    """
+    Run the pipeline.
+
+    Args:
+        tickers (list): Only refresh these tickers
+        sector (str): Only refresh companies in this sector
+        prices_only (bool): Refresh the price store without writing JSON
+        quotes_only (bool): Refresh the price store and publish only quotes.json
+        fundamentals_only (bool): Rebuild JSON from stored prices without fetching;
+            without a ticker/sector selection only stale tickers are rebuilt
+        dry_run (bool): Report what would be fetched and rewritten, changing nothing
+        force (bool): With fundamentals_only, rebuild every ticker, stale or not
+
+    Returns:
+        dict: Publish counts ('changed', 'unchanged', 'removed'), empty for
+              prices-only runs
+    """
+    from .metrics import RunMetrics
+    from .price_store import PriceStore
+    from .fundamentals_store import FundamentalsStore
+    from .publish import Publisher
+
+    start_time = datetime.now()
+    logging.info("Script started.")
+    metrics = RunMetrics()
+    metrics.set_context(tickers=tickers, sector=sector, prices_only=prices_only,
+                        fundamentals_only=fundamentals_only, quotes_only=quotes_only, dry_run=dry_run, force=force)
+
+    fundamentals = FundamentalsStore(FUNDAMENTALS_STORE_FILE)
+    price_store = PriceStore(PRICE_STORE_FILE)
+    try:
+        sheets, companies, scores, stale = load_fundamentals(fundamentals, metrics, dry_run)
+        selected = select_tickers(companies, tickers, sector)
+        if fundamentals_only and not (tickers or sector or force):
+            # Stored prices did not move, so only stale tickers can produce different files
+            selected = [ticker for ticker in selected if ticker in stale]
+            if not selected:
+                print("All published files are up to date.")
+                logging.info("Fundamentals-only run: no stale tickers.")
+                return {}
+        selective = len(selected) < len(companies)
+        if not selected:
+            print("No tickers selected.")
+            logging.warning("No tickers selected.")
+            return {}
+        print(f"Selected {len(selected)} of {len(companies)} tickers.")
+        metrics.count('tickers', len(selected))
+
+        if fundamentals_only:
+            chunks = [(selected[i:i + BATCH_SIZE], []) for i in range(0, len(selected), BATCH_SIZE)]
+        else:
+            chunks = plan_fetches(selected, price_store, retry_all=bool(tickers))
+            requests = [request for _, batch_requests in chunks for request in batch_requests]
+            full_count = sum(len(batch) for batch, full, _ in requests if full)
+            incremental_count = sum(len(batch) for batch, full, _ in requests if not full)
+            skipped_count = len(selected) - full_count - incremental_count
+            print(f"Price fetch plan: {len(requests)} requests, {full_count} full backfills, "
+                  f"{incremental_count} incremental, {skipped_count} skipped (resumed or backing off).")
+            metrics.count('tickers_full_refresh', full_count)
+            metrics.count('tickers_incremental', incremental_count)
+            metrics.count('tickers_fetch_skipped', skipped_count)
+            if dry_run and (prices_only or quotes_only):
+                return {}
+
+        if dry_run or fundamentals_only:
+            # Outputs are built from whatever the store already holds
+            batches = (batch for batch, _ in chunks)
+        else:
+            batches = fetch_prices(chunks, price_store, metrics)
+
+        if prices_only:
+            for _ in batches:
+                pass
+            if not dry_run:
+                # The published files no longer show the stored prices
+                fundamentals.mark_stale(selected)
+                price_store.clear_checkpoint(selected)
+            publish_counts = {}
+        elif quotes_only:
+            for _ in batches:
+                pass
+            # Everything but the quotes stays as the last full run published it
+            publisher = Publisher(DATA_DIR, STAGING_DIR)
+            publisher.keep_all(exclude=[QUOTES_RELPATH])
+            write_quotes(list(companies), price_store, publisher, metrics)
+            with metrics.stage('publish'):
+                publish_counts = publisher.commit()
+            # Detail files and summary no longer show the stored prices
+            fundamentals.mark_stale(selected)
+            price_store.clear_checkpoint(selected)
+        else:
+            # Selective runs leave every other published file in place
+            publisher = Publisher(DATA_DIR, STAGING_DIR, prune_dirs=[] if selective else [DETAILS_SUBDIR])
+            if selective:
+                publisher.keep_dir(DETAILS_SUBDIR)
+            rendered = []
+            records = build_outputs(batches, sheets, scores, price_store, publisher, metrics, rendered=rendered)
+            if selective:
+                # Only the selected records are held; the rest stream from the published file
+                records = merge_summary({record['Ticker']: record for record in records}, companies)
+            write_summary(records, publisher, metrics)
+            write_quotes(list(companies), price_store, publisher, metrics)
+
+            if dry_run:
+                counts = {'changed': len(publisher.changed), 'unchanged': len(publisher.unchanged), 'removed': 0}
+                print(f"Dry run: {counts['changed']} files would be rewritten, {counts['unchanged']} unchanged.")
+                for relpath in publisher.changed[:20]:
+                    print(f"  {relpath}")
+                if counts['changed'] > 20:
+                    print(f"  ... and {counts['changed'] - 20} more")
+                publisher.discard()
+                return counts
+
+            with metrics.stage('publish'):
+                publish_counts = publisher.commit()
+            # Tickers that left the workbook have nothing left to rebuild
+            fundamentals.clear_stale(rendered + [ticker for ticker in stale if ticker not in companies])
+            if not fundamentals_only:
+                # The run finished, so the next one fetches everything again
+                price_store.clear_checkpoint(selected)
+            for relpath, entry in publisher.files.items():
+                metrics.record_file(relpath, entry['bytes'])
+    finally:
+        price_store.close()
+        fundamentals.close()
+
+    # ================================
+    # Final Log
+    # ================================
+    duration = (datetime.now() - start_time).total_seconds()
+    logging.info(f"Script completed in {duration:.2f} seconds.")
+    logging.info(f"API batches processed: {metrics.counters.get('api_batches', 0)}")
+    logging.info(f"Company JSON files created: {metrics.counters.get('detail_files', 0)}")
+    if publish_counts:
+        logging.info(f"Files rewritten: {publish_counts['changed']}, unchanged: {publish_counts['unchanged']}, removed: {publish_counts['removed']}")
+        for key, value in publish_counts.items():
+            metrics.count(f'files_{key}', value)
+    metrics.write(METRICS_FILE, METRICS_HISTORY_FILE, METRICS_HISTORY_LINES)
+    print(f"Done in {duration:.2f} seconds.")
+    return publish_counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m data_script',
+                                     description='Build the published company data.')
+    parser.add_argument('--tickers', nargs='+', metavar='TICKER',
+                        help='only refresh these tickers (space or comma separated)')
+    parser.add_argument('--sector', help='only refresh companies in this sector')
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument('--prices-only', action='store_true',
+                       help='refresh the price store without writing JSON')
+    modes.add_argument('--quotes-only', action='store_true',
+                       help='refresh the price store and publish only quotes.json (fast, frequent refresh)')
+    modes.add_argument('--fundamentals-only', action='store_true',
+                       help='rebuild JSON from the workbook and stored prices without fetching '
+                            '(only stale tickers unless --tickers, --sector or --force is given)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='show what would be fetched and rewritten without changing anything')
+    parser.add_argument('--force', action='store_true',
+                        help='with --fundamentals-only, rebuild every ticker even if it is not stale')
+    args = parser.parse_args(argv)
+
+    tickers = [t for arg in args.tickers for t in arg.split(',') if t] if args.tickers else None
+    setup_logging()
+    run(tickers=tickers, sector=args.sector, prices_only=args.prices_only,
+        fundamentals_only=args.fundamentals_only, quotes_only=args.quotes_only, dry_run=args.dry_run,
+        force=args.force)
+    return 0
+
+
+if __name__ == '__main__':
+    if not __package__:
+        # Started as python data_script/update_data.py: go through the package
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from data_script.update_data import main
+    sys.exit(main())
@@ -1,24 +1,26 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useMemo } from "react";
 import { Link, useNavigate } from "react-router-dom";
-import axios from "axios";
 import { OverlayTrigger, Popover } from "react-bootstrap";
 import Skeleton from "react-loading-skeleton";
 import "react-loading-skeleton/dist/skeleton.css";
+import { loadCompaniesIndex } from "../../utils/companiesIndex";
+import { loadCompanySearch } from "../../utils/companySearch";
 
 function CompaniesTable() {
   const [companies, setCompanies] = useState([]);
+  const [sortOrders, setSortOrders] = useState({});
   const [industryOptions, setIndustryOptions] = useState(["All sectors"]);
   const [loading, setLoading] = useState(true); // Add loading state
+  const [companySearch, setCompanySearch] = useState(null);
 
   useEffect(() => {
-    axios
-      .get(`${import.meta.env.BASE_URL}/companies-data/companies.json`)
-      .then((response) => {
-        setCompanies(response.data);
+    loadCompaniesIndex()
+      .then((index) => {
+        setCompanies(index.companies);
+        setSortOrders(index.sortOrders);
         setLoading(false); // Set loading to false after data is fetched
-        // Extract unique sectors for filter dropdown
-        const sectors = Array.from(new Set(response.data.map((c) => c.Sector)));
-        setIndustryOptions(["All sectors", ...sectors.filter(Boolean).sort()]);
+        // Sectors for the filter dropdown come pre-sorted in the index
+        setIndustryOptions(["All sectors", ...index.sectors]);
       })
       .catch((error) => {
         console.error("Failed to load companies:", error);
@@ -26,6 +28,14 @@ function CompaniesTable() {
       });
   }, []);
 
+  // The search index arrives after the table; until then search scans rows
+  useEffect(() => {
+    if (!companies.length) return;
+    loadCompanySearch(companies)
+      .then(setCompanySearch)
+      .catch((error) => console.error("Failed to load search index:", error));
+  }, [companies]);
+
   const [sortField, setSortField] = useState(null);
   const [sortOrder, setSortOrder] = useState("asc");
   const [currentPage, setCurrentPage] = useState(1);
@@ -45,85 +55,39 @@ function CompaniesTable() {
     setCurrentPage(1);
   };
 
-  const filterByMarketCap = (comp) => {
-    if (!filterMarketCap) return true;
-    const cap = comp.MarketCap / 1e9; // Convert to billions
-    if (filterMarketCap === "Micro") return cap < 2;
-    if (filterMarketCap === "Small") return cap >= 2 && cap < 10;
-    if (filterMarketCap === "Mid") return cap >= 10 && cap <= 200;
-    if (filterMarketCap === "Large") return cap > 200;
-    return true;
+  const searchHits = useMemo(
+    () => (companySearch ? companySearch.search(searchTerm) : null),
+    [companySearch, searchTerm]
+  );
+
+  const matchesSearch = (comp) => {
+    if (companySearch) return !searchHits || searchHits[comp.Row] === 1;
+    const term = searchTerm.toLowerCase();
+    return (
+      comp.Company.toLowerCase().includes(term) ||
+      comp.Ticker.toLowerCase().includes(term)
+    );
   };
 
-  const filtered = companies.filter((comp) => {
+  const matches = (comp) => {
     return (
       (filterIndustry === "" ||
         filterIndustry === "All sectors" ||
         comp.Sector === filterIndustry) &&
-      filterByMarketCap(comp) &&
-      (comp.Company.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        comp.Ticker.toLowerCase().includes(searchTerm.toLowerCase()))
+      (!filterMarketCap || comp.MarketCapBucket === filterMarketCap) &&
+      matchesSearch(comp)
     );
-  });
+  };
 
-  const sorted = [...filtered].sort((a, b) => {
-    if (sortField) {
-      let valA = a[sortField];
-      let valB = b[sortField];
-      if (sortField === "Company") {
-        valA = typeof valA === "string" ? valA.toLowerCase() : valA;
-        valB = typeof valB === "string" ? valB.toLowerCase() : valB;
-      }
-      if (sortField === "Sector") {
-        valA = typeof valA === "string" ? valA.toLowerCase() : valA;
-        valB = typeof valB === "string" ? valB.toLowerCase() : valB;
-      }
-      if (sortField === "CurrentPrice" || sortField === "MarketCap") {
-        valA = Number(valA) || 0;
-        valB = Number(valB) || 0;
-      }
-      if (sortField === "IntrinsicValue") {
-        // Sort by average of DCF and Exit Multiple values
-        const getIntrinsicAvg = (comp) => {
-          if (
-            comp.DCFValue != null &&
-            comp.ExitMultipleValue != null &&
-            !isNaN(comp.DCFValue) &&
-            !isNaN(comp.ExitMultipleValue)
-          ) {
-            return (Number(comp.DCFValue) + Number(comp.ExitMultipleValue)) / 2;
-          }
-          return -Infinity; // Treat missing as lowest
-        };
-        valA = getIntrinsicAvg(a);
-        valB = getIntrinsicAvg(b);
-      }
-      if (sortField === "Difference") {
-        // Calculate difference for a and b
-        const getDiff = (comp) => {
-          if (
-            comp.DCFValue != null &&
-            comp.ExitMultipleValue != null &&
-            comp.CurrentPrice != null &&
-            !isNaN(comp.DCFValue) &&
-            !isNaN(comp.ExitMultipleValue) &&
-            !isNaN(comp.CurrentPrice) &&
-            comp.CurrentPrice !== 0
-          ) {
-            const avg =
-              (Number(comp.DCFValue) + Number(comp.ExitMultipleValue)) / 2;
-            return avg / Number(comp.CurrentPrice) - 1;
-          }
-          return -Infinity; // Treat missing as lowest
-        };
-        valA = getDiff(a);
-        valB = getDiff(b);
-      }
-      if (valA < valB) return sortOrder === "asc" ? -1 : 1;
-      if (valA > valB) return sortOrder === "asc" ? 1 : -1;
-    }
-    return 0;
-  });
+  const filtered = companies.filter(matches);
+
+  // Walk the precomputed row order for the sort column instead of sorting
+  const order = sortField ? sortOrders[sortField] : null;
+  const sorted = order
+    ? (sortOrder === "asc" ? order : [...order].reverse())
+        .map((i) => companies[i])
+        .filter(matches)
+    : filtered;
 
   // Check if mobile view
   const isMobile = window.innerWidth < 992;
@@ -195,7 +159,7 @@ function CompaniesTable() {
           <input
             type="text"
             className="form-control mb-2"
-            placeholder="Search by Company or Ticker"
+            placeholder="Search by Company, Ticker or Keyword"
             value={searchTerm}
             onChange={(e) => {
               setSearchTerm(e.target.value);
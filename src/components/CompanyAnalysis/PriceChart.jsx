@@ -15,23 +15,16 @@ import {
   Legend,
 } from "recharts";
 import { ButtonGroup, Button } from "react-bootstrap";
-
-export default function PriceChart({
-  intrinsicValueEstimates = [],
-  dailyStockPrice = [],
-}) {
-  const PERIODS = [
-    { label: "5Y", years: 5 },
-    { label: "4Y", years: 4 },
-    { label: "3Y", years: 3 },
-    { label: "2Y", years: 2 },
-    { label: "1Y", years: 1 },
-    { label: "YTD", years: "YTD" },
-  ];
-  const [selectedPeriod, setSelectedPeriod] = useState("1Y");
-
-  if (!dailyStockPrice.length) return null;
-
+import { decodeChartSeries } from "../../utils/historicalPrices";
+
+// Legacy path for detail files without precomputed ChartSeries: filter the
+// daily prices to the selected period and align the intrinsic value bands.
+function computeSeries(
+  dailyStockPrice,
+  intrinsicValueEstimates,
+  selectedPeriod,
+  PERIODS
+) {
   // --- Filter data by selected period ---
   const now = new Date();
   let periodStartDate;
@@ -71,11 +64,7 @@ export default function PriceChart({
     };
   });
 
-  if (!filledData.length)
-    return <div className="mb-4 mt-4">No data for selected period.</div>;
-
-  const chartStart = filledData[0].date.split("T")[0];
-  const chartEnd = filledData[filledData.length - 1].date.split("T")[0];
+  if (!filledData.length) return { filledData };
 
   const allValues = filledData.reduce((acc, item) => {
     acc.push(item.price);
@@ -89,16 +78,6 @@ export default function PriceChart({
   const paddedMin = minY * 0.95;
   const paddedMax = maxY * 1.05;
 
-  const numberOfTicks = 4;
-  const yTicks = Array.from(
-    { length: numberOfTicks },
-    (_, i) => paddedMin + (i * (paddedMax - paddedMin)) / (numberOfTicks - 1)
-  );
-
-  // Check if any stock price is >= 1000 to adjust left margin
-  const hasHighPrice = filledData.some((item) => item.price >= 1000);
-  const leftMargin = hasHighPrice ? 10 : 5;
-
   // Generate month or year ticks based on selected period
   const generateTicks = () => {
     const startDate = new Date(filledData[0].date);
@@ -162,6 +141,83 @@ export default function PriceChart({
 
   const tickDates = generateTicks();
 
+  // Filled areas between DCF and Exit Multiple values, clamped to the
+  // closest available dates in filledData
+  const getClosestDate = (target) => {
+    return filledData.reduce((prev, curr) => {
+      return Math.abs(new Date(curr.date) - new Date(target)) <
+        Math.abs(new Date(prev.date) - new Date(target))
+        ? curr
+        : prev;
+    }).date;
+  };
+  const bands = filteredIntrinsicValueEstimates
+    .map((q) => ({
+      ...q,
+      clampedStart: getClosestDate(q.startDate),
+      clampedEnd: getClosestDate(q.endDate),
+    }))
+    .filter(
+      (q) =>
+        new Date(q.clampedStart) <= new Date(q.clampedEnd) &&
+        !isNaN(q.DCFValue) &&
+        !isNaN(q.ExitMultipleValue)
+    )
+    .map((q) => ({
+      x1: q.clampedStart,
+      x2: q.clampedEnd,
+      y1: Math.min(q.DCFValue, q.ExitMultipleValue),
+      y2: Math.max(q.DCFValue, q.ExitMultipleValue),
+    }));
+
+  return { filledData, tickDates, bands, paddedMin, paddedMax };
+}
+
+export default function PriceChart({
+  intrinsicValueEstimates = [],
+  dailyStockPrice = [],
+  chartSeries = null,
+}) {
+  const PERIODS = [
+    { label: "5Y", years: 5 },
+    { label: "4Y", years: 4 },
+    { label: "3Y", years: 3 },
+    { label: "2Y", years: 2 },
+    { label: "1Y", years: 1 },
+    { label: "YTD", years: "YTD" },
+  ];
+  const [selectedPeriod, setSelectedPeriod] = useState("1Y");
+
+  if (!dailyStockPrice.length) return null;
+
+  // Use the series precomputed by the data pipeline when the detail file
+  // has one; older files are filtered and aligned here instead.
+  const precomputed = chartSeries && chartSeries[selectedPeriod];
+  const { filledData, tickDates, bands, paddedMin, paddedMax } = precomputed
+    ? decodeChartSeries(precomputed)
+    : computeSeries(
+        dailyStockPrice,
+        intrinsicValueEstimates,
+        selectedPeriod,
+        PERIODS
+      );
+
+  if (!filledData.length)
+    return <div className="mb-4 mt-4">No data for selected period.</div>;
+
+  const chartStart = filledData[0].date.split("T")[0];
+  const chartEnd = filledData[filledData.length - 1].date.split("T")[0];
+
+  const numberOfTicks = 4;
+  const yTicks = Array.from(
+    { length: numberOfTicks },
+    (_, i) => paddedMin + (i * (paddedMax - paddedMin)) / (numberOfTicks - 1)
+  );
+
+  // Check if any stock price is >= 1000 to adjust left margin
+  const hasHighPrice = filledData.some((item) => item.price >= 1000);
+  const leftMargin = hasHighPrice ? 10 : 5;
+
   const CustomTooltip = ({ active, payload, label }) => {
     if (active && payload && payload.length > 0) {
       const price = payload[0].value;
@@ -625,44 +681,17 @@ export default function PriceChart({
           />
 
           {/* Filled areas between DCF and Exit Multiple values */}
-          {filteredIntrinsicValueEstimates
-            .map((q) => {
-              // Find the closest available dates in filledData for x1 and x2
-              const getClosestDate = (target) => {
-                return filledData.reduce((prev, curr) => {
-                  return Math.abs(new Date(curr.date) - new Date(target)) <
-                    Math.abs(new Date(prev.date) - new Date(target))
-                    ? curr
-                    : prev;
-                }).date;
-              };
-              const clampedStart = getClosestDate(q.startDate);
-              const clampedEnd = getClosestDate(q.endDate);
-              return {
-                ...q,
-                clampedStart,
-                clampedEnd,
-              };
-            })
-            .filter(
-              (q) =>
-                new Date(q.clampedStart) <= new Date(q.clampedEnd) &&
-                !isNaN(q.DCFValue) &&
-                !isNaN(q.ExitMultipleValue)
-            )
-            .map((q, i) => {
-              return (
-                <ReferenceArea
-                  key={i}
-                  x1={q.clampedStart}
-                  x2={q.clampedEnd}
-                  y1={Math.min(q.DCFValue, q.ExitMultipleValue)}
-                  y2={Math.max(q.DCFValue, q.ExitMultipleValue)}
-                  fill="#4caf50"
-                  fillOpacity={0.2}
-                />
-              );
-            })}
+          {bands.map((band, i) => (
+            <ReferenceArea
+              key={i}
+              x1={band.x1}
+              x2={band.x2}
+              y1={band.y1}
+              y2={band.y2}
+              fill="#4caf50"
+              fillOpacity={0.2}
+            />
+          ))}
 
           {/* DCF and Exit Multiple lines on top of the areas */}
           <Line
@@ -21,43 +21,47 @@ import Skeleton from "react-loading-skeleton";
 import "react-loading-skeleton/dist/skeleton.css";
 
 import React, { useState, useEffect } from "react";
-import axios from "axios";
+import {
+  loadCompanyDetail,
+  toDailyStockPrice,
+  withQuote,
+  chartSeriesWithQuote,
+} from "../../utils/historicalPrices";
+import { loadQuotes } from "../../utils/quotes";
 
 // <span className="badge display-2 text-bg-warning">Top 3%</span>
 
 export default function CompanyAnalysis() {
   const [companyData, setcompanyData] = useState({});
+  const [quote, setQuote] = useState(null);
 
   const url = new URL(window.location.href);
   const params = new URLSearchParams(url.hash.split("?")[1]);
 
   const ticker = params.get("ticker");
-  const dataURL = `${
-    import.meta.env.BASE_URL
-  }companies-data/details/${ticker}.json`;
-  // console.log(dataURL);
 
   useEffect(() => {
-    axios
-      .get(dataURL)
-      .then((response) => {
-        setcompanyData(response.data);
+    loadCompanyDetail(ticker)
+      .then((data) => {
+        setcompanyData(data);
 
-        // console.log(response.data);
-        // console.log(response.data.Years[0]);
+        // console.log(data);
+        // console.log(data.Years[0]);
       })
       .catch((error) => {
         console.error("Failed to load data:", error);
       });
+    // Latest close from quotes.json, newer than the detail file between full runs
+    loadQuotes().then((quotes) => setQuote(quotes && quotes[ticker]));
   }, []);
 
   // Prepare data for PriceChart
-  // HistoricalPrices: [{ Date, Close }]
+  // HistoricalPrices: legacy [{ Date, Close }] records or columnar arrays
   // Years: [{ Year, DCFValue, ExitMultipleValue }]
-  const dailyStockPrice = (companyData.HistoricalPrices || []).map((p) => ({
-    date: p.Date.split("T")[0],
-    price: Number(p.Close),
-  }));
+  const dailyStockPrice = withQuote(
+    toDailyStockPrice(companyData.HistoricalPrices),
+    quote
+  );
 
   // Build intrinsicValueEstimates array from Years
   // Each year is a band from Jan 1 to Dec 31, with DCFValue and ExitMultipleValue
@@ -214,6 +218,7 @@ export default function CompanyAnalysis() {
           <PriceChart
             intrinsicValueEstimates={intrinsicValueEstimates}
             dailyStockPrice={dailyStockPrice}
+            chartSeries={chartSeriesWithQuote(companyData.ChartSeries, quote)}
           />
         </div>
         <div className="col-lg-3 col-12 pt-lg-3">
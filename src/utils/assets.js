@@ -0,0 +1,70 @@
+import axios from "axios";
+
+// assets.json (see data_script/assets.py) maps every published data file to
+// the content hash of its current version. The hashed copies under assets/
+// never change, so they can be cached as immutable; only assets.json itself
+// has to be revalidated. Both are generated when the site is deployed.
+// Without a manifest (e.g. a dev server) files are requested by their fixed
+// names, and so are hashed files that a newer deployment already replaced.
+
+const DATA_URL = `${import.meta.env.BASE_URL}companies-data`;
+
+const DETAILS_PREFIX = "details/";
+const DETAIL_SIDECAR = ".prices.bin";
+const DETAIL_JSON = ".json";
+
+let manifestRequest = null;
+
+export function loadAssetManifest() {
+  if (!manifestRequest) {
+    manifestRequest = axios
+      .get(`${DATA_URL}/assets.json`)
+      .then((response) => response.data)
+      .catch(() => null);
+  }
+  return manifestRequest;
+}
+
+// Hash of a relpath in the manifest: detail files are keyed by ticker
+function assetHash(manifest, relpath) {
+  if (relpath.startsWith(DETAILS_PREFIX)) {
+    const name = relpath.slice(DETAILS_PREFIX.length);
+    if (name.endsWith(DETAIL_SIDECAR)) {
+      return manifest.Sidecars[name.slice(0, -DETAIL_SIDECAR.length)];
+    }
+    if (name.endsWith(DETAIL_JSON)) {
+      return manifest.Details[name.slice(0, -DETAIL_JSON.length)];
+    }
+  }
+  return manifest.Files[relpath];
+}
+
+// Must match assets.hashed_relpath: the hash goes before the last extension
+export function hashedPath(relpath, hash) {
+  const dot = relpath.lastIndexOf(".");
+  const slash = relpath.lastIndexOf("/");
+  const stem = dot > slash ? relpath.slice(0, dot) : relpath;
+  const ext = dot > slash ? relpath.slice(dot) : "";
+  return `assets/${stem}.${hash}${ext}`;
+}
+
+// URL of the current version of a data file, e.g. "companies-index.json" or
+// "details/AAME.json"
+export async function resolveDataURL(relpath) {
+  const manifest = await loadAssetManifest();
+  const hash = manifest && assetHash(manifest, relpath);
+  return `${DATA_URL}/${hash ? hashedPath(relpath, hash) : relpath}`;
+}
+
+export async function getDataFile(relpath, config) {
+  const url = await resolveDataURL(relpath);
+  const fixedURL = `${DATA_URL}/${relpath}`;
+  if (url === fixedURL) return axios.get(url, config);
+  return axios.get(url, config).catch((error) => {
+    // The page loaded assets.json of a previous deployment
+    if (error.response && error.response.status === 404) {
+      return axios.get(fixedURL, config);
+    }
+    throw error;
+  });
+}
@@ -0,0 +1,36 @@
+import { getDataFile } from "./assets";
+import { loadQuotes, applyQuotes } from "./quotes";
+
+// companies-index.json (see data_script/summary_index.py) holds the table
+// columns as parallel arrays, dictionary-encoded sectors and market-cap
+// buckets, and precomputed ascending row orders for every sortable column.
+// Descriptions and full metrics are only in the per-ticker detail files.
+// Prices are overlaid from the more frequently refreshed quotes.json.
+
+// Load the index and expand it into row objects shaped like the old
+// companies.json records, so table rendering code is unchanged.
+export async function loadCompaniesIndex() {
+  const [{ data: index }, quotes] = await Promise.all([
+    getDataFile("companies-index.json"),
+    loadQuotes(),
+  ]);
+  const companies = index.Ticker.map((ticker, i) => ({
+    Company: index.Company[i],
+    Ticker: ticker,
+    Sector: index.Sector[i] == null ? "" : index.Sectors[index.Sector[i]],
+    MarketCap: index.MarketCap[i],
+    CurrentPrice: index.CurrentPrice[i],
+    DCFValue: index.DCFValue[i],
+    ExitMultipleValue: index.ExitMultipleValue[i],
+    Points: index.Points[i],
+    Comparatives: index.Comparatives[i],
+    SectorId: index.Sector[i],
+    Row: i,
+    MarketCapBucket: index.MarketCapBuckets[index.MarketCapBucket[i]],
+  }));
+  return {
+    companies,
+    sectors: index.Sectors,
+    sortOrders: applyQuotes(companies, index.SortOrders, quotes),
+  };
+}
@@ -0,0 +1,116 @@
+import { getDataFile } from "./assets";
+
+// companies-search.json (see data_script/search_index.py) holds sorted
+// tokens with delta-encoded row postings, plus the rows ordered by ticker and
+// by company name. Rows are positions in companies-index.json, so a search
+// returns a mask over the table rows without scanning them.
+
+// Must match search_index.normalize: fold accents, drop other non-ASCII
+// characters, lowercase
+export function normalize(text) {
+  if (typeof text !== "string") return "";
+  return text
+    .normalize("NFKD")
+    .replace(/[\u0080-\uffff]/g, "")
+    .toLowerCase();
+}
+
+export function tokenize(text) {
+  return normalize(text).match(/[a-z0-9]+/g) || [];
+}
+
+// First position in [0, length) whose key is >= target
+function lowerBound(length, keyAt, target) {
+  let lo = 0;
+  let hi = length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (keyAt(mid) < target) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+// [start, end) of the sorted keys that begin with prefix
+function prefixRange(length, keyAt, prefix) {
+  return [
+    lowerBound(length, keyAt, prefix),
+    lowerBound(length, keyAt, prefix + "\uffff"),
+  ];
+}
+
+export function createCompanySearch(index, companies) {
+  const rowCount = companies.length;
+  const tokens = index.Tokens;
+  const postings = index.Postings.map((deltas) => {
+    const rows = new Int32Array(deltas.length);
+    let row = 0;
+    deltas.forEach((delta, i) => {
+      row += delta;
+      rows[i] = row;
+    });
+    return rows;
+  });
+  const tickerKeys = companies.map((comp) => normalize(comp.Ticker));
+  const nameKeys = companies.map((comp) => normalize(comp.Company));
+  const tickerOrder = index.TickerOrder;
+  const nameOrder = index.NameOrder;
+
+  // Mark rows whose whole ticker or name starts with text
+  const markWholePrefix = (hits, order, keys, text) => {
+    const [start, end] = prefixRange(order.length, (i) => keys[order[i]], text);
+    for (let i = start; i < end; i++) hits[order[i]] = 1;
+  };
+
+  return {
+    // Returns a Uint8Array with 1 for every matching row, or null when the
+    // query has nothing to search for. A row matches when its ticker or name
+    // starts with the query, or when every query word is the start of one of
+    // its ticker, name, sector or description words. When no row matches,
+    // rows whose ticker or name contains the query anywhere (the table's
+    // search before the index existed) are returned instead.
+    search(query) {
+      const text = normalize(query).trim();
+      if (!text) return null;
+      const hits = new Uint8Array(rowCount);
+      markWholePrefix(hits, tickerOrder, tickerKeys, text);
+      markWholePrefix(hits, nameOrder, nameKeys, text);
+
+      const terms = [...new Set(tokenize(text))];
+      if (terms.length) {
+        const counts = new Uint16Array(rowCount);
+        const seen = new Int32Array(rowCount).fill(-1);
+        terms.forEach((term, t) => {
+          const [start, end] = prefixRange(tokens.length, (i) => tokens[i], term);
+          for (let i = start; i < end; i++) {
+            const rows = postings[i];
+            for (let j = 0; j < rows.length; j++) {
+              const row = rows[j];
+              // Count each row once per term, however many tokens match
+              if (seen[row] !== t) {
+                seen[row] = t;
+                counts[row]++;
+              }
+            }
+          }
+        });
+        for (let row = 0; row < rowCount; row++) {
+          if (counts[row] === terms.length) hits[row] = 1;
+        }
+      }
+      if (hits.indexOf(1) === -1) {
+        for (let row = 0; row < rowCount; row++) {
+          if (tickerKeys[row].includes(text) || nameKeys[row].includes(text)) {
+            hits[row] = 1;
+          }
+        }
+      }
+      return hits;
+    },
+  };
+}
+
+export async function loadCompanySearch(companies) {
+  const { data: index } = await getDataFile("companies-search.json");
+  return createCompanySearch(index, companies);
+}
@@ -0,0 +1,159 @@
+import { getDataFile } from "./assets";
+
+// Detail files store HistoricalPrices in one of three layouts (see
+// data_script/detail_format.py):
+//   legacy:   [{ Date: "2025-08-25 00:00:00", Close: 3.45 }, ...]
+//   columnar: { Encoding: "columnar", StartDay, DayDeltas: [...], Close: [...] }
+//   binary:   { Encoding: "binary", File: "AAME.prices.bin", Count }
+// loadCompanyDetail resolves the binary sidecar, and toDailyStockPrice turns
+// any of them into the [{ date, price }] series used by the UI. Dates keep the
+// legacy "YYYY-MM-DD 00:00:00" form so they are parsed as local midnight.
+
+const MS_PER_DAY = 86400000;
+const SIDECAR_HEADER_BYTES = 8;
+
+const epochDayToDate = (day) =>
+  `${new Date(day * MS_PER_DAY).toISOString().slice(0, 10)} 00:00:00`;
+
+function decodeSidecar(buffer) {
+  const view = new DataView(buffer);
+  const count = view.getUint32(4, true);
+  const days = new Int32Array(buffer, SIDECAR_HEADER_BYTES, count);
+  const closes = new Float32Array(
+    buffer,
+    SIDECAR_HEADER_BYTES + count * 4,
+    count
+  );
+  return { Encoding: "decoded", Days: days, Close: closes };
+}
+
+// Fetch a company detail file, following a binary price sidecar if present.
+// Both are resolved through the asset manifest (see assets.js).
+export async function loadCompanyDetail(ticker) {
+  const response = await getDataFile(`details/${ticker}.json`);
+  const data = response.data;
+  const prices = data.HistoricalPrices;
+  if (prices && prices.Encoding === "binary") {
+    const sidecar = await getDataFile(`details/${prices.File}`, {
+      responseType: "arraybuffer",
+    });
+    data.HistoricalPrices = decodeSidecar(sidecar.data);
+  }
+  return data;
+}
+
+export function toDailyStockPrice(prices) {
+  if (!prices) return [];
+  if (Array.isArray(prices)) {
+    return prices.map((p) => ({
+      date: p.Date.split("T")[0],
+      price: Number(p.Close),
+    }));
+  }
+  if (prices.Encoding === "columnar") {
+    const result = [];
+    let day = prices.StartDay;
+    for (let i = 0; i < prices.DayDeltas.length; i++) {
+      day += prices.DayDeltas[i];
+      if (prices.Close[i] == null) continue;
+      result.push({ date: epochDayToDate(day), price: prices.Close[i] });
+    }
+    return result;
+  }
+  if (prices.Encoding === "decoded") {
+    const result = [];
+    for (let i = 0; i < prices.Days.length; i++) {
+      if (Number.isNaN(prices.Close[i])) continue;
+      result.push({ date: epochDayToDate(prices.Days[i]), price: prices.Close[i] });
+    }
+    return result;
+  }
+  return [];
+}
+
+// Overlay a quote from quotes.json (see quotes.js) on stored history: it
+// replaces the close of the same day or extends the series by one day.
+export function withQuote(dailyStockPrice, quote) {
+  if (!quote || quote.Price == null || !dailyStockPrice.length) {
+    return dailyStockPrice;
+  }
+  const date = `${quote.Date} 00:00:00`;
+  const last = dailyStockPrice[dailyStockPrice.length - 1];
+  if (date < last.date) return dailyStockPrice;
+  const point = { date, price: quote.Price };
+  return date === last.date
+    ? [...dailyStockPrice.slice(0, -1), point]
+    : [...dailyStockPrice, point];
+}
+
+// Epoch days of the points of a ChartSeries range (StartDay + running sum of
+// DayDeltas)
+function chartSeriesDays(series) {
+  let day = series.StartDay;
+  return series.DayDeltas.map((delta) => (day += delta));
+}
+
+// The same for every range of a precomputed ChartSeries; a band that ends at
+// the last point is stretched to an appended one and the y-axis domain widens
+// if needed
+export function chartSeriesWithQuote(chartSeries, quote) {
+  if (!chartSeries || !quote || quote.Price == null) return chartSeries;
+  const day = Math.round(Date.parse(quote.Date) / MS_PER_DAY);
+  const result = {};
+  Object.entries(chartSeries).forEach(([range, series]) => {
+    const days = chartSeriesDays(series);
+    const last = days.length - 1;
+    if (last < 0 || day < days[last]) {
+      result[range] = series;
+      return;
+    }
+    const extend = day > days[last];
+    const keep = extend ? days.length : last;
+    result[range] = {
+      ...series,
+      DayDeltas: extend
+        ? [...series.DayDeltas, day - days[last]]
+        : series.DayDeltas,
+      Price: [...series.Price.slice(0, keep), quote.Price],
+      Bands: series.Bands.map((band) =>
+        band[1] === last ? [band[0], keep, band[2], band[3]] : band
+      ),
+      Domain: [
+        Math.min(series.Domain[0], quote.Price),
+        Math.max(series.Domain[1], quote.Price),
+      ],
+    };
+  });
+  return result;
+}
+
+// Turn one precomputed ChartSeries range (see data_script/chart_series.py)
+// into what PriceChart renders: points, tick dates, band rectangles and the
+// y-axis domain. Each band [first, last, dcf, exit] supplies the intrinsic
+// values of the points first..last.
+export function decodeChartSeries(series) {
+  const filledData = chartSeriesDays(series).map((day, i) => ({
+    date: epochDayToDate(day),
+    price: series.Price[i],
+    DCFValue: null,
+    ExitMultipleValue: null,
+  }));
+  series.Bands.forEach(([first, last, dcf, exit]) => {
+    for (let i = first; i <= last; i++) {
+      filledData[i].DCFValue = dcf;
+      filledData[i].ExitMultipleValue = exit;
+    }
+  });
+  return {
+    filledData,
+    tickDates: series.Ticks.map((i) => filledData[i].date),
+    bands: series.Bands.map(([first, last, dcf, exit]) => ({
+      x1: filledData[first].date,
+      x2: filledData[last].date,
+      y1: Math.min(dcf, exit),
+      y2: Math.max(dcf, exit),
+    })),
+    paddedMin: series.Domain[0],
+    paddedMax: series.Domain[1],
+  };
+}
@@ -0,0 +1,68 @@
+import { getDataFile } from "./assets";
+
+// quotes.json (see data_script/quotes.py) holds the latest close of every
+// ticker as parallel arrays. It is refreshed more often than the detail files
+// and companies-index.json, so its prices are overlaid on them.
+
+let quotesRequest = null;
+
+// Ticker -> { Price, Date: "YYYY-MM-DD", Change, ChangePercent }, or null when
+// there is no quotes file
+export function loadQuotes() {
+  if (!quotesRequest) {
+    quotesRequest = getDataFile("quotes.json")
+      .then(({ data }) => {
+        const quotes = {};
+        data.Ticker.forEach((ticker, i) => {
+          quotes[ticker] = {
+            Price: data.Price[i],
+            Date: data.Dates[data.Date[i]],
+            Change: data.Change[i],
+            ChangePercent: data.ChangePercent[i],
+          };
+        });
+        return quotes;
+      })
+      .catch(() => null);
+  }
+  return quotesRequest;
+}
+
+// Row positions in ascending key order; missing keys sort first and ties keep
+// row order, like summary_index._sort_order
+function sortOrder(rows, key) {
+  const keys = rows.map(key);
+  return rows
+    .map((_, i) => i)
+    .sort((a, b) => {
+      const ka = keys[a];
+      const kb = keys[b];
+      if (ka == null || kb == null) return (ka != null) - (kb != null) || a - b;
+      return ka - kb || a - b;
+    });
+}
+
+const intrinsicAverage = (comp) =>
+  comp.DCFValue == null || comp.ExitMultipleValue == null
+    ? null
+    : (comp.DCFValue + comp.ExitMultipleValue) / 2;
+
+// Put the quoted prices on the table rows and re-derive the sort orders that
+// depend on the price
+export function applyQuotes(companies, sortOrders, quotes) {
+  if (!quotes) return sortOrders;
+  companies.forEach((comp) => {
+    const quote = quotes[comp.Ticker];
+    if (quote && quote.Price != null) comp.CurrentPrice = quote.Price;
+  });
+  return {
+    ...sortOrders,
+    CurrentPrice: sortOrder(companies, (comp) => comp.CurrentPrice || 0),
+    Difference: sortOrder(companies, (comp) => {
+      const average = intrinsicAverage(comp);
+      return average == null || !comp.CurrentPrice
+        ? null
+        : average / comp.CurrentPrice - 1;
+    }),
+  };
+}